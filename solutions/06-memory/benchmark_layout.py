@@ -0,0 +1,40 @@
+"""
+Mapping mouse positions to cards: one position at a time and many at once
+(e.g., for analysis of recorded mouse positions), for the original 4 x 2
+layout and a 12 x 8 one with gaps and fixed card aspect ratio. Positions
+are scattered over and around the window, so some miss the grid.
+"""
+
+import time
+
+import numpy as np
+
+from layout import CardLayout
+from utilities import index_from_position
+
+N_POSITIONS = 100_000
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    positions = rng.uniform(-1.1, 1.1, (N_POSITIONS, 2))
+
+    # default layout matches the original function inside the window
+    layout = CardLayout()
+    inside = np.all(np.abs(positions) < 1, axis=1)
+    original = np.array([index_from_position(pos) for pos in positions[inside]])
+    assert np.array_equal(original, layout.indexes_from_positions(positions[inside])), "Layout differs from index_from_position"
+
+    layouts = {"4 x 2" : layout,
+               "12 x 8, gaps" : CardLayout(8, 12, gap=0.1, aspect=240 / 400, win_size=(1920, 1080))}
+    print("%15s %20s %20s %15s" % ("layout", "one by one [us]", "vectorized [us]", "hits [%]"))
+    for name, layout in layouts.items():
+        start = time.perf_counter()
+        one_by_one = [layout.index_from_position(pos) for pos in positions]
+        loop = time.perf_counter() - start
+
+        start = time.perf_counter()
+        indexes = layout.indexes_from_positions(positions)
+        vectorized = time.perf_counter() - start
+
+        assert [-1 if index is None else index for index in one_by_one] == indexes.tolist(), "Lookups disagree"
+        print("%15s %20.3f %20.3f %15.1f" % (name, 1e6 * loop / N_POSITIONS, 1e6 * vectorized / N_POSITIONS, 100 * np.mean(indexes >= 0)))
@@ -0,0 +1,50 @@
+"""
+Time to decode a deck of card images: once per card (as create_card does
+with a filename), once per image via the cache on a thread pool (cold cache),
+and again with all images already cached (warm cache).
+
+Images are generated in a temporary folder, 240 x 400 like the original cards.
+"""
+
+import os
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from textures import TextureCache, decode
+
+N_IMAGES = [50, 200, 500]
+IMAGE_SIZE = (240, 400)
+
+if __name__ == "__main__":
+    folder = tempfile.mkdtemp()
+    rng = np.random.default_rng(0)
+    paths = []
+    for iimage in range(max(N_IMAGES)):
+        # smooth random gradients compress like pictures, unlike pure noise
+        pixels = np.linspace(0, 255, IMAGE_SIZE[0])[None, :, None] * rng.random(3) + rng.integers(0, 30, (IMAGE_SIZE[1], IMAGE_SIZE[0], 3))
+        paths.append(os.path.join(folder, "card%03d.png" % iimage))
+        Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(paths[-1])
+
+    print("%8s %25s %25s %25s" % ("images", "per card [s]", "thread pool, cold [s]", "warm [s]"))
+    for n_images in N_IMAGES:
+        deck = paths[:n_images] * 2
+
+        start = time.perf_counter()
+        for path in deck:
+            decode(path)
+        per_card = time.perf_counter() - start
+
+        cache = TextureCache(capacity=max(N_IMAGES))
+        start = time.perf_counter()
+        cache.prefetch(deck).wait()
+        cold = time.perf_counter() - start
+
+        start = time.perf_counter()
+        cache.prefetch(deck).wait()
+        for path in deck:
+            cache.get(path)
+        warm = time.perf_counter() - start
+        print("%8d %25.3f %25.3f %25.4f" % (n_images, per_card, cold, warm))
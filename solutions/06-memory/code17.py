@@ -6,21 +6,37 @@ import os, random
 
 from psychopy import clock, event, visual
 
-from utilities import create_card, index_from_position, remaining_cards
+from layout import CardLayout
+from textures import TextureCache
+from utilities import create_card, remaining_cards
 
 IMAGE_FOLDER = "Images"
+ROWS = 2
+COLUMNS = 4
 
-# creating a 240 * 2 x 400 * 2 window
-win = visual.Window(size=(240 * 4, 400 * 2))
+# creating a 240 * columns x 400 * rows window
+win = visual.Window(size=(240 * COLUMNS, 400 * ROWS))
 mouse = event.Mouse()
+layout = CardLayout(ROWS, COLUMNS)
 
-# visuals
+# visuals, as many pairs as the layout fits
 filenames = [filename
-             for filename in os.listdir(IMAGE_FOLDER)
-             if filename.startswith("l")] * 2
+             for filename in sorted(os.listdir(IMAGE_FOLDER))
+             if filename.startswith("l")][:layout.n_cards // 2] * 2
 # randomize card order
 random.shuffle(filenames)
-cards = [create_card(win, os.path.join(IMAGE_FOLDER, filename), index) 
+
+# decoding images in the background, each only once
+cache = TextureCache()
+prefetch = cache.prefetch([os.path.join(IMAGE_FOLDER, filename) for filename in filenames])
+loading_text = visual.TextStim(win, "")
+while not prefetch.done():
+    loading_text.text = "Loading images %d / %d" % (prefetch.n_done(), len(prefetch.paths))
+    loading_text.draw()
+    win.flip()
+prefetch.wait()
+
+cards = [create_card(win, os.path.join(IMAGE_FOLDER, filename), index, cache, layout) 
          for index, filename in enumerate(filenames)]
 
 # main loop
@@ -30,8 +46,8 @@ game_clock = clock.Clock()
 while show_must_go_on and remaining_cards(cards) > 0:
     # processing mouse inputs
     if mouse.getPressed()[0]:
-        icard = index_from_position(mouse.getPos())
-        if cards[icard]['side'] != "front":
+        icard = layout.index_from_position(mouse.getPos())
+        if icard is not None and icard < len(cards) and cards[icard]['side'] != "front":
             cards[icard]['side'] = "front"
             face_up.append(cards[icard])
 
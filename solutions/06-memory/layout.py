@@ -0,0 +1,141 @@
+"""
+Card layout for memory game with any number of rows and columns.
+
+The window is split into rows x columns equal cells, cards are centred
+in them, index goes left to right and then top to bottom:
+
+    0 1 2 3
+    4 5 6 7
+
+Cards are smaller than cells if there is a gap between them or if they
+must keep their aspect ratio. Clicks on gaps or outside of the grid hit no card.
+
+* CardLayout
+"""
+
+import math
+
+import numpy as np
+
+
+class CardLayout:
+    """
+    Positions of cards on a rows x columns grid.
+
+    Properties
+    ----------
+    rows, columns : int
+    n_cards : int
+    cell_size : numpy.ndarray
+        Width and height of a grid cell in norm units.
+    card_size : numpy.ndarray
+        Width and height of a card in norm units.
+    centers : numpy.ndarray
+        n_cards x 2, (x, y) of card centers in norm units.
+
+    Methods
+    ----------
+    position_from_index(index) : Center of a card.
+    index_from_position(pos) : Index of the card at the position.
+    indexes_from_positions(positions) : Indexes of cards at many positions.
+    """
+
+    def __init__(self, rows=2, columns=4, gap=0.0, aspect=None, win_size=None):
+        """
+        Default layout is the original 4 x 2 (columns x rows) one.
+
+        Parameters
+        ----------
+        rows : int, optional
+        columns : int, optional
+        gap : float, optional
+            Space between cards as a fraction of cell size.
+        aspect : float, optional
+            Card width / height in pixels, cards fill their cells if omitted.
+        win_size : tuple, optional
+            Window size in pixels, required for the aspect ratio.
+        """
+        self.rows = rows
+        self.columns = columns
+        self.cell_size = np.array([2 / columns, 2 / rows])
+        self.card_size = self.cell_size * (1 - gap)
+        if aspect is not None:
+            if win_size is None:
+                raise ValueError("Window size is required to keep card aspect ratio.")
+
+            # norm units of the window are stretched by its aspect ratio
+            norm_aspect = aspect * win_size[1] / win_size[0]
+            self.card_size = np.minimum(self.card_size, self.card_size[::-1] * [norm_aspect, 1 / norm_aspect])
+
+        ix, iy = np.meshgrid(np.arange(columns), np.arange(rows))
+        self.centers = np.column_stack([-1 + (ix.ravel() + 0.5) * self.cell_size[0],
+                                        1 - (iy.ravel() + 0.5) * self.cell_size[1]])
+
+    @property
+    def n_cards(self):
+        """int : Number of cards.
+        """
+        return self.rows * self.columns
+
+    def position_from_index(self, index):
+        """
+        Center of a card.
+
+        Parameters
+        ----------
+        index : int
+
+        Returns
+        ----------
+        tuple : (x, y) in norm units
+        """
+        return tuple(self.centers[index])
+
+    def index_from_position(self, pos):
+        """
+        Index of the card at the position.
+
+        Parameters
+        ----------
+        pos : tuple
+            (x, y) in norm units
+
+        Returns
+        ----------
+        int : card index, None for gaps and positions outside of the grid.
+        """
+        x, y = float(pos[0]), float(pos[1])
+        ix = math.floor((x + 1) / self.cell_size[0]) # left is negative
+        iy = math.floor((1 - y) / self.cell_size[1]) # up is positive
+        if not (0 <= ix < self.columns and 0 <= iy < self.rows):
+            return None
+
+        # gaps around the card
+        index = ix + iy * self.columns
+        center_x, center_y = self.centers[index]
+        if abs(x - center_x) > self.card_size[0] / 2 or abs(y - center_y) > self.card_size[1] / 2:
+            return None
+        return index
+
+    def indexes_from_positions(self, positions):
+        """
+        Indexes of cards at many positions.
+
+        Parameters
+        ----------
+        positions : numpy.ndarray
+            n x 2, (x, y) in norm units.
+
+        Returns
+        ----------
+        numpy.ndarray : card indexes, -1 for gaps and positions outside of the grid.
+        """
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        ix = np.floor((positions[:, 0] + 1) / self.cell_size[0]).astype(int)
+        iy = np.floor((1 - positions[:, 1]) / self.cell_size[1]).astype(int)
+        inside = (ix >= 0) & (ix < self.columns) & (iy >= 0) & (iy < self.rows)
+
+        indexes = np.where(inside, ix + iy * self.columns, -1)
+        on_card = np.all(np.abs(positions - self.centers[np.maximum(indexes, 0)]) <= self.card_size / 2, axis=1)
+        indexes[~on_card] = -1
+        return indexes
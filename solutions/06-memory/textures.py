@@ -0,0 +1,183 @@
+"""
+Shared cache of decoded card images and their parallel preloading.
+
+Every image of a memory deck is used by two cards, but it only needs to be
+read and decoded once. TextureCache keeps decoded images (PIL images, which
+visual.ImageStim accepts instead of a filename) keyed by path and evicts
+the least recently used ones once it is full. Decoding releases the GIL, so
+prefetch() decodes images on a thread pool while the main thread keeps
+drawing a loading screen.
+
+* TextureCache
+* Prefetch
+* decode(path)
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+
+class TextureCache:
+    """
+    Decoded images keyed by path, least recently used ones are evicted.
+
+    Properties
+    ----------
+    capacity : int
+        Maximal number of images.
+    images : collections.OrderedDict
+        Path -> PIL.Image.Image, least recently used first.
+    lock : threading.Lock
+    n_hits, n_misses : int
+        Number of lookups that found or did not find the image in the cache.
+
+    Methods
+    ----------
+    get(path) : Decoded image, loaded from disk if not cached.
+    prefetch(paths, max_workers=None) : Decode images on a thread pool.
+    """
+
+    def __init__(self, capacity=512):
+        """
+        Parameters
+        ----------
+        capacity : int, optional
+        """
+        self.capacity = capacity
+        self.images = OrderedDict()
+        self.lock = threading.Lock()
+        self.n_hits = 0
+        self.n_misses = 0
+
+    def __contains__(self, path):
+        with self.lock:
+            return path in self.images
+
+    def __len__(self):
+        return len(self.images)
+
+    def get(self, path):
+        """
+        Decoded image, loaded from disk if not cached.
+
+        Parameters
+        ----------
+        path : str
+
+        Returns
+        ----------
+        PIL.Image.Image
+        """
+        with self.lock:
+            if path in self.images:
+                self.n_hits += 1
+                self.images.move_to_end(path)
+                return self.images[path]
+            self.n_misses += 1
+
+        # decoding outside of the lock, so that other threads are not blocked
+        image = decode(path)
+        with self.lock:
+            self.images[path] = image
+            self.images.move_to_end(path)
+            while len(self.images) > self.capacity:
+                self.images.popitem(last=False)
+        return image
+
+    def prefetch(self, paths, max_workers=None):
+        """
+        Decode images on a thread pool.
+
+        Parameters
+        ----------
+        paths : list
+            Duplicates and already cached images are skipped.
+        max_workers : int, optional
+            Number of threads, default of ThreadPoolExecutor if omitted.
+
+        Returns
+        ----------
+        Prefetch
+        """
+        missing = [path for path in dict.fromkeys(paths) if path not in self]
+        return Prefetch(self, missing, max_workers)
+
+
+class Prefetch:
+    """
+    Images being decoded on a thread pool.
+
+    Properties
+    ----------
+    paths : list
+    futures : list
+        concurrent.futures.Future per path.
+    executor : concurrent.futures.ThreadPoolExecutor
+
+    Methods
+    ----------
+    n_done() : Number of decoded images.
+    done() : Whether all images are decoded.
+    wait() : Wait until all images are decoded.
+    """
+
+    def __init__(self, cache, paths, max_workers=None):
+        """
+        Parameters
+        ----------
+        cache : TextureCache
+        paths : list
+        max_workers : int, optional
+        """
+        self.paths = paths
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.futures = [self.executor.submit(cache.get, path) for path in paths]
+        self.executor.shutdown(wait=False)
+
+    def n_done(self):
+        """
+        Number of decoded images.
+
+        Returns
+        ----------
+        int
+        """
+        return sum(future.done() for future in self.futures)
+
+    def done(self):
+        """
+        Whether all images are decoded.
+
+        Returns
+        ----------
+        logical
+        """
+        return all(future.done() for future in self.futures)
+
+    def wait(self):
+        """Wait until all images are decoded, raises first decoding error, if any.
+        """
+        for future in self.futures:
+            future.result()
+
+
+def decode(path):
+    """
+    Read and decode an image.
+
+    Parameters
+    ----------
+    path : str
+
+    Returns
+    ----------
+    PIL.Image.Image
+    """
+    image = Image.open(path)
+
+    # decoding closes the file
+    image.load()
+    return image
@@ -29,7 +29,7 @@ def position_from_index(index):
     ix = index % 4
     return (-0.75 + 0.5 * ix, 0.5 - iy)
 
-def create_card(win, filename, index):
+def create_card(win, filename, index, cache=None, layout=None):
     """
     Create card dictionary.
 
@@ -39,14 +39,26 @@ def create_card(win, filename, index):
     filename : str
     index : int
         0..7 range.
+    cache : textures.TextureCache, optional
+        Decoded images are taken from it, image is read from the file if omitted.
+    layout : layout.CardLayout, optional
+        Position and size of the card, original 4 x 2 layout with image size if omitted.
 
     Returns
     ----------
     dict
     """
+    image = filename if cache is None else cache.get(filename)
+    if layout is None:
+        pos = position_from_index(index)
+        front_size, back_size = None, (0.5, 1)
+    else:
+        pos = layout.position_from_index(index)
+        front_size = back_size = tuple(layout.card_size)
+
     return {
-        "front" : visual.ImageStim(win, filename, pos=position_from_index(index)),
-        "back" : visual.Rect(win, size=(0.5, 1), fillColor="green", lineColor="white", pos=position_from_index(index)),
+        "front" : visual.ImageStim(win, image, pos=pos, size=front_size),
+        "back" : visual.Rect(win, size=back_size, fillColor="green", lineColor="white", pos=pos),
         "filename" : filename,
         "side" : "back",
         "show" : True
@@ -0,0 +1,70 @@
+"""
+Compare per-frame cost of checking every obstacle with the exact polygon test
+against the broad-phase check of ObstaclesManager.
+
+Obstacles are narrow and spawn often, so that dozens of them are on the screen.
+The bird flies at random heights, so that checks do not always stop at the first hit.
+"""
+
+import json
+import random
+import time
+
+from psychopy import visual
+
+from flappy_bird import FlappyBird
+from obstacle import ObstaclesManager
+
+OBSTACLES = [10, 30, 60]
+FRAMES = 1000
+
+# getting settings
+with open('settings.json') as json_file:
+    settings = json.load(json_file)
+
+win = visual.Window(size=settings['Window']['Size'])
+bird = FlappyBird(win, settings["Bird"])
+
+print("%10s %12s %15s %15s" % ("obstacles", "check", "tests/frame", "ms per frame"))
+for n_obstacles in OBSTACLES:
+    # narrow obstacles evenly spread over the screen
+    obstacle_settings = dict(settings["Obstacles"])
+    obstacle_settings["Width"] = 1 / n_obstacles
+    obstacle_settings["Spawn time"] = [2 / n_obstacles / obstacle_settings["Speed"]] * 2
+    obstacles = ObstaclesManager(win, obstacle_settings)
+    while obstacles.n_active < n_obstacles:
+        for obstacle in obstacles.obstacles:
+            obstacle.update(obstacle_settings["Spawn time"][0])
+        obstacles.spawn()
+
+    heights = [random.uniform(-1, 1) for _ in range(FRAMES)]
+    shift = obstacle_settings["Width"] / FRAMES
+
+    # exact polygon test for every obstacle
+    n_tests = 0
+    duration = 0
+    for height in heights:
+        bird.pos = (bird.pos[0], height)
+        for obstacle in obstacles.obstacles:
+            obstacle.update(shift / obstacle_settings["Speed"])
+        start = time.perf_counter()
+        for obstacle in obstacles.obstacles:
+            n_tests += 1
+            if obstacle.lower_rect.overlaps(bird) or obstacle.upper_rect.overlaps(bird):
+                break
+        duration += time.perf_counter() - start
+    print("%10d %12s %15.1f %15.3f" % (n_obstacles, "exact", n_tests / FRAMES, 1000 * duration / FRAMES))
+
+    # broad phase
+    n_tests = obstacles.n_broad_tests
+    duration = 0
+    for height in heights:
+        bird.pos = (bird.pos[0], height)
+        for obstacle in obstacles.obstacles:
+            obstacle.update(shift / obstacle_settings["Speed"])
+        start = time.perf_counter()
+        obstacles.check_if_hit(bird)
+        duration += time.perf_counter() - start
+    print("%10d %12s %15.1f %15.3f" % (n_obstacles, "broad phase", (obstacles.n_broad_tests - n_tests) / FRAMES, 1000 * duration / FRAMES))
+
+win.close()
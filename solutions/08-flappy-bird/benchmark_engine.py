@@ -0,0 +1,32 @@
+"""
+Throughput of the headless flappy bird engine: single process, a process pool,
+and neuroevolution of linear controllers. Speed-up is relative to real time at 60 frames per second.
+"""
+
+import json
+import os
+
+from engine import evolve, random_policy, run_parallel, run_worker
+
+N_BIRDS = 10_000
+N_STEPS = 600
+FPS = 60
+
+if __name__ == "__main__":
+    with open('settings.json') as json_file:
+        settings = json.load(json_file)
+
+    single = run_worker(random_policy, N_BIRDS, N_STEPS, settings, seed=0)
+    steps_per_second = single["steps"] / single["duration [s]"]
+    print("Single process: %.2f million steps per second, %.0f times faster than real time" %
+          (steps_per_second / 1e6, steps_per_second / FPS))
+
+    n_workers = os.cpu_count()
+    pooled = run_parallel(random_policy, n_workers, N_BIRDS, N_STEPS, settings, seed=0)
+    print("%d processes: %.2f million steps per second, %.0f times faster than real time, %d crashes, %d obstacles cleared" %
+          (n_workers, pooled["steps per second"] / 1e6, pooled["steps per second"] / FPS, pooled["crashes"], pooled["obstacles"]))
+
+    _, history = evolve(settings, n_workers, population=1000, generations=20)
+    print("%10s %12s %12s %12s %15s" % ("generation", "best steps", "best score", "mean steps", "duration [s]"))
+    for generation, result in enumerate(history):
+        print("%10d %12d %12d %12.1f %15.3f" % (generation, result["best steps"], result["best score"], result["mean steps"], result["duration [s]"]))
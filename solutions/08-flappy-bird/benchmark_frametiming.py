@@ -0,0 +1,44 @@
+"""
+Overhead of FrameTimer: time per timed phase and per frame, and memory allocated while recording.
+"""
+
+import time
+import tracemalloc
+
+from frametiming import FrameTimer
+
+FRAMES = 100_000
+PHASES = ["update", "collisions", "score", "draw", "flip", "input"]
+
+if __name__ == "__main__":
+    # empty loop
+    start = time.perf_counter()
+    for iframe in range(FRAMES):
+        for name in PHASES:
+            pass
+    baseline = time.perf_counter() - start
+
+    # timed phases
+    frame_timer = FrameTimer(PHASES, refresh_interval=1 / 60, max_frames=FRAMES // 10)
+    start = time.perf_counter()
+    for iframe in range(FRAMES):
+        for name in PHASES:
+            with frame_timer.phase(name):
+                pass
+        frame_timer.next_frame()
+    duration = time.perf_counter() - start
+    overhead = (duration - baseline) / FRAMES
+    print("%.2f us per frame, %.0f ns per phase" % (1e6 * overhead, 1e9 * overhead / (len(PHASES) + 1)))
+
+    # memory that stays allocated while recording (ring buffer is already full)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for iframe in range(FRAMES):
+        for name in PHASES:
+            with frame_timer.phase(name):
+                pass
+        frame_timer.next_frame()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename") if stat.traceback[0].filename.endswith("frametiming.py"))
+    print("%d bytes allocated by frametiming.py over %d frames" % (allocated, FRAMES))
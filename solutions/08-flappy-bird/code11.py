@@ -3,11 +3,17 @@ Flappy Bird game.
 """
 
 import json
+import os
+import sys
+import time
 
 from psychopy import event, visual
 
 from flappy_bird import FlappyBird
+from course import load_course
+from frametiming import FrameTimer
 from obstacle import ObstaclesManager
+from worldclock import WorldClock
 
 # getting settings
 with open('settings.json') as json_file:
@@ -17,33 +23,61 @@ win = visual.Window(size=settings['Window']['Size'])
 
 # visuals
 bird = FlappyBird(win, settings["Bird"])
-obstacles = ObstaclesManager(win, settings["Obstacles"])
+# pre-generated course, if its filename is given on the command line, random obstacles otherwise
+course = load_course(sys.argv[1]) if len(sys.argv) > 1 else None
+obstacles = ObstaclesManager(win, settings["Obstacles"], course)
 score_text = visual.TextStim(win, "0", pos=(-0.9, 0.9))
 
+# timing of individual phases of every frame, dumped into timing folder when the game is over
+frame_rate = win.getActualFrameRate()
+refresh_interval = 1 / frame_rate if frame_rate else None
+timing_filename = os.path.join("timing", time.strftime("%Y-%m-%d-%H-%M-%S"))
+
 # main loop
+world_clock = WorldClock()
 show_must_go_on = True
-while show_must_go_on and bird.is_airborne and not obstacles.check_if_hit(bird):
-    # move game objects around
-    obstacles.update()
-    bird.update()
-
-    # keep the score 
-    score_text.text = str(obstacles.score())
-
-    # visuals
-    score_text.draw()
-    obstacles.draw()
-    bird.draw()
-    win.flip()
+bird_crashed = False
+with FrameTimer(["update", "collisions", "score", "draw", "flip", "input"], refresh_interval, timing_filename) as frame_timer:
+    while show_must_go_on and bird.is_airborne and not bird_crashed and not obstacles.is_course_over:
+        # move game objects around
+        with frame_timer.phase("update"):
+            dt = world_clock.tick()
+            obstacles.update(dt)
+            bird.update(dt)
+
+        # collisions along the whole movement, so that a long frame cannot score an obstacle the bird flew through
+        with frame_timer.phase("collisions"):
+            bird_crashed = obstacles.check_if_hit(bird)
+
+        # keep the score, text is updated only when it changes
+        with frame_timer.phase("score"):
+            if not bird_crashed and obstacles.update_score() > 0:
+                score_text.text = str(obstacles.total_score)
 
-    # inputs check
-    keys = event.getKeys(keyList=["escape", "space"]) 
-    if keys:
-        if keys[0] == "escape":
-            # user pressed abort button
-            show_must_go_on = False
-        else:
-            # flap wings
-            bird.flap()
+        # visuals
+        with frame_timer.phase("draw"):
+            score_text.draw()
+            obstacles.draw()
+            bird.draw()
+        with frame_timer.phase("flip"):
+            win.flip()
+        frame_timer.next_frame()
+
+        # inputs check
+        with frame_timer.phase("input"):
+            keys = event.getKeys(keyList=["escape", "space"])
+        if keys:
+            if keys[0] == "escape":
+                # user pressed abort button
+                show_must_go_on = False
+            else:
+                # flap wings
+                bird.flap()
+
+# bird made it through the whole pre-generated course
+if obstacles.is_course_over:
+    visual.TextStim(win, "Course complete! You cleared %d obstacles." % obstacles.total_score).draw()
+    win.flip()
+    event.waitKeys()
 
 win.close()
@@ -0,0 +1,183 @@
+"""
+Pre-generated obstacle courses.
+
+A course is a sequence of obstacles, each described by its spawn time
+(seconds since the start of the game), and the center and size of its opening.
+Courses are generated all at once with a seeded NumPy generator, so the same
+seed always gives the same course, and are stored in a compact binary file:
+a header followed by three float32 arrays, 12 bytes per obstacle.
+
+Run this file as
+
+    python course.py <filename> <number of obstacles> <seed>
+
+to generate a course using obstacles settings from settings.json.
+
+* Course
+* generate_course(settings, n_obstacles, seed)
+* load_course(filename)
+"""
+
+import json
+import struct
+import sys
+
+import numpy as np
+
+MAGIC = b"FLPC"
+VERSION = 1
+
+# magic, version, seed, number of obstacles
+HEADER = struct.Struct("<4sBQI")
+
+
+class Course:
+    """
+    Obstacle course.
+
+    Properties
+    ----------
+    seed : int
+        Seed of the generator that produced the course.
+    spawn_time : numpy.ndarray
+        Time of appearance of each obstacle at the right edge, in seconds.
+    opening_center : numpy.ndarray
+        Vertical position of the center of each opening.
+    opening_size : numpy.ndarray
+        Height of each opening.
+    n_obstacles : int
+
+    Methods
+    ----------
+    opening(index) : Lower and upper edges of an opening.
+    to_bytes() : Encode course.
+    save(filename) : Save course to a binary file.
+    """
+
+    def __init__(self, seed, spawn_time, opening_center, opening_size):
+        """
+        Parameters
+        ----------
+        seed : int
+        spawn_time : numpy.ndarray
+        opening_center : numpy.ndarray
+        opening_size : numpy.ndarray
+        """
+        self.seed = seed
+        self.spawn_time = np.asarray(spawn_time, dtype=np.float32)
+        self.opening_center = np.asarray(opening_center, dtype=np.float32)
+        self.opening_size = np.asarray(opening_size, dtype=np.float32)
+
+    @property
+    def n_obstacles(self):
+        """int : Number of obstacles.
+        """
+        return len(self.spawn_time)
+
+    def opening(self, index):
+        """
+        Lower and upper edges of an opening.
+
+        Parameters
+        ----------
+        index : int
+            Obstacle index.
+
+        Returns
+        ----------
+        float : lower edge of the opening
+        float : upper edge of the opening
+        """
+        center = float(self.opening_center[index])
+        half_size = float(self.opening_size[index]) / 2
+        return center - half_size, center + half_size
+
+    def to_bytes(self):
+        """
+        Encode course.
+
+        Returns
+        ----------
+        bytes
+        """
+        return (HEADER.pack(MAGIC, VERSION, self.seed, self.n_obstacles) +
+                self.spawn_time.astype("<f4").tobytes() +
+                self.opening_center.astype("<f4").tobytes() +
+                self.opening_size.astype("<f4").tobytes())
+
+    def save(self, filename):
+        """
+        Save course to a binary file.
+
+        Parameters
+        ----------
+        filename : str
+        """
+        with open(filename, "wb") as course_file:
+            course_file.write(self.to_bytes())
+
+
+def generate_course(settings, n_obstacles, seed):
+    """
+    Generate a course, the same way as obstacles are spawned by ObstaclesManager.
+
+    Parameters
+    ----------
+    settings : dict
+        Obstacles settings.
+    n_obstacles : int
+    seed : int
+
+    Returns
+    ----------
+    Course
+    """
+    rng = np.random.default_rng(seed)
+
+    # first obstacle appears right away
+    intervals = rng.uniform(settings["Spawn time"][0], settings["Spawn time"][1], n_obstacles)
+    spawn_time = np.concatenate([[0], np.cumsum(intervals[:-1])])[:n_obstacles]
+
+    # figuring out opening size, find remaining space and place opening within it
+    opening_size = rng.uniform(settings["Minimal size"], settings["Maximal size"], n_obstacles)
+    available_space = 2 - (settings["Lower margin"] + settings["Upper margin"]) - opening_size
+    opening_center = -1 + settings["Lower margin"] + opening_size / 2 + available_space * rng.random(n_obstacles)
+
+    return Course(seed, spawn_time, opening_center, opening_size)
+
+
+def load_course(filename):
+    """
+    Load course from a binary file.
+
+    Parameters
+    ----------
+    filename : str
+
+    Returns
+    ----------
+    Course
+    """
+    with open(filename, "rb") as course_file:
+        encoded = course_file.read()
+
+    magic, version, seed, n_obstacles = HEADER.unpack_from(encoded)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("%s is not an obstacle course file (version %d)." % (filename, VERSION))
+
+    arrays = np.frombuffer(encoded, dtype="<f4", count=3 * n_obstacles, offset=HEADER.size).reshape(3, n_obstacles)
+    return Course(seed, arrays[0], arrays[1], arrays[2])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4:
+        print("Usage: python course.py <filename> <number of obstacles> <seed>")
+        sys.exit(1)
+
+    with open('settings.json') as json_file:
+        settings = json.load(json_file)
+
+    course = generate_course(settings["Obstacles"], int(sys.argv[2]), int(sys.argv[3]))
+    course.save(sys.argv[1])
+    duration = course.spawn_time[-1] if course.n_obstacles > 0 else 0
+    print("%d obstacles, %.1f seconds, saved to %s" % (course.n_obstacles, duration, sys.argv[1]))
@@ -0,0 +1,666 @@
+"""
+Headless flappy bird engine: game physics without PsychoPy, for many birds at once.
+
+The physics is the same as in FlappyBird and ObstaclesManager classes: gravity
+pulls the bird down, flapping sets its vertical speed, obstacles with random
+openings spawn at the right edge and move to the left at a constant speed.
+All birds fly through one shared obstacle course, so controllers can be
+compared fairly. Birds are stored as NumPy arrays and stepped together.
+
+Coordinates are in norm units of the window, the bird stays at x = 0.
+
+* fall(y, vspeed, dt, gravity)
+* random_opening(settings, rng)
+* time_of_impact(start, displacement, half_size, box, acceleration)
+* FlappyEngine
+* FlappyEnv
+* random_policy(observation, rng)
+* linear_policy(observation, weights)
+* run_worker(policy, n_birds, n_steps, settings, seed)
+* run_parallel(policy, n_workers, n_birds, n_steps, settings, seed)
+* evaluate(weights, n_steps, settings, seed, course)
+* evolve(settings, n_workers, population, generations, n_steps, n_elite, mutation_sd, seed, pool)
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import random
+import time
+
+import numpy as np
+
+# observation columns
+N_OBSERVATIONS = 5
+
+# linear controller: one weight per observation and a bias
+N_WEIGHTS = N_OBSERVATIONS + 1
+
+
+def fall(y, vspeed, dt, gravity):
+    """
+    Advance vertical position and speed by one time step, as FlappyBird.update().
+
+    Uses exact motion under constant gravity, so the trajectory does not depend
+    on how time is split into steps, e.g., when a frame stalls.
+
+    Parameters
+    ----------
+    y : float or numpy.ndarray
+        Vertical position.
+    vspeed : float or numpy.ndarray
+        Vertical speed.
+    dt : float
+        Time step.
+    gravity : float
+
+    Returns
+    ----------
+    float or numpy.ndarray : new vertical position
+    float or numpy.ndarray : new vertical speed
+    """
+    return y + vspeed * dt + gravity * dt**2 / 2, vspeed + gravity * dt
+
+
+def random_opening(settings, rng=random):
+    """
+    Random opening of an obstacle, as used by Obstacle.respawn().
+
+    Parameters
+    ----------
+    settings : dict
+        Obstacles settings.
+    rng : random.Random, optional
+
+    Returns
+    ----------
+    float : lower edge of the opening
+    float : upper edge of the opening
+    """
+    # figuring out opening size
+    opening_size = rng.uniform(settings["Minimal size"], settings["Maximal size"])
+
+    # find remaining space and place opening within it
+    available_space = 2 - (settings["Lower margin"] + settings["Upper margin"]) - opening_size
+    opening_y = -1 + settings["Lower margin"] + opening_size /2 + available_space * rng.random()
+    return opening_y - opening_size / 2, opening_y + opening_size / 2
+
+
+def time_of_impact(start, displacement, half_size, box, acceleration=0):
+    """
+    Swept collision of a moving box with a static one.
+
+    The moving box travels along a parabola: at a constant speed horizontally
+    and with a constant acceleration vertically, i.e., the way the bird moves
+    under gravity, so the vertical position at fraction s of the movement is
+
+        y = start_y + (displacement_y - acceleration / 2) * s + acceleration / 2 * s**2
+
+    The static box is expanded by the half size of the moving one. The
+    horizontal movement gives the interval of s when the boxes overlap along x
+    (slab method), the moving box hits the static one if its lowest or highest
+    point within that interval (at either end or at the apex) is within
+    the vertical extent of the static box. So, a collision cannot be missed
+    however long the movement is. Works with numpy arrays for many moving boxes at once.
+
+    Parameters
+    ----------
+    start : tuple
+        (x, y) center of the moving box at the beginning of the movement.
+    displacement : tuple
+        (dx, dy) movement of the moving box.
+    half_size : tuple
+        (half width, half height) of the moving box.
+    box : tuple
+        (left, bottom, right, top) of the static box.
+    acceleration : float or numpy.ndarray, optional
+        Vertical acceleration over the whole movement, gravity * dt**2
+        for a time step dt. Zero for a straight segment.
+
+    Returns
+    ----------
+    float or numpy.ndarray : Fraction of the movement before
+                             the boxes touch, numpy.inf if they do not.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # horizontal overlap, the only interval when boxes can touch
+        low = box[0] - half_size[0]
+        high = box[2] + half_size[0]
+        x = np.asarray(start[0], dtype=float)
+        dx = np.asarray(displacement[0], dtype=float)
+        inside = (low <= x) & (x <= high)
+        t_low = (low - x) / dx
+        t_high = (high - x) / dx
+        t_enter = np.where(dx == 0, np.where(inside, 0.0, np.inf), np.maximum(np.minimum(t_low, t_high), 0))
+        t_exit = np.where(dx == 0, np.where(inside, 1.0, -np.inf), np.minimum(np.maximum(t_low, t_high), 1))
+
+        # vertical position y(s) = c + b * s + a * s**2
+        low = box[1] - half_size[1]
+        high = box[3] + half_size[1]
+        a = np.asarray(acceleration, dtype=float) / 2
+        b = np.asarray(displacement[1], dtype=float) - a
+        c = np.asarray(start[1], dtype=float)
+        y_enter = c + b * t_enter + a * t_enter**2
+        y_exit = c + b * t_exit + a * t_exit**2
+
+        # apex counts only if the bird reaches it while overlapping horizontally
+        t_apex = np.where(a == 0, np.nan, -b / (2 * a))
+        apex_inside = (t_enter < t_apex) & (t_apex < t_exit)
+        y_apex = np.where(apex_inside, c + b * t_apex + a * t_apex**2, y_enter)
+        y_min = np.minimum(np.minimum(y_enter, y_exit), y_apex)
+        y_max = np.maximum(np.maximum(y_enter, y_exit), y_apex)
+        hit = (t_enter <= t_exit) & (y_max >= low) & (y_min <= high)
+
+        # first crossing of the edge the bird approaches, if it is not within the box already
+        edge = np.where(y_enter > high, high, low)
+        discriminant = np.sqrt(np.maximum(b**2 - 4 * a * (c - edge), 0))
+        first_root = np.minimum((-b - discriminant) / (2 * a), (-b + discriminant) / (2 * a))
+        second_root = np.maximum((-b - discriminant) / (2 * a), (-b + discriminant) / (2 * a))
+        t_edge = np.where(a == 0, (edge - c) / b, np.where(first_root >= t_enter, first_root, second_root))
+        t_hit = np.where((low <= y_enter) & (y_enter <= high), t_enter, np.clip(t_edge, t_enter, t_exit))
+
+    return np.where(hit, t_hit, np.inf)
+
+
+class FlappyEngine:
+    """
+    Flappy bird physics for many birds flying through one obstacle course.
+
+    Properties
+    ----------
+    n_birds : int
+    settings : dict
+        Settings with "Bird" and "Obstacles" sections, as in settings.json.
+    dt : float
+        Duration of a single step in seconds.
+    continuous : bool
+        Whether collisions are tested along the whole movement within a step
+        (swept test) or only at the end of the step.
+    seed : int
+        Seed for the obstacle course, the same course is used after every full reset.
+    rng : random.Random
+        Used for the obstacle course.
+    course : Course
+        Pre-generated obstacle course, used instead of random obstacles.
+    next_obstacle : int
+        Index of the next obstacle in the course.
+    half_size : float
+        Half of the bird size.
+    y : numpy.ndarray
+        Vertical position of each bird.
+    vspeed : numpy.ndarray
+        Vertical speed of each bird.
+    score : numpy.ndarray
+        Obstacles cleared by each bird.
+    steps : numpy.ndarray
+        Steps survived by each bird.
+    done : numpy.ndarray
+        Whether the bird crashed.
+    obstacle_x : list
+        Horizontal position of obstacles on the screen, from the oldest to the newest.
+    opening_lower, opening_upper : list
+        Edges of openings of obstacles on the screen.
+    n_unscored : int
+        Number of newest obstacles the birds have not passed yet.
+    time_to_spawn : float
+        Time till next obstacle.
+    n_obstacles : int
+        Number of obstacles spawned since the reset.
+
+    Methods
+    ----------
+    reset(birds) : Put birds in the middle of the screen, restart the course if all birds are reset.
+    spawn() : Place a new obstacle at the right edge, schedule the next one.
+    step(flaps, dt) : Move birds that did not crash and the obstacle course.
+    observe() : Compact state of all birds.
+    """
+
+    def __init__(self, n_birds, settings, seed=None, dt=1 / 60, continuous=True, course=None):
+        """
+        Parameters
+        ----------
+        n_birds : int
+        settings : dict
+            Settings with "Bird" and "Obstacles" sections, as in settings.json.
+        seed : int, optional
+            Seed for the obstacle course, random if omitted. Ignored if course is given.
+        dt : float, optional
+            Duration of a single step in seconds, a single frame by default.
+        continuous : bool, optional
+            Whether collisions are tested along the whole movement within a step.
+        course : Course, optional
+            Pre-generated obstacle course, see course.py.
+        """
+        self.n_birds = n_birds
+        self.settings = settings
+        self.dt = dt
+        self.continuous = continuous
+        self.seed = random.randrange(2**32) if seed is None else seed
+        self.course = course
+        self.half_size = settings["Bird"]["Size"] / 2
+
+        self.y = np.zeros(n_birds)
+        self.vspeed = np.zeros(n_birds)
+        self.score = np.zeros(n_birds, dtype=np.int64)
+        self.steps = np.zeros(n_birds, dtype=np.int64)
+        self.done = np.zeros(n_birds, dtype=bool)
+
+        self.reset()
+
+    def reset(self, birds=None):
+        """
+        Put birds in the middle of the screen, restart the course if all birds are reset.
+
+        Parameters
+        ----------
+        birds : numpy.ndarray, optional
+            Indexes of birds to reset, all birds and the obstacle course if omitted.
+        """
+        if birds is None:
+            birds = np.arange(self.n_birds)
+
+            # same course after every full reset
+            self.rng = random.Random(self.seed)
+            self.obstacle_x = []
+            self.opening_lower = []
+            self.opening_upper = []
+            self.n_unscored = 0
+            self.n_obstacles = 0
+            self.next_obstacle = 0
+            self.time_to_spawn = 0
+            self.spawn()
+
+        self.y[birds] = 0
+        self.vspeed[birds] = self.settings["Bird"]["Initial vertical speed"]
+        self.score[birds] = 0
+        self.steps[birds] = 0
+        self.done[birds] = False
+
+    def spawn(self):
+        """
+        Place a new obstacle at the right edge, schedule the next one.
+
+        Returns
+        ----------
+        logical : Whether an obstacle was spawned, False if the course is over or empty.
+        """
+        if self.course is None:
+            lower, upper = random_opening(self.settings["Obstacles"], self.rng)
+            self.time_to_spawn += self.rng.uniform(*self.settings["Obstacles"]["Spawn time"])
+        elif self.next_obstacle < self.course.n_obstacles:
+            lower, upper = self.course.opening(self.next_obstacle)
+            self.next_obstacle += 1
+            if self.next_obstacle < self.course.n_obstacles:
+                self.time_to_spawn += float(self.course.spawn_time[self.next_obstacle]) - float(self.course.spawn_time[self.next_obstacle - 1])
+            else:
+                self.time_to_spawn = np.inf
+        else:
+            # course is over (or empty), nothing to spawn ever again
+            self.time_to_spawn = np.inf
+            return False
+        self.obstacle_x.append(1 - self.settings["Obstacles"]["Width"] / 2)
+        self.opening_lower.append(lower)
+        self.opening_upper.append(upper)
+        self.n_unscored += 1
+        self.n_obstacles += 1
+        return True
+
+    def step(self, flaps, dt=None):
+        """
+        Move birds that did not crash and the obstacle course.
+
+        Parameters
+        ----------
+        flaps : numpy.ndarray
+            Whether each bird flaps its wings before the step.
+        dt : float, optional
+            Duration of this step, e.g., a stalled frame, self.dt if omitted.
+
+        Returns
+        ----------
+        numpy.ndarray : Number of obstacles cleared by each bird during this step.
+        numpy.ndarray : Whether bird crashed during this step.
+        """
+        if dt is None:
+            dt = self.dt
+        obstacles_settings = self.settings["Obstacles"]
+        alive = ~self.done
+
+        # flapping and gravity
+        previous_y = self.y
+        self.vspeed[alive & flaps] = self.settings["Bird"]["Flap speed"]
+        y, vspeed = fall(self.y, self.vspeed, dt, self.settings["Bird"]["Gravity"])
+        self.y = np.where(alive, y, self.y)
+        self.vspeed = np.where(alive, vspeed, self.vspeed)
+        self.steps[alive] += 1
+
+        # obstacles: remove ones off the screen, move, and spawn
+        while self.obstacle_x and self.obstacle_x[0] < -1:
+            del self.obstacle_x[0], self.opening_lower[0], self.opening_upper[0]
+            self.n_unscored = min(self.n_unscored, len(self.obstacle_x))
+        shift = obstacles_settings["Speed"] * dt
+        self.obstacle_x = [x - shift for x in self.obstacle_x]
+        self.time_to_spawn -= dt
+        while self.time_to_spawn <= 0:
+            # new obstacle moved for the part of the step after it was due
+            lateness = -self.time_to_spawn
+            if self.spawn():
+                self.obstacle_x[-1] -= obstacles_settings["Speed"] * lateness
+
+        # falling to the ground
+        crashed = alive & (self.y <= -1)
+
+        # hitting obstacles that horizontally overlap with the bird, relative to obstacles
+        # the bird moved by shift to the right along a parabola, so the swept test also covers obstacles it flew through
+        if self.continuous:
+            start = (-shift, previous_y)
+            displacement = (shift, self.y - previous_y)
+            acceleration = self.settings["Bird"]["Gravity"] * dt**2
+            swept_reach = shift
+        else:
+            swept_reach = 0
+        half_size = (self.half_size, self.half_size)
+        half_width = obstacles_settings["Width"] / 2
+        reach = half_width + self.half_size
+        bottom = self.y - self.half_size
+        top = self.y + self.half_size
+        for x, lower, upper in zip(self.obstacle_x, self.opening_lower, self.opening_upper):
+            if x - reach > 0:
+                # this one and all that follow are still ahead
+                break
+            if x + reach < -swept_reach:
+                # already behind the birds
+                continue
+            if self.continuous:
+                hit_lower = time_of_impact(start, displacement, half_size, (x - half_width, -1, x + half_width, lower), acceleration) <= 1
+                hit_upper = time_of_impact(start, displacement, half_size, (x - half_width, upper, x + half_width, 1), acceleration) <= 1
+                crashed |= alive & (hit_lower | hit_upper)
+            else:
+                crashed |= alive & (((bottom < lower) & (top > -1)) | ((top > upper) & (bottom < 1)))
+        self.done |= crashed
+
+        # scoring: obstacles passed the middle line
+        cleared = np.zeros(self.n_birds, dtype=np.int64)
+        while self.n_unscored > 0 and self.obstacle_x[len(self.obstacle_x) - self.n_unscored] < 0:
+            self.n_unscored -= 1
+            cleared[~self.done] += 1
+        self.score += cleared
+
+        return cleared, crashed
+
+    def observe(self):
+        """
+        Compact state of all birds.
+
+        Returns
+        ----------
+        numpy.ndarray : n_birds x 5 array with vertical position, vertical speed,
+                        horizontal distance to the next obstacle, and lower and
+                        upper edges of its opening.
+        """
+        reach = self.settings["Obstacles"]["Width"] / 2 + self.half_size
+        next_x, lower, upper = 2.0, -1.0, 1.0
+        for x, opening_lower, opening_upper in zip(self.obstacle_x, self.opening_lower, self.opening_upper):
+            if x + reach >= 0:
+                next_x, lower, upper = x, opening_lower, opening_upper
+                break
+
+        observation = np.empty((self.n_birds, N_OBSERVATIONS))
+        observation[:, 0] = self.y
+        observation[:, 1] = self.vspeed
+        observation[:, 2] = next_x
+        observation[:, 3] = lower
+        observation[:, 4] = upper
+        return observation
+
+
+class FlappyEnv:
+    """
+    Gym-style environment for many birds, crashed birds restart automatically.
+
+    Rewards are +1 for a cleared obstacle, -1 for a crash, and 0 otherwise.
+
+    Properties
+    ----------
+    engine : FlappyEngine
+
+    Methods
+    ----------
+    reset() : Restart all birds and the obstacle course.
+    step(actions) : Make a step for all birds.
+    """
+
+    def __init__(self, n_birds, settings, seed=None, dt=1 / 60):
+        """
+        Parameters
+        ----------
+        n_birds : int
+        settings : dict
+            Settings with "Bird" and "Obstacles" sections, as in settings.json.
+        seed : int, optional
+            Seed for the obstacle course.
+        dt : float, optional
+            Duration of a single step in seconds.
+        """
+        self.engine = FlappyEngine(n_birds, settings, seed, dt)
+
+    def reset(self):
+        """
+        Restart all birds and the obstacle course.
+
+        Returns
+        ----------
+        numpy.ndarray : observation, see FlappyEngine.observe().
+        """
+        self.engine.reset()
+        return self.engine.observe()
+
+    def step(self, actions):
+        """
+        Make a step for all birds.
+
+        Parameters
+        ----------
+        actions : numpy.ndarray
+            Whether each bird flaps its wings.
+
+        Returns
+        ----------
+        numpy.ndarray : observation, see FlappyEngine.observe().
+        numpy.ndarray : rewards
+        numpy.ndarray : whether bird crashed (and restarted)
+        dict : "score" and "steps" of crashed birds, before the restart.
+        """
+        cleared, crashed = self.engine.step(np.asarray(actions, dtype=bool))
+        rewards = cleared - crashed.astype(np.int64)
+        finished = np.flatnonzero(crashed)
+        info = {"score" : self.engine.score[finished].copy(),
+                "steps" : self.engine.steps[finished].copy()}
+        self.engine.reset(finished)
+        return self.engine.observe(), rewards, crashed, info
+
+
+def random_policy(observation, rng):
+    """
+    Flap at random every now and then.
+
+    Parameters
+    ----------
+    observation : numpy.ndarray
+        See FlappyEngine.observe().
+    rng : numpy.random.Generator
+
+    Returns
+    ----------
+    numpy.ndarray : actions
+    """
+    return rng.random(observation.shape[0]) < 0.05
+
+
+def linear_policy(observation, weights):
+    """
+    Flap if weighted sum of observations is positive, a separate controller per bird.
+
+    Parameters
+    ----------
+    observation : numpy.ndarray
+        See FlappyEngine.observe().
+    weights : numpy.ndarray
+        n_birds x N_WEIGHTS, the last column is the bias.
+
+    Returns
+    ----------
+    numpy.ndarray : actions
+    """
+    return np.einsum("ij,ij->i", observation, weights[:, :N_OBSERVATIONS]) + weights[:, N_OBSERVATIONS] > 0
+
+
+def run_worker(policy, n_birds, n_steps, settings, seed):
+    """
+    Fly birds in a single process, crashed birds restart.
+
+    Parameters
+    ----------
+    policy : callable
+        policy(observation, rng) that returns whether each bird flaps.
+        Must be a module-level function, so that it can be sent to a process.
+    n_birds : int
+    n_steps : int
+    settings : dict
+    seed : int
+
+    Returns
+    ----------
+    dict : "steps", "crashes", "obstacles" (cleared), "duration [s]"
+    """
+    env = FlappyEnv(n_birds, settings, seed)
+    rng = np.random.default_rng(seed)
+    observation = env.reset()
+    cleared = 0
+    crashes = 0
+    start = time.perf_counter()
+    for _ in range(n_steps):
+        observation, rewards, crashed, _ = env.step(policy(observation, rng))
+        cleared += int(np.sum(rewards[rewards > 0]))
+        crashes += int(np.sum(crashed))
+    return {"steps" : n_birds * n_steps,
+            "crashes" : crashes,
+            "obstacles" : cleared,
+            "duration [s]" : time.perf_counter() - start}
+
+
+def run_parallel(policy, n_workers, n_birds, n_steps, settings, seed=0):
+    """
+    Fly birds in a pool of processes, n_birds per process.
+
+    Parameters
+    ----------
+    policy : callable
+        See run_worker().
+    n_workers : int
+    n_birds : int
+        Birds per process.
+    n_steps : int
+    settings : dict
+    seed : int, optional
+
+    Returns
+    ----------
+    dict : "steps", "crashes", "obstacles", "duration [s]" (wall-clock), "steps per second"
+    """
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        futures = [pool.submit(run_worker, policy, n_birds, n_steps, settings, seed + iworker)
+                   for iworker in range(n_workers)]
+        results = [future.result() for future in futures]
+    duration = time.perf_counter() - start
+
+    totals = {key : sum(result[key] for result in results) for key in ["steps", "crashes", "obstacles"]}
+    totals["duration [s]"] = duration
+    totals["steps per second"] = totals["steps"] / duration
+    return totals
+
+
+def evaluate(weights, n_steps, settings, seed, course=None):
+    """
+    Fly one bird per linear controller through the same course until all crash or time runs out.
+
+    Parameters
+    ----------
+    weights : numpy.ndarray
+        n_controllers x N_WEIGHTS, see linear_policy().
+    n_steps : int
+        Maximal number of steps.
+    settings : dict
+    seed : int
+        Seed for the obstacle course.
+    course : Course, optional
+        Pre-generated obstacle course used instead of the seed, e.g., for tournaments.
+
+    Returns
+    ----------
+    numpy.ndarray : steps survived by each controller
+    numpy.ndarray : obstacles cleared by each controller
+    """
+    engine = FlappyEngine(weights.shape[0], settings, seed, course=course)
+    for _ in range(n_steps):
+        engine.step(linear_policy(engine.observe(), weights))
+        if np.all(engine.done):
+            break
+    return engine.steps.copy(), engine.score.copy()
+
+
+def evolve(settings, n_workers, population=1000, generations=20, n_steps=3600, n_elite=50, mutation_sd=0.2, seed=0, pool=None):
+    """
+    Evolve linear controllers, population is evaluated in a pool of processes.
+
+    Every generation, all controllers fly through the same new course.
+    The best n_elite controllers survive and the rest of the population is
+    replaced by their mutated copies.
+
+    Parameters
+    ----------
+    settings : dict
+    n_workers : int
+    population : int, optional
+    generations : int, optional
+    n_steps : int, optional
+        Maximal number of steps per evaluation, a minute of play by default.
+    n_elite : int, optional
+    mutation_sd : float, optional
+        Standard deviation of Gaussian noise added to weights.
+    seed : int, optional
+    pool : concurrent.futures.Executor, optional
+        Reused if provided, otherwise a new process pool is created.
+
+    Returns
+    ----------
+    numpy.ndarray : weights of the best controller
+    list : per generation dict with "best steps", "best score", "mean steps", "duration [s]"
+    """
+    rng = np.random.default_rng(seed)
+    weights = rng.normal(size=(population, N_WEIGHTS))
+    history = []
+    executor = ProcessPoolExecutor(max_workers=n_workers) if pool is None else pool
+    try:
+        for generation in range(generations):
+            start = time.perf_counter()
+            course_seed = seed + generation
+            chunks = np.array_split(weights, n_workers)
+            futures = [executor.submit(evaluate, chunk, n_steps, settings, course_seed) for chunk in chunks]
+            results = [future.result() for future in futures]
+            steps = np.concatenate([result[0] for result in results])
+            score = np.concatenate([result[1] for result in results])
+
+            # select and mutate
+            order = np.argsort(-steps, kind="stable")
+            elite = weights[order[:n_elite]]
+            parents = elite[rng.integers(n_elite, size=population - n_elite)]
+            weights = np.concatenate([elite, parents + rng.normal(scale=mutation_sd, size=parents.shape)])
+
+            history.append({"best steps" : int(steps[order[0]]),
+                            "best score" : int(score[order[0]]),
+                            "mean steps" : float(np.mean(steps)),
+                            "duration [s]" : time.perf_counter() - start})
+    finally:
+        if pool is None:
+            executor.shutdown()
+    return weights[0], history
@@ -4,6 +4,8 @@ Flappy bird class.
 
 from psychopy import clock, visual
 
+from engine import fall
+
 class FlappyBird(visual.image.ImageStim):
     """
     FlappyBird class based on ImageStim.
@@ -13,13 +15,17 @@ class FlappyBird(visual.image.ImageStim):
     settings : dict
     vspeed : float
         Vertical speed
+    previous_y : float
+        Vertical position before the last update, for swept collision tests.
+    last_dt : float
+        Duration of the last update, for swept collision tests.
     frame_timer : psychopy.clock.Clock
     is_airborne : logical
         Whether bird touches the ground.
 
     Methods
     ----------
-    update() : Update bird vertical position.
+    update(dt=None) : Update bird vertical position.
     flap() : Flap wings to fly upwards.
     """
     def __init__(self, win, settings):
@@ -34,17 +40,28 @@ class FlappyBird(visual.image.ImageStim):
         self.frame_timer = clock.Clock()
 
         super().__init__(win, image=settings["Image"], size=settings["Size"])
+        self.previous_y = self.pos[1]
+        self.last_dt = 0
+
+    def update(self, dt=None):
+        """
+        Update bird vertical position.
 
-    def update(self):
-        """Update bird vertical position.
+        Parameters
+        ----------
+        dt : float, optional
+            Time since the last update, measured by the bird itself if omitted.
         """
-        # get the time and reset the timer
-        time_elapsed = self.frame_timer.getTime()
-        self.frame_timer.reset()
+        if dt is None:
+            # get the time and reset the timer
+            dt = self.frame_timer.getTime()
+            self.frame_timer.reset()
 
         # adjust speed and position
-        self.vspeed += self.settings["Gravity"] * time_elapsed
-        self.pos = (self.pos[0], self.pos[1] + self.vspeed * time_elapsed)
+        self.previous_y = self.pos[1]
+        self.last_dt = dt
+        y, self.vspeed = fall(self.pos[1], self.vspeed, dt, self.settings["Gravity"])
+        self.pos = (self.pos[0], y)
 
     def flap(self):
         """Flap wings to fly upwards.
@@ -0,0 +1,275 @@
+"""
+Per-phase frame timing for game main loops.
+
+Typical use:
+
+    with FrameTimer(["update", "draw", "flip", "input"], filename="timing/game") as frame_timer:
+        while playing:
+            with frame_timer.phase("update"):
+                ...
+            with frame_timer.phase("draw"):
+                ...
+            frame_timer.next_frame()
+
+Timings go into preallocated NumPy arrays (a ring buffer of the last
+max_frames frames), phase context managers are created once and reused,
+so recording does not allocate memory. On exit, a summary with histograms
+is printed and, if filename is given, saved together with CSV and NPZ dumps.
+
+* PhaseTimer
+* FrameTimer
+"""
+
+import os
+import time
+
+import numpy as np
+
+# frame is dropped if it took that many refresh intervals or more
+DROPPED_FRAME_THRESHOLD = 1.5
+
+# number of bins and width of the widest bar in text histograms
+HISTOGRAM_BINS = 12
+HISTOGRAM_WIDTH = 40
+
+
+class PhaseTimer:
+    """
+    Context manager that adds its duration to a phase of the current frame.
+
+    Properties
+    ----------
+    frame_timer : FrameTimer
+    iphase : int
+        Phase index, column in FrameTimer.durations.
+    start : float
+        Time when phase started.
+    """
+    __slots__ = ("frame_timer", "iphase", "start")
+
+    def __init__(self, frame_timer, iphase):
+        """
+        Parameters
+        ----------
+        frame_timer : FrameTimer
+        iphase : int
+        """
+        self.frame_timer = frame_timer
+        self.iphase = iphase
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = self.frame_timer.get_time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        frame_timer = self.frame_timer
+        frame_timer.durations[frame_timer.iframe, self.iphase] += frame_timer.get_time() - self.start
+        return False
+
+
+class FrameTimer:
+    """
+    Per-phase frame timing with dropped frame detection.
+
+    Properties
+    ----------
+    phase_names : list
+    max_frames : int
+        Size of the ring buffer, max_frames - 1 most recent frames are kept.
+    refresh_interval : float
+        Duration of a single screen refresh in seconds, median frame interval is used if None.
+    filename : str
+        Prefix for .txt, .csv, and .npz files written on exit, nothing is written if None.
+    get_time : callable
+        Returns current time in seconds.
+    phases : dict
+        PhaseTimer for each phase name.
+    durations : numpy.ndarray
+        max_frames x number of phases, time spent in each phase.
+    frame_intervals : numpy.ndarray
+        Time between the frame start and the start of the next frame.
+    iframe : int
+        Row of the current frame in the arrays.
+    n_frames : int
+        Number of completed frames.
+    last_frame_time : float
+        Time when the current frame started.
+
+    Methods
+    ----------
+    phase(name) : Context manager that times a phase of the current frame.
+    timed(name) : Decorator that times every call of a function as a phase.
+    next_frame() : Finish the current frame and start the next one.
+    frames() : Recorded frames in chronological order.
+    dropped_frames() : Whether each recorded frame was dropped.
+    report() : Text summary with histograms.
+    save(filename) : Write summary, CSV, and NPZ files.
+    """
+
+    def __init__(self, phase_names, refresh_interval=None, filename=None, max_frames=100_000, get_time=time.perf_counter):
+        """
+        Parameters
+        ----------
+        phase_names : list
+        refresh_interval : float, optional
+            Duration of a single screen refresh, e.g., 1 / win.getActualFrameRate().
+        filename : str, optional
+            Prefix for files written on exit.
+        max_frames : int, optional
+        get_time : callable, optional
+        """
+        self.phase_names = list(phase_names)
+        self.refresh_interval = refresh_interval
+        self.filename = filename
+        self.max_frames = max_frames
+        self.get_time = get_time
+
+        self.durations = np.zeros((max_frames, len(self.phase_names)))
+        self.frame_intervals = np.zeros(max_frames)
+        self.phases = {name : PhaseTimer(self, iphase) for iphase, name in enumerate(self.phase_names)}
+        self.iframe = 0
+        self.n_frames = 0
+        self.last_frame_time = self.get_time()
+
+    def __enter__(self):
+        self.last_frame_time = self.get_time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        print(self.report())
+        if self.filename is not None:
+            self.save(self.filename)
+        return False
+
+    def phase(self, name):
+        """
+        Context manager that times a phase of the current frame.
+
+        Parameters
+        ----------
+        name : str
+
+        Returns
+        ----------
+        PhaseTimer
+        """
+        return self.phases[name]
+
+    def timed(self, name):
+        """
+        Decorator that times every call of a function as a phase.
+
+        Parameters
+        ----------
+        name : str
+
+        Returns
+        ----------
+        callable
+        """
+        phase = self.phases[name]
+        def decorator(function):
+            def timed_function(*args, **kwargs):
+                with phase:
+                    return function(*args, **kwargs)
+            return timed_function
+        return decorator
+
+    def next_frame(self):
+        """Finish the current frame and start the next one, call it right after win.flip().
+        """
+        now = self.get_time()
+        self.frame_intervals[self.iframe] = now - self.last_frame_time
+        self.last_frame_time = now
+        self.n_frames += 1
+        self.iframe = self.n_frames % self.max_frames
+        self.durations[self.iframe] = 0
+
+    def frames(self):
+        """
+        Recorded frames in chronological order.
+
+        Returns
+        ----------
+        numpy.ndarray : n x number of phases durations
+        numpy.ndarray : frame intervals
+        """
+        # the row of the current (unfinished) frame is not included
+        n_recorded = min(self.n_frames, self.max_frames - 1)
+        rows = (self.n_frames - n_recorded + np.arange(n_recorded)) % self.max_frames
+        return self.durations[rows], self.frame_intervals[rows]
+
+    def dropped_frames(self):
+        """
+        Whether each recorded frame was dropped, i.e., took longer than a refresh interval.
+
+        Returns
+        ----------
+        numpy.ndarray
+        float : refresh interval used, measured as median frame interval if not known.
+        """
+        _, intervals = self.frames()
+        refresh_interval = self.refresh_interval
+        if refresh_interval is None:
+            refresh_interval = float(np.median(intervals)) if len(intervals) > 0 else 0.0
+        return intervals >= DROPPED_FRAME_THRESHOLD * refresh_interval, refresh_interval
+
+    def report(self):
+        """
+        Text summary with histograms.
+
+        Returns
+        ----------
+        str
+        """
+        durations, intervals = self.frames()
+        if len(intervals) == 0:
+            return "No frames recorded."
+        dropped, refresh_interval = self.dropped_frames()
+
+        lines = ["%d frames, refresh interval %.2f ms, %d dropped frames (%.1f%%)" %
+                 (len(intervals), 1000 * refresh_interval, np.sum(dropped), 100 * np.mean(dropped)),
+                 "%12s %10s %10s %10s %10s" % ("phase [ms]", "mean", "median", "95%", "max")]
+        columns = [("frame", intervals)] + [(name, durations[:, iphase]) for iphase, name in enumerate(self.phase_names)]
+        for name, values in columns:
+            lines.append("%12s %10.3f %10.3f %10.3f %10.3f" % (name, 1000 * np.mean(values), 1000 * np.median(values),
+                                                               1000 * np.percentile(values, 95), 1000 * np.max(values)))
+
+        for name, values in columns:
+            counts, edges = np.histogram(1000 * values, bins=HISTOGRAM_BINS)
+            lines.append("")
+            lines.append("%s [ms]" % name)
+            for count, low, high in zip(counts, edges[:-1], edges[1:]):
+                bar = "#" * int(np.ceil(HISTOGRAM_WIDTH * count / counts.max()))
+                lines.append("%9.3f-%9.3f %8d %s" % (low, high, count, bar))
+        return "\n".join(lines)
+
+    def save(self, filename):
+        """
+        Write summary (.txt), per frame timings (.csv), and raw arrays (.npz).
+
+        Parameters
+        ----------
+        filename : str
+            Prefix of the files, folder is created if needed.
+        """
+        folder = os.path.dirname(filename)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        durations, intervals = self.frames()
+        dropped, refresh_interval = self.dropped_frames()
+        with open(filename + ".txt", "w") as report_file:
+            report_file.write(self.report() + "\n")
+        np.savetxt(filename + ".csv",
+                   np.column_stack([intervals, durations, dropped]),
+                   delimiter=",",
+                   header=",".join(["frame interval [s]"] + ["%s [s]" % name for name in self.phase_names] + ["dropped"]),
+                   comments="")
+        np.savez(filename + ".npz",
+                 phase_names=np.array(self.phase_names),
+                 durations=durations,
+                 frame_intervals=intervals,
+                 dropped=dropped,
+                 refresh_interval=refresh_interval)
@@ -1,11 +1,31 @@
 """
-Obstacle class.
+Obstacle class, obstacles manager, and bounding box helper.
 """
 
+import math
 import random
 
 from psychopy import clock, visual
 
+from engine import random_opening, time_of_impact
+
+def bounding_box(stim):
+    """
+    Axis-aligned bounding box of a stimulus, ignores orientation.
+
+    Parameters
+    ----------
+    stim : psychopy.visual.BaseVisualStim
+
+    Returns
+    ----------
+    tuple : (left, bottom, right, top)
+    """
+    half_width = stim.size[0] / 2
+    half_height = stim.size[1] / 2
+    return (stim.pos[0] - half_width, stim.pos[1] - half_height, stim.pos[0] + half_width, stim.pos[1] + half_height)
+
+
 class Obstacle:
     """
     Obstacle class.
@@ -17,15 +37,20 @@ class Obstacle:
         whether obstacle clearing was accounted for.
     x : float
         Horizontal position.
+    left : float
+        Left edge.
+    right : float
+        Right edge.
     frame_timer : psychopy.clock.Clock
     lower_rect : psychopy.visual.Rect
     upper_rect : psychopy.visual.Rect
 
     Methods
     ----------
-    update() : Update obstacle position.
+    respawn(opening=None) : Place obstacle at the right edge with a new opening.
+    update(dt=None) : Update obstacle position.
     draw() : Draw obstacle.
-    check_if_hit(bird) : Check if bird hit one of the rectangles.
+    check_if_hit(bird, bird_box=None, shift=0) : Check if bird hit one of the rectangles.
     score() : Score a point if obstacle cleared mid-line the first time.
     """
 
@@ -38,41 +63,57 @@ class Obstacle:
         """
         self.settings = settings
 
+        # timing
+        self.frame_timer = clock.Clock()
+
+        # rectangles, their geometry is decided in respawn()
+        self.lower_rect = visual.Rect(win,
+                                      width=settings["Width"],
+                                      height=1,
+                                      lineColor=settings["Color"],
+                                      fillColor=settings["Color"])
+        self.upper_rect = visual.Rect(win,
+                                      width=settings["Width"],
+                                      height=1,
+                                      lineColor=settings["Color"],
+                                      fillColor=settings["Color"])
+        self.respawn()
+
+    def respawn(self, opening=None):
+        """
+        Place obstacle at the right edge with a new opening.
+        Reuses existing rectangles and timer, so that obstacles can be recycled.
+
+        Parameters
+        ----------
+        opening : tuple, optional
+            (lower edge, upper edge) of the opening, e.g., from a Course, random if omitted.
+        """
+        settings = self.settings
+
         # whether obstacle clearing was accounted for
         self.scored = False
 
         # timing
-        self.frame_timer = clock.Clock()
+        self.frame_timer.reset()
 
         # deciding on a location
         x = 1 - settings["Width"] / 2
 
-        # figuring out opening size
-        opening_size = random.uniform(settings["Minimal size"], settings["Maximal size"])
+        # opening
+        if opening is None:
+            opening = random_opening(settings)
+        opening_lower_edge, opening_upper_edge = opening
 
-        # find remaining space and place opening within it
-        available_space = 2 - (settings["Lower margin"] + settings["Upper margin"]) - opening_size
-        opening_y = -1 + settings["Lower margin"] + opening_size /2 + available_space * random.random()
-        opening_lower_edge = opening_y - opening_size / 2
-        opening_upper_edge = opening_y + opening_size / 2
-
-        # creating lower rectangle
+        # lower rectangle
         lower_rect_height = opening_lower_edge - (-1) # lower screen edge is -1
-        self.lower_rect = visual.Rect(win,
-                                      width=settings["Width"],
-                                      height=lower_rect_height,
-                                      pos=(x, -1 + lower_rect_height / 2.0),
-                                      lineColor=settings["Color"],
-                                      fillColor=settings["Color"])
+        self.lower_rect.height = lower_rect_height
+        self.lower_rect.pos = (x, -1 + lower_rect_height / 2.0)
 
-        # creating upper rectangle
+        # upper rectangle
         upper_rect_height = 1 - opening_upper_edge
-        self.upper_rect = visual.Rect(win,
-                                      width=settings["Width"],
-                                      height=upper_rect_height,
-                                      pos=(x, 1 - upper_rect_height / 2.0),
-                                      lineColor=settings["Color"],
-                                      fillColor=settings["Color"])
+        self.upper_rect.height = upper_rect_height
+        self.upper_rect.pos = (x, 1 - upper_rect_height / 2.0)
 
     @property
     def x(self):
@@ -80,16 +121,35 @@ class Obstacle:
         """
         return self.lower_rect.pos[0]
 
-    def update(self):
-        """Update obstacle position.
+    @property
+    def left(self):
+        """Left edge.
         """
-        # get the time and reset the timer
-        elapsed_time = self.frame_timer.getTime()
-        self.frame_timer.reset()
+        return self.lower_rect.pos[0] - self.settings["Width"] / 2
+
+    @property
+    def right(self):
+        """Right edge.
+        """
+        return self.lower_rect.pos[0] + self.settings["Width"] / 2
+
+    def update(self, dt=None):
+        """
+        Update obstacle position.
+
+        Parameters
+        ----------
+        dt : float, optional
+            Time since the last update, measured by the obstacle itself if omitted.
+        """
+        if dt is None:
+            # get the time and reset the timer
+            dt = self.frame_timer.getTime()
+            self.frame_timer.reset()
 
         # move rectangles
-        self.lower_rect.pos = (self.lower_rect.pos[0] - self.settings["Speed"] * elapsed_time, self.lower_rect.pos[1])
-        self.upper_rect.pos = (self.upper_rect.pos[0] - self.settings["Speed"] * elapsed_time, self.upper_rect.pos[1])
+        self.lower_rect.pos = (self.lower_rect.pos[0] - self.settings["Speed"] * dt, self.lower_rect.pos[1])
+        self.upper_rect.pos = (self.upper_rect.pos[0] - self.settings["Speed"] * dt, self.upper_rect.pos[1])
 
     def draw(self):
         """Draw obstacle.
@@ -97,19 +157,51 @@ class Obstacle:
         self.lower_rect.draw()
         self.upper_rect.draw()
 
-    def check_if_hit(self, bird):
+    def check_if_hit(self, bird, bird_box=None, shift=0):
         """
         Check if bird hit one of the rectangles.
 
+        Bounding boxes are compared first, the exact polygon test
+        is used only if the bird is on the boundary of a rectangle.
+        If the bird does not touch a rectangle now, its movement since the
+        last update is tested as well (relative to the obstacle, the bird
+        moved by shift to the right and along a parabola from bird.previous_y
+        to its current height), so it cannot fly through a rectangle during a long frame.
+
         Parameters
         ----------
         bird : FlappyBird
+        bird_box : tuple, optional
+            (left, bottom, right, top) bounding box of the bird, computed if omitted.
+        shift : float, optional
+            Distance the obstacle moved during the last update.
 
         Returns
         ----------
         logical
         """
-        return self.lower_rect.overlaps(bird) or self.upper_rect.overlaps(bird)
+        if bird_box is None:
+            bird_box = bounding_box(bird)
+        bird_left, bird_bottom, bird_right, bird_top = bird_box
+        half_size = ((bird_right - bird_left) / 2, (bird_top - bird_bottom) / 2)
+        start = ((bird_left + bird_right) / 2 - shift, bird.previous_y)
+        displacement = (shift, (bird_bottom + bird_top) / 2 - bird.previous_y)
+        acceleration = bird.settings["Gravity"] * bird.last_dt**2
+
+        for rect in [self.lower_rect, self.upper_rect]:
+            box = bounding_box(rect)
+            left, bottom, right, top = box
+            if bird_right < left or bird_left > right or bird_top < bottom or bird_bottom > top:
+                # boxes do not overlap now, but could have during the last update
+                if time_of_impact(start, displacement, half_size, box, acceleration) <= 1:
+                    return True
+                continue
+            if left <= bird_left and bird_right <= right and bottom <= bird_bottom and bird_top <= top:
+                # bird is fully inside the rectangle
+                return True
+            if rect.overlaps(bird):
+                return True
+        return False
     
     def score(self):
         """Score a point if obstacle cleared mid-line the first time.
@@ -124,76 +216,236 @@ class ObstaclesManager:
     """
     Manager for obstacles.
 
+    Obstacles come from a fixed-capacity pool and are kept in a ring buffer,
+    ordered from the oldest (left-most) to the newest (right-most) one.
+    Obstacles that leave the screen go back to the pool and are respawned
+    with a new opening, so no stimuli are created while playing.
+
     Properties
     ----------
     win : psychopy.visual.Window
     settings : dict
     total_score : int
         Total number of obstacles cleared.
-    spawn_timer : clock.CountdownTimer
+    course : Course
+        Pre-generated obstacle course, obstacles are random if None.
+    next_obstacle : int
+        Index of the next obstacle in the course.
+    is_course_over : logical
+        Whether all obstacles of the course have left the screen.
+    time_to_spawn : float
+        Time till next obstacle.
+    shift : float
+        Distance obstacles moved during the last update.
+    frame_timer : clock.Clock
+        Time since last update, used only if update() gets no time step.
+    pool : list
+        Ring buffer of Obstacle, both active and free ones.
+    first : int
+        Index of the oldest active obstacle in the pool.
+    n_active : int
+        Number of obstacles on the screen.
+    n_unscored : int
+        Number of newest obstacles not cleared yet, the oldest of them is the scoring cursor.
     obstacles : list
+        Active obstacles, from the oldest to the newest one.
+    n_pool_hits : int
+        Number of spawned obstacles recycled from the pool.
+    n_pool_misses : int
+        Number of spawned obstacles that had to be created, because the pool was exhausted.
+    n_broad_tests : int
+        Number of obstacles whose bounding boxes were checked against the bird.
 
     Methods
     ----------
     draw() : Draw all obstacles.
-    update() : Update location of all obstacles, spawn new ones, remove ones off the screen.
+    update(dt=None) : Update location of all obstacles, spawn new ones, remove ones off the screen.
+    spawn() : Take an obstacle from the pool and place it at the right edge, schedule the next one.
     check_if_hit(bird) : Check if bird hit any obstacle.
+    update_score() : Score obstacles cleared since the last call.
     score() : Score all obstacles, adds one for every cleared obstacle.
     """
 
-    def __init__(self, win, settings):
+    def __init__(self, win, settings, course=None):
         """
         Parameters
         ----------
         win : psychopy.visual.Window
         setttings : dict
+        course : Course, optional
+            Pre-generated obstacle course, see course.py, obstacles are random if omitted.
         """
         self.win = win
         self.settings = settings
+        self.course = course
+        self.next_obstacle = 0
 
         # total number of obstacles cleared
         self.total_score = 0
 
-        # time till next obstacle
-        self.spawn_timer = clock.CountdownTimer(random.uniform(self.settings["Spawn time"][0], self.settings["Spawn time"][1]))
+        # time till next obstacle, first one appears right away
+        self.time_to_spawn = 0
+
+        # fallback timing, if no world clock is used
+        self.frame_timer = clock.Clock()
+        self.shift = 0
+
+        # pool is large enough for all obstacles that fit on the screen at the fastest spawn rate
+        travel_time = (2 + self.settings["Width"]) / self.settings["Speed"]
+        capacity = math.ceil(travel_time / self.settings["Spawn time"][0]) + 1
+        self.pool = [Obstacle(win, self.settings) for _ in range(capacity)]
+        self.first = 0
+        self.n_active = 0
+        self.n_unscored = 0
+        self.n_pool_hits = 0
+        self.n_pool_misses = 0
+        self.n_broad_tests = 0
+
+        # first obstacle
+        self.spawn()
+
+    @property
+    def is_course_over(self):
+        """Whether all obstacles of the course have left the screen.
+        """
+        return self.course is not None and self.next_obstacle >= self.course.n_obstacles and self.n_active == 0
 
-        # individual obstacles
-        self.obstacles = [Obstacle(win, self.settings)]
+    @property
+    def obstacles(self):
+        """Active obstacles, from the oldest to the newest one.
+        """
+        return [self.pool[(self.first + i) % len(self.pool)] for i in range(self.n_active)]
 
     def draw(self):
         """Draw all obstacles.
         """
-        for obstacle in self.obstacles:
-            obstacle.draw()
+        capacity = len(self.pool)
+        for i in range(self.first, self.first + self.n_active):
+            self.pool[i % capacity].draw()
 
-    def update(self):
+    def update(self, dt=None):
         """
         Update location of all obstacles, spawn new ones,
         remove ones off the screen.
+
+        All obstacles move by the same time step, so they stay sorted by x.
+
+        Parameters
+        ----------
+        dt : float, optional
+            Time since the last update, e.g., from WorldClock.tick(),
+            measured by the manager itself if omitted.
         """
-        # remove left-most (first) obstacle if it is off the screen
-        if self.obstacles[0].x < -1:
-            self.obstacles.pop(0)
+        # return left-most (oldest) obstacles to the pool if they are off the screen
+        while self.n_active > 0 and self.pool[self.first].x < -1:
+            self.first = (self.first + 1) % len(self.pool)
+            self.n_active -= 1
+            self.n_unscored = min(self.n_unscored, self.n_active)
+
+        if dt is None:
+            # get the time and reset the timer
+            dt = self.frame_timer.getTime()
+            self.frame_timer.reset()
 
         # update individual obstacles
-        for obstacle in self.obstacles:
-            obstacle.update()
+        self.shift = self.settings["Speed"] * dt
+        capacity = len(self.pool)
+        for i in range(self.first, self.first + self.n_active):
+            self.pool[i % capacity].update(dt)
+
+        # spawn new obstacles
+        self.time_to_spawn -= dt
+        while self.time_to_spawn <= 0:
+            # new obstacle moved for the part of the update after it was due
+            lateness = -self.time_to_spawn
+            if self.spawn():
+                self.pool[(self.first + self.n_active - 1) % len(self.pool)].update(lateness)
+
+    def spawn(self):
+        """
+        Take an obstacle from the pool and place it at the right edge,
+        with the next opening of the course or a random one. Schedules the next spawn.
 
-        # spawn new obstacle and reset timer
-        if self.spawn_timer.getTime() <= 0:
-            self.obstacles.append(Obstacle(self.win, self.settings))
-            self.spawn_timer = clock.CountdownTimer(random.uniform(self.settings["Spawn time"][0], self.settings["Spawn time"][1]))
+        Returns
+        ----------
+        logical : Whether an obstacle was spawned, False if the course is over or empty.
+        """
+        if self.course is None:
+            opening = None
+            self.time_to_spawn += random.uniform(self.settings["Spawn time"][0], self.settings["Spawn time"][1])
+        elif self.next_obstacle < self.course.n_obstacles:
+            opening = self.course.opening(self.next_obstacle)
+            self.next_obstacle += 1
+            if self.next_obstacle < self.course.n_obstacles:
+                self.time_to_spawn += float(self.course.spawn_time[self.next_obstacle]) - float(self.course.spawn_time[self.next_obstacle - 1])
+            else:
+                self.time_to_spawn = math.inf
+        else:
+            # course is over (or empty), nothing to spawn ever again
+            self.time_to_spawn = math.inf
+            return False
+
+        if self.n_active < len(self.pool):
+            # recycle a free obstacle that follows the newest one
+            self.n_pool_hits += 1
+            self.pool[(self.first + self.n_active) % len(self.pool)].respawn(opening)
+        else:
+            # pool exhausted: unroll the ring and grow it by one new obstacle
+            self.n_pool_misses += 1
+            self.pool = self.obstacles + [Obstacle(self.win, self.settings)]
+            self.first = 0
+            if opening is not None:
+                self.pool[-1].respawn(opening)
+        self.n_active += 1
+        self.n_unscored += 1
+        return True
 
     def check_if_hit(self, bird):
-        """Check if bird hit any obstacle.
         """
-        for obstacle in self.obstacles:
-            if obstacle.check_if_hit(bird):
+        Check if bird hit any obstacle.
+
+        Obstacles are sorted by x, so only those that horizontally
+        overlap with the bird during the last update are checked.
+        """
+        bird_box = bounding_box(bird)
+        capacity = len(self.pool)
+        for i in range(self.first, self.first + self.n_active):
+            obstacle = self.pool[i % capacity]
+            if obstacle.right < bird_box[0] - self.shift:
+                # already behind the bird
+                continue
+            if obstacle.left > bird_box[2]:
+                # this one and all that follow are still ahead
+                break
+            self.n_broad_tests += 1
+            if obstacle.check_if_hit(bird, bird_box, self.shift):
                 return True
 
         # we can be here only, if none of the obstacles were hit
         return False
 
+    def update_score(self):
+        """
+        Score obstacles cleared since the last call.
+
+        Obstacles are sorted by x, so only the oldest unscored obstacle
+        (the cursor) needs to be checked, typically once per frame.
+
+        Returns
+        ----------
+        int : Number of obstacles cleared since the last call, nonzero means
+              that the score changed and should be redrawn.
+        """
+        n_scored = 0
+        while self.n_unscored > 0:
+            obstacle = self.pool[(self.first + self.n_active - self.n_unscored) % len(self.pool)]
+            if obstacle.score() == 0:
+                break
+            self.n_unscored -= 1
+            n_scored += 1
+        self.total_score += n_scored
+        return n_scored
+
     def score(self):
         """
         Score all obstacles, adds one for every cleared obstacle.
@@ -202,7 +454,5 @@ class ObstaclesManager:
         ----------
         int
         """
-        for obstacle in self.obstacles:
-            self.total_score += obstacle.score()
+        self.update_score()
         return self.total_score
-        
\ No newline at end of file
@@ -0,0 +1,79 @@
+"""
+Stress test for collisions with stalled frames (5 to 200 ms hitches).
+
+Birds flap at random and fly through the same course twice: once with
+frames that occasionally stall and once with every stalled frame split into
+1 ms steps (reference). Flaps happen at the same times in both runs. A crash
+is missed if a bird crashed later than in the reference, i.e., it flew through
+an obstacle. We compare collision tests at the end of each frame with the
+swept test along the whole movement, which must not miss a single crash.
+"""
+
+import json
+
+import numpy as np
+
+from engine import FlappyEngine
+
+N_BIRDS = 10_000
+N_FRAMES = 600
+FRAME = 1 / 60
+REFERENCE_STEP = 0.001
+HITCHES = [0.005, 0.05, 0.1, 0.2]
+HITCH_PROBABILITY = 0.1
+SPEEDS = [0.5, 2.0]
+
+
+def fly(settings, frames, flaps, continuous, max_step=None):
+    """
+    Fly birds through a course frame by frame.
+
+    Parameters
+    ----------
+    settings : dict
+    frames : numpy.ndarray
+        Duration of each frame.
+    flaps : numpy.ndarray
+        n_frames x n_birds, whether bird flaps at the beginning of the frame.
+    continuous : bool
+        Whether to use swept collision tests.
+    max_step : float, optional
+        Frames longer than that are split into several steps.
+
+    Returns
+    ----------
+    numpy.ndarray : frame during which each bird crashed, number of frames if it did not
+    numpy.ndarray : obstacles cleared by each bird
+    """
+    engine = FlappyEngine(flaps.shape[1], settings, seed=0, continuous=continuous)
+    crash_frame = np.full(flaps.shape[1], len(frames))
+    no_flaps = np.zeros(flaps.shape[1], dtype=bool)
+    for iframe, (frame, frame_flaps) in enumerate(zip(frames, flaps)):
+        n_steps = 1 if max_step is None else int(np.ceil(frame / max_step))
+        for istep in range(n_steps):
+            _, crashed = engine.step(frame_flaps if istep == 0 else no_flaps, frame / n_steps)
+            crash_frame[crashed] = iframe
+    return crash_frame, engine.score.copy()
+
+
+if __name__ == "__main__":
+    with open('settings.json') as json_file:
+        settings = json.load(json_file)
+
+    rng = np.random.default_rng(0)
+    flaps = rng.random((N_FRAMES, N_BIRDS)) < 0.05
+
+    print("%8s %10s %12s %15s %15s %15s" % ("speed", "hitch [ms]", "collisions", "crashes", "missed crashes", "extra points"))
+    for speed in SPEEDS:
+        settings["Obstacles"]["Speed"] = speed
+        for hitch in HITCHES:
+            frames = np.where(rng.random(N_FRAMES) < HITCH_PROBABILITY, hitch, FRAME)
+            reference_crash, reference_score = fly(settings, frames, flaps, True, REFERENCE_STEP)
+            for continuous in [False, True]:
+                crash, score = fly(settings, frames, flaps, continuous)
+                missed = crash > reference_crash
+                print("%8.1f %10.0f %12s %15d %15d %15d" % (speed, 1000 * hitch, "swept" if continuous else "end of frame",
+                                                            np.sum(reference_crash < N_FRAMES), np.sum(missed),
+                                                            np.sum(np.maximum(score - reference_score, 0))))
+                if continuous:
+                    assert not np.any(missed), "swept test missed %d crashes at speed %.1f with %.0f ms hitches" % (np.sum(missed), speed, 1000 * hitch)
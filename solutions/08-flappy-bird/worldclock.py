@@ -0,0 +1,98 @@
+"""
+World clock that samples time once per frame.
+
+* WorldClock
+"""
+
+from psychopy import clock
+
+class WorldClock:
+    """
+    World clock that samples time once per frame.
+
+    Instead of every game object reading and resetting its own timer,
+    the main loop calls tick() once per frame and passes the resulting
+    time step to update(dt) of all objects, so they move in lockstep.
+    World time can run slower or faster than real time and can be paused,
+    e.g., for slow-motion replays.
+
+    Typical use in the main loop:
+
+        dt = world_clock.tick()
+        obstacles.update(dt)
+        bird.update(dt)
+
+    Properties
+    ----------
+    time_scale : float
+        Duration of one second of real time in world time, 0.5 is slow motion.
+    is_paused : logical
+        Whether world time is stopped.
+    get_time : callable
+        Returns current real time in seconds.
+    last_time : float
+        Real time of the last tick.
+    dt : float
+        World time step of the last tick.
+    time : float
+        World time since the last reset.
+    n_ticks : int
+        Number of ticks since the last reset.
+
+    Methods
+    ----------
+    reset() : Restart world time, e.g., at the beginning of a game.
+    tick() : Sample time for the new frame.
+    pause() : Stop world time.
+    resume() : Restart world time after a pause.
+    """
+
+    def __init__(self, time_scale=1.0, get_time=clock.getTime):
+        """
+        Parameters
+        ----------
+        time_scale : float, optional
+            Duration of one second of real time in world time.
+        get_time : callable, optional
+            Returns current real time in seconds.
+        """
+        self.time_scale = time_scale
+        self.get_time = get_time
+        self.is_paused = False
+        self.reset()
+
+    def reset(self):
+        """Restart world time, e.g., at the beginning of a game.
+        """
+        self.last_time = self.get_time()
+        self.dt = 0.0
+        self.time = 0.0
+        self.n_ticks = 0
+
+    def tick(self):
+        """
+        Sample time for the new frame.
+
+        Returns
+        ----------
+        float : World time elapsed since the previous tick, zero while paused.
+        """
+        now = self.get_time()
+        if self.is_paused:
+            self.dt = 0.0
+        else:
+            self.dt = (now - self.last_time) * self.time_scale
+        self.last_time = now
+        self.time += self.dt
+        self.n_ticks += 1
+        return self.dt
+
+    def pause(self):
+        """Stop world time.
+        """
+        self.is_paused = True
+
+    def resume(self):
+        """Restart world time after a pause.
+        """
+        self.is_paused = False
@@ -0,0 +1,56 @@
+"""
+Simulated players for adaptive difficulty procedures.
+
+Each simulated player hits a target with a probability that falls off with
+the speed factor (logistic on log scale, 2% lapses), thresholds and slopes
+vary between players. For each procedure we count trials until its estimate
+of the speed factor at 79.4% hits stays within 10% of the true value, and
+time its updates.
+"""
+
+import json
+import time
+
+import numpy as np
+
+from difficulty import TARGET_PERFORMANCE, BayesianStaircase, PsychoPyStaircase, UpDownStaircase
+
+N_PLAYERS = 100
+N_TRIALS = 300
+LAPSE = 0.02
+TOLERANCE = np.log(1.1)
+
+if __name__ == "__main__":
+    with open('settings.json') as json_file:
+        settings = json.load(json_file)["Target"]
+
+    rng = np.random.default_rng(0)
+    thresholds = np.log(rng.uniform(0.7, 3, N_PLAYERS))
+    slopes = rng.uniform(2, 8, N_PLAYERS)
+    true_speeds = np.exp(thresholds + np.log((1 - LAPSE) / TARGET_PERFORMANCE - 1) / slopes)
+
+    procedures = {"3-up-1-down" : lambda: UpDownStaircase(settings["Staircase multuplier"]),
+                  "PsychoPy staircase" : PsychoPyStaircase,
+                  "Bayesian" : BayesianStaircase}
+    print("%20s %20s %20s %15s %15s" % ("procedure", "trials to converge", "not converged [%]", "final error [%]", "update [ms]"))
+    for name, procedure in procedures.items():
+        converged = np.full(N_PLAYERS, N_TRIALS)
+        errors = np.zeros(N_PLAYERS)
+        durations = []
+        for iplayer in range(N_PLAYERS):
+            difficulty = procedure()
+            estimate_errors = np.zeros(N_TRIALS)
+            for itrial in range(N_TRIALS):
+                x = np.log(difficulty.speed_factor)
+                p_hit = (1 - LAPSE) / (1 + np.exp(slopes[iplayer] * (x - thresholds[iplayer])))
+                start = time.perf_counter()
+                difficulty.update(rng.random() < p_hit)
+                durations.append(time.perf_counter() - start)
+                estimate_errors[itrial] = abs(np.log(difficulty.threshold / true_speeds[iplayer]))
+
+            # first trial after which the estimate stays within tolerance
+            outside = np.flatnonzero(estimate_errors > TOLERANCE)
+            converged[iplayer] = 0 if len(outside) == 0 else outside[-1] + 1
+            errors[iplayer] = estimate_errors[-1]
+        print("%20s %20.0f %20.0f %15.1f %15.3f" % (name, np.median(converged), 100 * np.mean(converged == N_TRIALS),
+                                                  100 * (np.exp(np.mean(errors)) - 1), 1000 * np.mean(durations)))
@@ -0,0 +1,86 @@
+"""
+Response timing with background key capture versus polling once per frame.
+
+A simulated keyboard produces key presses at random times, each exactly
+when a target of the standard speed is at the finish line, so a perfect
+score is 10. The game loop runs at 60 frames per second and collects keys
+after each frame. Polling uses the time when keys are collected, as
+event.getKeys() after win.flip() does, and background capture uses the
+time of the key press. We report latencies and the score lost to polling.
+"""
+
+import json
+import time
+
+import numpy as np
+from psychopy import clock
+
+from keycapture import KeyCapture
+
+N_PRESSES = 500
+FRAME = 1 / 60
+RESPONSE_KEYS = ["left", "down", "right"]
+
+
+class SimulatedKeyPress:
+    """Key press as reported by psychopy.hardware.keyboard.Keyboard.
+    """
+    def __init__(self, name, rt):
+        self.name = name
+        self.rt = rt
+
+
+class SimulatedKeyboard:
+    """
+    Keyboard that presses keys at given times.
+
+    Properties
+    ----------
+    clock : clock.Clock
+    presses : list
+        (press time, key) on the psychopy.clock.getTime() scale, in order of time.
+    ipress : int
+        Next press to report.
+    """
+    def __init__(self, presses):
+        self.clock = clock.Clock()
+        self.presses = presses
+        self.ipress = 0
+
+    def clearEvents(self):
+        pass
+
+    def getKeys(self, keyList=None, waitRelease=False, clear=True):
+        now = clock.getTime()
+        keys = []
+        while self.ipress < len(self.presses) and self.presses[self.ipress][0] <= now:
+            press_time, name = self.presses[self.ipress]
+            keys.append(SimulatedKeyPress(name, press_time - self.clock.getLastResetTime()))
+            self.ipress += 1
+        return keys
+
+
+if __name__ == "__main__":
+    with open('settings.json') as json_file:
+        settings = json.load(json_file)["Target"]
+
+    rng = np.random.default_rng(0)
+    start = clock.getTime() + 0.1
+    press_times = start + np.sort(rng.uniform(0, N_PRESSES / 20, N_PRESSES))
+    presses = [(press_time, RESPONSE_KEYS[rng.integers(len(RESPONSE_KEYS))]) for press_time in press_times]
+
+    key_capture = KeyCapture(RESPONSE_KEYS, kb=SimulatedKeyboard(presses))
+    with key_capture:
+        next_frame = start
+        while len(key_capture.latencies) < N_PRESSES and clock.getTime() < press_times[-1] + 1:
+            # update, draw, and flip take the rest of the frame
+            next_frame += FRAME
+            time.sleep(max(next_frame - clock.getTime(), 0))
+            key_capture.get_keys()
+    print(key_capture.report())
+
+    # score drops by 1 for every 10% of the half height that the target is away from the line,
+    # with background capture the target position is interpolated to the press time, so nothing is lost
+    polling_latency = np.array(key_capture.latencies)[:, 1]
+    scores = np.clip(np.floor(10 - 10 * settings["Speed"] * polling_latency / (settings["Height"] / 2)), 0, 10)
+    print("Frame polling: mean score %.2f instead of 10, %.1f%% perfect scores" % (np.mean(scores), 100 * np.mean(scores == 10)))
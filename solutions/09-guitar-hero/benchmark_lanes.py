@@ -0,0 +1,86 @@
+"""
+Cost of hit lookup and miss detection with dense charts (20 to 200 notes per second).
+
+Targets are added at a fixed rate, fall until they leave the screen, and a
+key is pressed in a random lane every frame. We compare scanning all targets
+on the screen for the oldest unscored one in the lane (as before) with the
+per-lane queues of TargetArray, which only look at the front of each queue.
+Both must give the same scores.
+"""
+
+import json
+import time
+
+import numpy as np
+from psychopy import visual
+
+from timed_response import TargetArray
+
+NOTES_PER_SECOND = [20, 50, 100, 200]
+FRAMES = 2000
+DT = 1 / 60
+
+
+def scan_check(targets, ipos, yline):
+    """
+    Score the oldest unscored target at the position by scanning all targets.
+
+    Parameters
+    ----------
+    targets : TargetArray
+    ipos : int
+    yline : float
+
+    Returns
+    ----------
+    int : Score.
+    """
+    slots = targets.slots
+    score = (10 - 10 * np.abs(targets.y[slots] - yline) / (targets.settings["Height"] / 2)).astype(int)
+    candidates = np.flatnonzero((targets.ipos[slots] == ipos) & (targets.score[slots] == 0) & (score > 0))
+    if len(candidates) == 0:
+        return 0
+    islot = slots[candidates[0]]
+    targets.score[islot] = score[candidates[0]]
+    return targets.score[islot]
+
+
+# getting settings
+with open('settings.json') as json_file:
+    settings = json.load(json_file)
+yline = settings["Target"]["Finish line Y"]
+
+win = visual.Window(size=settings['Window']['Size'])
+
+print("%15s %10s %12s %15s %10s" % ("notes per second", "on screen", "lookup", "us per frame", "hits"))
+for notes_per_second in NOTES_PER_SECOND:
+    rng = np.random.default_rng(0)
+    chart = rng.integers(0, len(settings["Target"]["Position"]), FRAMES * 10)
+    presses = rng.integers(0, len(settings["Target"]["Position"]), FRAMES)
+
+    results = {}
+    for lookup in ["scan", "lane queues"]:
+        targets = TargetArray(win, settings["Target"])
+        inote = 0
+        duration = 0
+        hits = []
+        for iframe in range(FRAMES):
+            targets.fall(DT)
+            while inote < notes_per_second * iframe * DT:
+                targets.add(chart[inote], settings["Target"]["Speed"])
+                inote += 1
+
+            start = time.perf_counter()
+            if lookup == "scan":
+                score = scan_check(targets, presses[iframe], yline)
+            else:
+                targets.expire(yline)
+                score = targets.check(presses[iframe], yline)
+            duration += time.perf_counter() - start
+            targets.remove_below_the_screen()
+            hits.append(score)
+        results[lookup] = hits
+        print("%15d %10d %12s %15.2f %10d" % (notes_per_second, targets.n, lookup, 1e6 * duration / FRAMES, np.count_nonzero(hits)))
+    assert results["scan"] == results["lane queues"], "Lookups disagree"
+
+win.close()
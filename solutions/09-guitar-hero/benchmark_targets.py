@@ -0,0 +1,60 @@
+"""
+Compare moving and drawing targets one by one with the TargetArray.
+
+Hundreds of targets are on the screen, they fall fast and new ones are added
+every frame, old ones leave the screen. We time update and draw of each frame.
+"""
+
+import json
+import time
+
+from psychopy import visual
+
+from timed_response import Target, TargetArray
+
+N_TARGETS = [10, 100, 500]
+FRAMES = 300
+DT = 1 / 60
+
+# getting settings
+with open('settings.json') as json_file:
+    settings = json.load(json_file)
+
+win = visual.Window(size=settings['Window']['Size'])
+
+print("%10s %12s %15s" % ("targets", "storage", "ms per frame"))
+for n_targets in N_TARGETS:
+    # targets leave the screen after n_targets frames
+    speed = 2.2 / (n_targets * DT)
+
+    # one visual.Rect per target
+    targets = []
+    start = time.perf_counter()
+    for iframe in range(n_targets + FRAMES):
+        if iframe == n_targets:
+            start = time.perf_counter()
+        for target in targets:
+            target.fall()
+        while targets and targets[0].is_below_the_screen:
+            targets.pop(0)
+        targets.append(Target(win, settings["Target"], speed, iframe % 3))
+        for target in targets:
+            target.draw()
+        win.flip()
+    duration = time.perf_counter() - start
+    print("%10d %12s %15.3f" % (n_targets, "objects", 1000 * duration / FRAMES))
+
+    # arrays
+    target_array = TargetArray(win, settings["Target"])
+    for iframe in range(n_targets + FRAMES):
+        if iframe == n_targets:
+            start = time.perf_counter()
+        target_array.fall(DT)
+        target_array.remove_below_the_screen()
+        target_array.add(iframe % 3, speed)
+        target_array.draw()
+        win.flip()
+    duration = time.perf_counter() - start
+    print("%10d %12s %15.3f" % (n_targets, "arrays", 1000 * duration / FRAMES))
+
+win.close()
@@ -0,0 +1,62 @@
+"""
+Cost of trial logging in the game loop and recovery after a crash.
+
+We time TrialLogger.log() calls, one trial per frame, while the background
+thread writes them, and compare it with writing and flushing every trial to
+the file right away. Then we simulate a crash in the middle of writing a row
+and recover the log.
+"""
+
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from timed_response import TRIAL_COLUMNS
+from triallog import TrialLogger, load_trials, recover_sessions
+
+N_TRIALS = 10_000
+
+if __name__ == "__main__":
+    folder = tempfile.mkdtemp()
+
+    # logging via the background thread
+    durations = np.zeros(N_TRIALS)
+    logger = TrialLogger(os.path.join(folder, "background.csv"), TRIAL_COLUMNS, flush_interval=0.05)
+    for itrial in range(N_TRIALS):
+        start = time.perf_counter()
+        logger.log(time.perf_counter(), itrial % 3, itrial % 10, 1.0)
+        durations[itrial] = time.perf_counter() - start
+
+        # rest of the frame
+        time.sleep(0.0001)
+    logger.close()
+    print("%20s: mean %.2f us, 99.9%% %.2f us, max %.2f us per trial" % ("background thread", 1e6 * np.mean(durations),
+                                                                      1e6 * np.percentile(durations, 99.9), 1e6 * np.max(durations)))
+
+    # writing and flushing every trial in the game loop
+    with open(os.path.join(folder, "direct.csv"), "w") as log_file:
+        for itrial in range(N_TRIALS):
+            start = time.perf_counter()
+            log_file.write("%f,%d,%d,%f\n" % (time.perf_counter(), itrial % 3, itrial % 10, 1.0))
+            log_file.flush()
+            os.fsync(log_file.fileno())
+            durations[itrial] = time.perf_counter() - start
+    print("%20s: mean %.2f us, 99.9%% %.2f us, max %.2f us per trial" % ("direct write", 1e6 * np.mean(durations),
+                                                                      1e6 * np.percentile(durations, 99.9), 1e6 * np.max(durations)))
+
+    # crash while writing the last row: no sidecar, incomplete line
+    crashed = os.path.join(folder, "sessions", "crashed.csv")
+    logger = TrialLogger(crashed, TRIAL_COLUMNS, sidecar=False)
+    for itrial in range(100):
+        logger.log(itrial * 0.5, itrial % 3, 10, 1.0)
+    logger.close()
+    with open(crashed, "a") as log_file:
+        log_file.write("50.0,1,")
+    print("Recovered: %s, %d trials" % (recover_sessions(os.path.dirname(crashed)), len(load_trials(crashed)["time"])))
+
+    # restarting the crashed session continues the log
+    with TrialLogger(crashed, TRIAL_COLUMNS) as logger:
+        logger.log(50.0, 1, 10, 1.0)
+    print("Resumed: %d trials" % len(np.load(crashed.replace(".csv", ".npz"))["time"]))
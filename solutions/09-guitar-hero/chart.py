@@ -0,0 +1,275 @@
+"""
+Charts: timestamped notes per lane, and a scheduler that spawns them in time.
+
+Charts are written as text files, one note per line: time in seconds since
+the start of the song and the lane (position index), e.g.,
+
+    # time [s]  lane
+    1.000       0
+    1.500       2
+
+Empty lines and lines starting with # are ignored. Lanes must be within
+the positions of targets in settings.json. For fast loading, the
+text is compiled into a binary file next to it (same name, .chart extension):
+a header followed by float64 times and uint8 lanes, which is memory-mapped
+instead of being read and parsed. The binary file is rebuilt whenever the
+text is newer.
+
+Run this file as
+
+    python chart.py <chart.txt>
+
+to compile a chart, checking lanes against settings.json.
+
+* Chart
+* parse_chart(filename, n_lanes)
+* load_chart(filename, n_lanes)
+* ChartScheduler
+"""
+
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+
+MAGIC = b"GHCH"
+VERSION = 1
+
+# magic, version, number of notes
+HEADER = struct.Struct("<4sBI")
+
+# lanes are stored as uint8
+MAX_LANES = 256
+
+
+class Chart:
+    """
+    Notes sorted by time.
+
+    Properties
+    ----------
+    time : numpy.ndarray
+        Time when each note must reach the finish line, in seconds since the start of the song.
+    lane : numpy.ndarray
+        Position index of each note.
+    n_notes : int
+    duration : float
+        Time of the last note.
+
+    Methods
+    ----------
+    to_bytes() : Encode chart.
+    save(filename) : Save chart to a binary file.
+    """
+
+    def __init__(self, time, lane):
+        """
+        Parameters
+        ----------
+        time : numpy.ndarray
+        lane : numpy.ndarray
+        """
+        self.time = np.asarray(time, dtype=np.float64)
+        self.lane = np.asarray(lane, dtype=np.uint8)
+
+    @property
+    def n_notes(self):
+        """int : Number of notes.
+        """
+        return len(self.time)
+
+    @property
+    def duration(self):
+        """float : Time of the last note.
+        """
+        return float(self.time[-1]) if self.n_notes > 0 else 0.0
+
+    def to_bytes(self):
+        """
+        Encode chart.
+
+        Returns
+        ----------
+        bytes
+        """
+        return (HEADER.pack(MAGIC, VERSION, self.n_notes) +
+                self.time.astype("<f8").tobytes() +
+                self.lane.tobytes())
+
+    def save(self, filename):
+        """
+        Save chart to a binary file.
+
+        Parameters
+        ----------
+        filename : str
+        """
+        with open(filename, "wb") as chart_file:
+            chart_file.write(self.to_bytes())
+
+
+def parse_chart(filename, n_lanes=MAX_LANES):
+    """
+    Read chart from a text file.
+
+    Parameters
+    ----------
+    filename : str
+    n_lanes : int, optional
+        Number of lanes, notes must be in lanes 0..n_lanes-1.
+
+    Returns
+    ----------
+    Chart
+    """
+    times = []
+    lanes = []
+    with open(filename) as chart_file:
+        for iline, line in enumerate(chart_file, start=1):
+            line = line.split("#")[0].strip()
+            if not line:
+                continue
+            try:
+                note_time, lane = line.split()
+                times.append(float(note_time))
+                lanes.append(int(lane))
+            except ValueError:
+                raise ValueError("%s, line %d: expected time and lane, got '%s'." % (filename, iline, line))
+            if not 0 <= lanes[-1] < n_lanes:
+                raise ValueError("%s, line %d: lane %d is not within 0..%d." % (filename, iline, lanes[-1], n_lanes - 1))
+
+    # notes must be in order of time for scheduling
+    order = np.argsort(times, kind="stable")
+    return Chart(np.array(times)[order], np.array(lanes, dtype=int)[order])
+
+
+def load_chart(filename, n_lanes=MAX_LANES):
+    """
+    Load chart, compiling the text file into a binary one, if needed.
+
+    Parameters
+    ----------
+    filename : str
+        Text or binary (.chart) chart file.
+    n_lanes : int, optional
+        Number of lanes, notes must be in lanes 0..n_lanes-1.
+
+    Returns
+    ----------
+    Chart : with arrays memory-mapped from the binary file.
+    """
+    binary_filename = os.path.splitext(filename)[0] + ".chart"
+    if filename != binary_filename:
+        if not os.path.exists(binary_filename) or os.path.getmtime(binary_filename) < os.path.getmtime(filename):
+            parse_chart(filename, n_lanes).save(binary_filename)
+
+    with open(binary_filename, "rb") as chart_file:
+        magic, version, n_notes = HEADER.unpack(chart_file.read(HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("%s is not a chart file (version %d)." % (binary_filename, VERSION))
+    if n_notes == 0:
+        return Chart([], [])
+
+    time = np.memmap(binary_filename, dtype="<f8", mode="r", offset=HEADER.size, shape=n_notes)
+    lane = np.memmap(binary_filename, dtype=np.uint8, mode="r", offset=HEADER.size + 8 * n_notes, shape=n_notes)
+    if lane.max() >= n_lanes:
+        # compiled for more lanes, parsing the text points to the offending line
+        if filename != binary_filename:
+            parse_chart(filename, n_lanes)
+        raise ValueError("%s: lane %d is not within 0..%d." % (binary_filename, lane.max(), n_lanes - 1))
+    return Chart(time, lane)
+
+
+class ChartScheduler:
+    """
+    Spawns chart notes, so that each reaches the finish line exactly at its time.
+
+    Targets are moved by the time elapsed on the song clock, not by frames,
+    and notes that are spawned late (e.g., after a long frame) are placed
+    where they would have been if spawned on time.
+
+    Properties
+    ----------
+    chart : Chart
+    settings : dict
+        Target settings.
+    get_time : callable
+        Returns time since the start of the song, in seconds.
+    inote : int
+        Index of the next note to spawn.
+    last_time : float
+        Song time of the previous update.
+
+    Methods
+    ----------
+    update(targets, speed) : Move targets and spawn notes that are due.
+    is_over() : Whether all notes were spawned.
+    """
+
+    def __init__(self, chart, settings, get_time):
+        """
+        Parameters
+        ----------
+        chart : Chart
+        settings : dict
+        get_time : callable
+        """
+        self.chart = chart
+        self.settings = settings
+        self.get_time = get_time
+        self.inote = 0
+        self.last_time = get_time()
+
+    def update(self, targets, speed):
+        """
+        Move targets and spawn notes that are due.
+
+        Parameters
+        ----------
+        targets : TargetArray
+        speed : float
+            Speed of new targets in norm units per second.
+
+        Returns
+        ----------
+        int : Number of spawned notes.
+        """
+        now = self.get_time()
+        targets.fall(now - self.last_time)
+        self.last_time = now
+
+        # note appears at the top of the screen, travel time depends on current speed
+        yline = self.settings["Finish line Y"]
+        travel_time = (1 - self.settings["Height"] / 2 - yline) / speed
+        n_spawned = 0
+        while self.inote < self.chart.n_notes and self.chart.time[self.inote] - travel_time <= now:
+            note_time = float(self.chart.time[self.inote])
+            targets.add(int(self.chart.lane[self.inote]), speed, y=yline + speed * (note_time - now))
+            self.inote += 1
+            n_spawned += 1
+        return n_spawned
+
+    def is_over(self):
+        """
+        Whether all notes were spawned.
+
+        Returns
+        ----------
+        logical
+        """
+        return self.inote >= self.chart.n_notes
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python chart.py <chart.txt>")
+        sys.exit(1)
+
+    with open('settings.json') as json_file:
+        settings = json.load(json_file)
+
+    chart = load_chart(sys.argv[1], len(settings["Target"]["Position"]))
+    print("%d notes, %.1f seconds, %.1f notes per second" %
+          (chart.n_notes, chart.duration, chart.n_notes / chart.duration if chart.duration > 0 else 0))
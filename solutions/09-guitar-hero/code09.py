@@ -1,12 +1,26 @@
 """
 Guitar hero game.
+
+Run as
+
+    python code09.py [chart.txt [song.wav]]
+
+to play notes from a chart (see chart.py), optionally along with a song.
+Random targets are used if no chart is given.
 """
 
 import json
+import os
+import sys
+import time
 
-from psychopy import clock, event, visual
+from psychopy import clock, event, sound, visual
 
-from timed_response import TimedResponseTaskPsychoPy
+from chart import load_chart
+from difficulty import BayesianStaircase
+from keycapture import KeyCapture
+from timed_response import TRIAL_COLUMNS, TimedResponseTaskPsychoPy
+from triallog import TrialLogger, recover_sessions
 from scoreboard import ScoreBoard
 
 RESPONSE_KEYS = ["left", "down", "right"]
@@ -17,15 +31,47 @@ with open('settings.json') as json_file:
 
 win = visual.Window(size=settings['Window']['Size'])
 
+# optional chart and song
+chart = load_chart(sys.argv[1], len(settings["Target"]["Position"])) if len(sys.argv) > 1 else None
+song = sound.Sound(sys.argv[2]) if len(sys.argv) > 2 else None
+
+# trial logs of sessions that did not end cleanly are repaired
+for filename in recover_sessions("logs"):
+    print("Recovered trial log %s" % filename)
+session = time.strftime("%Y-%m-%d-%H-%M-%S")
+iround = 0
+
+# responses are timestamped on a background thread
+key_capture = KeyCapture(RESPONSE_KEYS)
+key_capture.start()
+
 # main loop
 show_must_go_on = True
 while show_must_go_on:
 
-    round_timer = clock.CountdownTimer(settings["Duration [s]"])
+    # chart round lasts until its last note is gone
+    round_timer = clock.CountdownTimer(settings["Duration [s]"] if chart is None else chart.duration + 1)
+
+    # song clock starts together with the song
+    song_clock = clock.Clock()
+    if song is not None:
+        song.stop()
+        song.play()
+        song_clock.reset()
+
+    # trials are logged as they happen
+    iround += 1
+    logger = TrialLogger(os.path.join("logs", "%s-round-%d.csv" % (session, iround)), TRIAL_COLUMNS)
+
     # visuals
-    timed_task = TimedResponseTaskPsychoPy(win, settings["Target"])
+    # "bayesian" difficulty uses psi method instead of PsychoPy staircase
+    difficulty = BayesianStaircase() if settings["Target"]["Difficulty"] == "bayesian" else None
+    timed_task = TimedResponseTaskPsychoPy(win, settings["Target"], chart, song_clock.getTime, logger, difficulty)
     scoreboard = ScoreBoard(win)
 
+    # keys pressed between rounds do not count
+    key_capture.get_keys()
+
     # round loop
     while show_must_go_on and round_timer.getTime() > 0:
         # move game objects
@@ -37,17 +83,19 @@ while show_must_go_on:
         win.flip()
 
         # inputs check
-        keys = event.getKeys(keyList=["escape"] + RESPONSE_KEYS)
-        if keys:
-            if keys[0] == "escape":
-                # abort
-                show_must_go_on = False
-            else:
-                # response
-                ipos = RESPONSE_KEYS.index(keys[0])
-                scoreboard += timed_task.check(ipos)
+        if event.getKeys(keyList=["escape"]):
+            # abort
+            show_must_go_on = False
+
+        # responses, scored at the time of the key press
+        for key, press_time in key_capture.get_keys():
+            scoreboard += timed_task.check(RESPONSE_KEYS.index(key), press_time)
+
+    if song is not None:
+        song.stop()
 
     # saving logs, even partial log for aborted round is better than no log
+    logger.close()
     timed_task.save()
 
     if show_must_go_on: # we are out of time, not aborted via escape
@@ -61,5 +109,7 @@ while show_must_go_on:
         keys = event.waitKeys(keyList=["escape", "space"])
         show_must_go_on = keys[0] == "space"
 
+key_capture.stop()
+print(key_capture.report())
 
 win.close()
@@ -0,0 +1,334 @@
+"""
+Adaptive difficulty procedures for the timed response task.
+
+All procedures share the same interface, so tasks can use any of them:
+
+    speed_factor : float
+        Speed factor for upcoming targets.
+    threshold : float
+        Current estimate of the speed factor at which the player hits 79.4% of targets.
+    update(correct) : Account for a response and pick the next speed factor.
+    save(filename) : Save log of the procedure.
+
+* UpDownStaircase
+* PsychoPyStaircase
+* BayesianStaircase
+"""
+
+import numpy as np
+from psychopy import data
+
+# performance that 3-up-1-down staircases converge to
+TARGET_PERFORMANCE = 0.794
+
+# threshold of staircases is estimated from that many last reversals
+N_REVERSALS = 6
+
+
+def reversals_mean(reversals, speed_factor):
+    """
+    Geometric mean of the last reversals.
+
+    Parameters
+    ----------
+    reversals : list
+        Speed factors at reversals.
+    speed_factor : float
+        Used if there were no reversals yet.
+
+    Returns
+    ----------
+    float
+    """
+    if not reversals:
+        return speed_factor
+    return float(np.exp(np.mean(np.log(reversals[-N_REVERSALS:]))))
+
+
+class UpDownStaircase:
+    """
+    Hand-rolled 3-up-1-down staircase: speed goes up after three hits in a row and down after a miss.
+
+    Properties
+    ----------
+    multiplier : float
+        Speed factor is multiplied or divided by it.
+    speed_factor : float
+    correct_in_a_row : int
+        Staircase counter.
+    direction : int
+        Direction of the last change, +1 for up, -1 for down, 0 if none yet.
+    reversals : list
+        Speed factors at which the direction changed.
+    history : list
+        (speed factor, correct) for every response.
+    threshold : float
+
+    Methods
+    ----------
+    update(correct) : Account for a response and pick the next speed factor.
+    save(filename) : Save responses.
+    """
+    def __init__(self, multiplier, speed_factor=1):
+        """
+        Parameters
+        ----------
+        multiplier : float
+        speed_factor : float, optional
+            Initial speed factor.
+        """
+        self.multiplier = multiplier
+        self.speed_factor = speed_factor
+        self.correct_in_a_row = 0
+        self.direction = 0
+        self.reversals = []
+        self.history = []
+
+    @property
+    def threshold(self):
+        """float : Geometric mean of the last reversals.
+        """
+        return reversals_mean(self.reversals, self.speed_factor)
+
+    def update(self, correct):
+        """
+        Account for a response and pick the next speed factor.
+
+        Parameters
+        ----------
+        correct : logical
+        """
+        self.history.append((self.speed_factor, correct))
+        if correct:
+            # up
+            self.correct_in_a_row += 1
+            if self.correct_in_a_row == 3:
+                self.change(1)
+        else:
+            # down
+            self.change(-1)
+
+    def change(self, direction):
+        """
+        Change speed factor.
+
+        Parameters
+        ----------
+        direction : int
+            +1 for up, -1 for down.
+        """
+        if self.direction != 0 and direction != self.direction:
+            self.reversals.append(self.speed_factor)
+        self.direction = direction
+        self.speed_factor *= self.multiplier ** direction
+        self.correct_in_a_row = 0
+
+    def save(self, filename):
+        """
+        Save responses.
+
+        Parameters
+        ----------
+        filename : str
+            Without extension.
+        """
+        np.savetxt(filename + ".txt", np.array(self.history, dtype=float).reshape(-1, 2),
+                   delimiter=",", header="speed_factor,correct", comments="")
+
+
+class PsychoPyStaircase:
+    """
+    1-up-3-down staircase of PsychoPy on logarithmic scale.
+
+    Properties
+    ----------
+    stairhandler : data.StairHandler
+    speed_factor : float
+    threshold : float
+
+    Methods
+    ----------
+    update(correct) : Account for a response and pick the next speed factor.
+    save(filename) : Save log of the staircase.
+    """
+    def __init__(self, speed_factor=1):
+        """
+        Parameters
+        ----------
+        speed_factor : float, optional
+            Initial speed factor.
+        """
+        self.stairhandler = data.StairHandler(startVal=speed_factor, nUp=1, nDown=3, stepType="log", stepSizes=-0.1, nTrial=1000, nReversals=1000)
+        self.speed_factor = next(self.stairhandler)
+
+    @property
+    def threshold(self):
+        """float : Geometric mean of the last reversals.
+        """
+        return reversals_mean(self.stairhandler.reversalIntensities, self.speed_factor)
+
+    def update(self, correct):
+        """
+        Account for a response and pick the next speed factor.
+
+        Parameters
+        ----------
+        correct : logical
+        """
+        self.stairhandler.addResponse(correct)
+        self.speed_factor = next(self.stairhandler)
+
+    def save(self, filename):
+        """
+        Save log of the staircase.
+
+        Parameters
+        ----------
+        filename : str
+            Without extension.
+        """
+        self.stairhandler.saveAsText(filename + ".txt")
+
+
+class BayesianStaircase:
+    """
+    Bayesian adaptive procedure (psi method) over a grid of psychometric functions.
+
+    Probability of a hit decreases with log speed factor x as
+        guess + (1 - guess - lapse) / (1 + exp(slope * (x - threshold)))
+    Posterior over a grid of thresholds and slopes is updated after every
+    response and next speed factor is the one that minimizes the expected
+    entropy of the posterior. Both need only matrix-vector products with
+    precomputed likelihood tables.
+
+    Properties
+    ----------
+    speeds : numpy.ndarray
+        Speed factors to choose from.
+    thresholds, slopes : numpy.ndarray
+        Grid of psychometric function parameters, log speed factor and per log speed factor.
+    guess, lapse : float
+    hit, log_hit, hit_log_hit : numpy.ndarray
+        speeds x grid tables with probability of a hit, its log, and their product.
+    miss, log_miss, miss_log_miss : numpy.ndarray
+        Same for misses.
+    posterior : numpy.ndarray
+        Over flattened grid.
+    ispeed : int
+        Index of the current speed factor.
+    history : list
+        (speed factor, correct) for every response.
+    speed_factor : float
+    threshold : float
+
+    Methods
+    ----------
+    update(correct) : Account for a response and pick the next speed factor.
+    next_speed() : Speed factor with the lowest expected entropy of the posterior.
+    estimate() : Posterior mean threshold and slope.
+    save(filename) : Save responses and final estimates.
+    """
+    def __init__(self, speeds=np.geomspace(0.25, 8, 41), thresholds=np.geomspace(0.25, 8, 41),
+                 slopes=np.geomspace(0.5, 20, 15), guess=0.0, lapse=0.02):
+        """
+        Parameters
+        ----------
+        speeds : numpy.ndarray, optional
+        thresholds : numpy.ndarray, optional
+            In speed factor units.
+        slopes : numpy.ndarray, optional
+        guess : float, optional
+            Probability of hitting a target by chance.
+        lapse : float, optional
+            Probability of missing an easy target.
+        """
+        self.speeds = np.asarray(speeds, dtype=float)
+        self.thresholds = np.log(thresholds)
+        self.slopes = np.asarray(slopes, dtype=float)
+        self.guess = guess
+        self.lapse = lapse
+
+        # speeds x thresholds x slopes, grid is flattened
+        x = np.log(self.speeds)[:, None, None]
+        hit = guess + (1 - guess - lapse) / (1 + np.exp(self.slopes[None, None, :] * (x - self.thresholds[None, :, None])))
+        self.hit = np.clip(hit.reshape(len(self.speeds), -1), 1e-12, 1 - 1e-12)
+        self.miss = 1 - self.hit
+        self.log_hit = np.log(self.hit)
+        self.log_miss = np.log(self.miss)
+        self.hit_log_hit = self.hit * self.log_hit
+        self.miss_log_miss = self.miss * self.log_miss
+
+        # uniform prior
+        self.posterior = np.full(self.hit.shape[1], 1 / self.hit.shape[1])
+        self.history = []
+        self.ispeed = self.next_speed()
+
+    @property
+    def speed_factor(self):
+        """float : Speed factor for upcoming targets.
+        """
+        return self.speeds[self.ispeed]
+
+    @property
+    def threshold(self):
+        """float : Speed factor at which the player hits TARGET_PERFORMANCE of targets.
+        """
+        threshold, slope = self.estimate()
+        return float(np.exp(threshold + np.log((1 - self.guess - self.lapse) / (TARGET_PERFORMANCE - self.guess) - 1) / slope))
+
+    def update(self, correct):
+        """
+        Account for a response and pick the next speed factor.
+
+        Parameters
+        ----------
+        correct : logical
+        """
+        self.history.append((self.speed_factor, correct))
+        self.posterior *= self.hit[self.ispeed] if correct else self.miss[self.ispeed]
+        self.posterior /= self.posterior.sum()
+        self.ispeed = self.next_speed()
+
+    def next_speed(self):
+        """
+        Speed factor with the lowest expected entropy of the posterior.
+
+        Returns
+        ----------
+        int : index of the speed factor.
+        """
+        # entropy after a response r at each speed:
+        # log p(r) - sum(posterior * p(r | grid) * (log posterior + log p(r | grid))) / p(r)
+        posterior_log_posterior = self.posterior * np.log(np.maximum(self.posterior, 1e-300))
+        expected_entropy = 0
+        for p, p_log_p in [(self.hit, self.hit_log_hit), (self.miss, self.miss_log_miss)]:
+            p_response = p @ self.posterior
+            entropy = np.log(p_response) - (p @ posterior_log_posterior + p_log_p @ self.posterior) / p_response
+            expected_entropy = expected_entropy + p_response * entropy
+        return int(np.argmin(expected_entropy))
+
+    def estimate(self):
+        """
+        Posterior mean threshold and slope.
+
+        Returns
+        ----------
+        float : threshold, log speed factor
+        float : slope
+        """
+        posterior = self.posterior.reshape(len(self.thresholds), len(self.slopes))
+        return float(self.thresholds @ posterior.sum(axis=1)), float(self.slopes @ posterior.sum(axis=0))
+
+    def save(self, filename):
+        """
+        Save responses and final estimates.
+
+        Parameters
+        ----------
+        filename : str
+            Without extension.
+        """
+        threshold, slope = self.estimate()
+        np.savetxt(filename + ".txt", np.array(self.history, dtype=float).reshape(-1, 2),
+                   delimiter=",", header="speed_factor,correct", comments="",
+                   footer="# threshold %f, slope %f, speed factor at %.1f%% hits %f" % (np.exp(threshold), slope, 100 * TARGET_PERFORMANCE, self.threshold))
@@ -0,0 +1,135 @@
+"""
+Timestamped keyboard capture on a background thread.
+
+Polling event.getKeys() once per frame after win.flip() tells us only that
+a key was pressed sometime during the last frame. KeyCapture drains a
+psychopy.hardware.keyboard.Keyboard (psychtoolbox backend, which timestamps
+key presses as they happen) every millisecond on a background thread and
+puts (key, press time) pairs into a queue. The queue is a collections.deque:
+appending on one end and popping from the other is atomic, so neither
+thread needs a lock. Times are on the psychopy.clock.getTime() scale.
+
+* KeyCapture
+"""
+
+import threading
+import time
+from collections import deque
+
+import numpy as np
+from psychopy import clock
+from psychopy.hardware import keyboard
+
+
+class KeyCapture:
+    """
+    Background keyboard capture.
+
+    Properties
+    ----------
+    key_list : list
+        Keys to capture, all keys if None.
+    poll_interval : float
+        Time between polls of the keyboard in seconds.
+    keyboard : psychopy.hardware.keyboard.Keyboard
+    events : collections.deque
+        Captured (key, press time, capture time) tuples, not yet collected.
+    latencies : list
+        (capture time - press time, collection time - press time) for every collected key.
+    thread : threading.Thread
+
+    Methods
+    ----------
+    start() : Start capturing on a background thread.
+    stop() : Stop capturing.
+    get_keys() : Collect captured keys.
+    report() : Text summary of latencies.
+    """
+
+    def __init__(self, key_list=None, poll_interval=0.001, kb=None):
+        """
+        Parameters
+        ----------
+        key_list : list, optional
+        poll_interval : float, optional
+        kb : psychopy.hardware.keyboard.Keyboard, optional
+            Keyboard to capture, a new one if omitted.
+        """
+        self.key_list = key_list
+        self.poll_interval = poll_interval
+        self.keyboard = keyboard.Keyboard() if kb is None else kb
+        self.events = deque()
+        self.latencies = []
+        self.running = threading.Event()
+        self.thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+    def start(self):
+        """Start capturing on a background thread.
+        """
+        self.keyboard.clearEvents()
+        self.running.set()
+        self.thread = threading.Thread(target=self.capture, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop capturing.
+        """
+        self.running.clear()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def capture(self):
+        """Poll keyboard until stopped, runs on the background thread.
+        """
+        while self.running.is_set():
+            keys = self.keyboard.getKeys(keyList=self.key_list, waitRelease=False, clear=True)
+            if keys:
+                now = clock.getTime()
+                for key in keys:
+                    # rt is relative to the last reset of the keyboard clock
+                    self.events.append((key.name, self.keyboard.clock.getLastResetTime() + key.rt, now))
+            time.sleep(self.poll_interval)
+
+    def get_keys(self):
+        """
+        Collect captured keys.
+
+        Returns
+        ----------
+        list : (key, press time) tuples in order of presses.
+        """
+        now = clock.getTime()
+        keys = []
+        while self.events:
+            name, press_time, capture_time = self.events.popleft()
+            keys.append((name, press_time))
+            self.latencies.append((capture_time - press_time, now - press_time))
+        return keys
+
+    def report(self):
+        """
+        Text summary of latencies: how late keys were captured on the background
+        thread and how late the main loop would see them when polling once per frame.
+
+        Returns
+        ----------
+        str
+        """
+        if not self.latencies:
+            return "No keys captured."
+        latencies = 1000 * np.array(self.latencies)
+        lines = ["%d keys" % len(latencies),
+                 "%20s %10s %10s %10s %10s" % ("latency [ms]", "mean", "median", "95%", "max")]
+        for name, values in zip(["background capture", "frame polling"], latencies.T):
+            lines.append("%20s %10.3f %10.3f %10.3f %10.3f" % (name, np.mean(values), np.median(values),
+                                                               np.percentile(values, 95), np.max(values)))
+        return "\n".join(lines)
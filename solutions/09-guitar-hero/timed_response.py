@@ -2,16 +2,27 @@
 Timer response task classes.
 
 Target
+TargetArray
 TimedResponseTask
 TimedResponseTaskPsychoPy
 """
 
 import time 
+from collections import deque
 
-from psychopy import clock, data, visual
+import numpy as np
+from psychopy import clock, colors, visual
 
+from chart import ChartScheduler
+from difficulty import PsychoPyStaircase, UpDownStaircase
 from generators import next_target_generator, time_to_next_target_generator
 
+# per slot arrays of TargetArray
+SLOT_ARRAYS = ["y", "speed", "ipos", "score", "xys", "rgbs", "opacities"]
+
+# columns of trial logs, speed factor is the one the trial was played at
+TRIAL_COLUMNS = ["time", "position", "score", "speed_factor"]
+
 class Target:
     """
     Moving target class.
@@ -98,6 +109,300 @@ class Target:
         return False
 
 
+class TargetArray:
+    """
+    All moving targets, stored as arrays, moved and drawn at once.
+
+    All targets fall at the same speed (the staircase changes the speed of
+    all of them), so they stay in the order they were added, the oldest
+    being the lowest one. Slots are kept in a ring buffer that doubles its
+    capacity when full. Unused slots are fully transparent.
+
+    Targets that can still be hit are also queued per position, in the
+    order they were added. Hit lookup and miss detection only look at the
+    front of the queue: earlier targets were either hit or missed already,
+    later ones are higher up.
+
+    Properties
+    ----------
+    win : psychopy.visual.Window
+    settings : dict
+    capacity : int
+        Number of slots.
+    first : int
+        Slot of the oldest target.
+    n : int
+        Number of targets.
+    y : numpy.ndarray
+        Vertical position of each slot.
+    speed : numpy.ndarray
+        Vertical speed of each slot in norm units per second.
+    ipos : numpy.ndarray
+        Position index of each slot.
+    score : numpy.ndarray
+        Score of each slot, 0 if not scored yet.
+    lanes : list
+        collections.deque per position index with slots of targets that can still be hit.
+    n_missed : int
+        Number of targets that passed the finish line without being hit.
+    slots : numpy.ndarray
+        Slots of targets, from the oldest to the newest one.
+    frame_timer : clock.Clock
+    update_time : float
+        Time of the last fall, on the psychopy.clock.getTime() scale.
+    lane_x : numpy.ndarray
+        Horizontal position for each position index.
+    lane_rgb : numpy.ndarray
+        Color for each position index, lighter for scored targets.
+    xys, rgbs, opacities : numpy.ndarray
+        Per slot attributes of visuals.
+    colors_changed : logical
+        Whether colors or opacities changed since the last draw.
+    visuals : visual.ElementArrayStim
+    n_draw_calls : int
+        Number of draw calls issued so far.
+
+    Methods
+    ----------
+    allocate(capacity) : Create empty arrays and visuals for the capacity.
+    add(ipos, speed, y=None) : Add target at the top of the screen.
+    set_speed(speed) : Change speed of all targets.
+    fall(dt=None) : Move all targets downwards.
+    remove_below_the_screen() : Remove targets whose upper edge is below the screen.
+    y_at(islot, time=None) : Vertical position of a target at a given time.
+    expire(yline, time=None) : Drop targets that passed the line from position queues.
+    check(ipos, yline, time=None) : Score the oldest target at the position that overlaps with the line.
+    draw() : Draw all targets.
+    """
+
+    def __init__(self, win, settings, capacity=64):
+        """
+        Parameters
+        ----------
+        win : psychopy.visual.Window
+        settings : dict
+        capacity : int, optional
+            Initial number of slots.
+        """
+        self.win = win
+        self.settings = settings
+        self.frame_timer = clock.Clock()
+        self.update_time = clock.getTime()
+
+        # lookup tables, scored targets are halfway to white
+        self.lane_x = np.array(settings["Position"], dtype=float)
+        lane_rgb = np.array([colors.colorNames[color] if isinstance(color, str) else color for color in settings["Color"]], dtype=float)
+        self.lane_rgb = np.stack([lane_rgb, (lane_rgb + 1) / 2])
+
+        self.allocate(capacity)
+        self.lanes = [deque() for _ in settings["Position"]]
+        self.n_missed = 0
+        self.n_draw_calls = 0
+
+    def allocate(self, capacity):
+        """
+        Create empty arrays and visuals for the capacity.
+
+        Parameters
+        ----------
+        capacity : int
+        """
+        self.capacity = capacity
+        self.first = 0
+        self.n = 0
+        self.y = np.zeros(capacity)
+        self.speed = np.zeros(capacity)
+        self.ipos = np.zeros(capacity, dtype=int)
+        self.score = np.zeros(capacity, dtype=int)
+        self.xys = np.zeros((capacity, 2))
+        self.rgbs = np.zeros((capacity, 3))
+        self.opacities = np.zeros(capacity)
+
+        self.visuals = visual.ElementArrayStim(self.win,
+                                               nElements=capacity,
+                                               elementTex=None,
+                                               elementMask=None,
+                                               xys=self.xys,
+                                               sizes=(self.settings["Width"], self.settings["Height"]),
+                                               colors=self.rgbs,
+                                               colorSpace="rgb",
+                                               opacities=self.opacities)
+        self.colors_changed = False
+
+    @property
+    def slots(self):
+        """numpy.ndarray : Slots of targets, from the oldest to the newest one.
+        """
+        return (self.first + np.arange(self.n)) % self.capacity
+
+    def add(self, ipos, speed, y=None):
+        """
+        Add target at the top of the screen.
+
+        Parameters
+        ----------
+        ipos : int
+            Position index.
+        speed : float
+            Vertical speed in norm units per second.
+        y : float, optional
+            Vertical position, top of the screen if omitted.
+        """
+        if self.n == self.capacity:
+            # unroll the ring into arrays twice as large
+            slots = self.slots
+            old_arrays = {name : getattr(self, name)[slots] for name in SLOT_ARRAYS}
+            self.allocate(2 * self.capacity)
+            for name, values in old_arrays.items():
+                getattr(self, name)[:len(slots)] = values
+            self.n = len(slots)
+
+            # targets moved to slots matching their order
+            new_slot = np.zeros(len(slots), dtype=int)
+            new_slot[slots] = np.arange(len(slots))
+            self.lanes = [deque(new_slot[lane].tolist()) for lane in self.lanes]
+
+        islot = (self.first + self.n) % self.capacity
+        self.n += 1
+        self.y[islot] = 1 - self.settings["Height"] / 2 if y is None else y
+        self.speed[islot] = speed
+        self.ipos[islot] = ipos
+        self.score[islot] = 0
+        self.xys[islot] = (self.lane_x[ipos], self.y[islot])
+        self.rgbs[islot] = self.lane_rgb[0, ipos]
+        self.opacities[islot] = 1
+        self.colors_changed = True
+        self.lanes[ipos].append(islot)
+
+    def set_speed(self, speed):
+        """
+        Change speed of all targets.
+
+        Parameters
+        ----------
+        speed : float
+        """
+        self.speed[:] = speed
+
+    def fall(self, dt=None):
+        """
+        Move all targets downwards.
+
+        Parameters
+        ----------
+        dt : float, optional
+            Time since the last update, measured by the frame timer if omitted.
+        """
+        self.update_time = clock.getTime()
+        if dt is None:
+            dt = self.frame_timer.getTime()
+            self.frame_timer.reset()
+
+        # unused slots move as well, they are invisible anyway
+        self.y -= self.speed * dt
+
+    def remove_below_the_screen(self):
+        """Remove targets whose upper edge is below the screen.
+        """
+        while self.n > 0 and self.y[self.first] + self.settings["Height"] < -1:
+            self.opacities[self.first] = 0
+            self.first = (self.first + 1) % self.capacity
+            self.n -= 1
+            self.colors_changed = True
+
+    def y_at(self, islot, time=None):
+        """
+        Vertical position of a target at a given time.
+
+        Parameters
+        ----------
+        islot : int
+        time : float, optional
+            On the psychopy.clock.getTime() scale, time of the last fall if omitted.
+
+        Returns
+        ----------
+        float
+        """
+        if time is None:
+            return self.y[islot]
+        return self.y[islot] - self.speed[islot] * (time - self.update_time)
+
+    def expire(self, yline, time=None):
+        """
+        Drop targets that passed the line from position queues.
+
+        Parameters
+        ----------
+        yline : float
+            Location of the finish line.
+        time : float, optional
+            Time of the check, time of the last fall if omitted.
+
+        Returns
+        ----------
+        int : Number of targets missed since the last call.
+        """
+        # target cannot score once its center is further than 90% of its half height below the line
+        lowest_y = yline - 0.9 * self.settings["Height"] / 2
+        n_missed = 0
+        for lane in self.lanes:
+            while lane and self.y_at(lane[0], time) < lowest_y:
+                lane.popleft()
+                n_missed += 1
+        self.n_missed += n_missed
+        return n_missed
+
+    def check(self, ipos, yline, time=None):
+        """
+        Score the oldest target at the position that overlaps with the line.
+
+        Parameters
+        ----------
+        ipos : int
+            Response location.
+        yline : float
+            Location of the finish line.
+        time : float, optional
+            Time of the key press, positions are interpolated to it. Time of the last fall if omitted.
+
+        Returns
+        ----------
+        int : Score, 0 if no target at the position overlaps with the line.
+        """
+        self.expire(yline, time)
+        lane = self.lanes[ipos]
+        if not lane:
+            return 0
+
+        islot = lane[0]
+        score = int(10 - 10 * abs(self.y_at(islot, time) - yline) / (self.settings["Height"] / 2))
+        if score <= 0:
+            # still above the line
+            return 0
+
+        lane.popleft()
+        self.score[islot] = score
+        self.rgbs[islot] = self.lane_rgb[1, ipos]
+        self.colors_changed = True
+        return score
+
+    def draw(self):
+        """Draw all targets.
+        """
+        if self.n == 0:
+            return
+
+        self.xys[:, 1] = self.y
+        self.visuals.xys = self.xys
+        if self.colors_changed:
+            self.visuals.colors = self.rgbs
+            self.visuals.opacities = self.opacities
+            self.colors_changed = False
+        self.visuals.draw()
+        self.n_draw_calls += 1
+
+
 class TimedResponseTask:
     """
     Timed response task.
@@ -108,35 +413,47 @@ class TimedResponseTask:
     setttings : dict
     speed_factor : float
         Difficulty.
+    difficulty : UpDownStaircase, PsychoPyStaircase, or BayesianStaircase
+        Adaptive procedure that sets the speed factor.
     time_to_next_target : time_to_next_target_generator
     next_target_pos : next_target_generator
     new_target_timer : clock.CountdownTimer
-    self.targets : list
+    self.targets : TargetArray
     self.finish_line : visual.Line
-    correct_in_a_row : int
-        Staircase counter.
+    scheduler : ChartScheduler
+        Spawns chart notes, None if targets are random.
+    logger : triallog.TrialLogger
+        Trial log with TRIAL_COLUMNS, None if trials are not logged.
 
     Methods
     ----------
     draw() : Draw all targets and the finish line.
-    update() : Update all targets, make them fall.
-    add_next_target() : Add next target, if the time is right.
-    check(ipos) : Check whether response was for a target.
-    staircase(correct) : Adjust speed via 3-up-1-down staircase.
+    update() : Update all targets, make them fall, add new ones.
+    add_next_target() : Add next random target, if the time is right.
+    check(ipos, time=None) : Check whether response was for a target.
+    staircase(correct) : Adjust speed via the adaptive procedure.
     """
-    def __init__(self, win, settings):
+    def __init__(self, win, settings, chart=None, get_time=None, logger=None, difficulty=None):
         """
         Parameters
             ----------
             win : psychopy.visual.Window
             setttings : dict        
+            chart : Chart, optional
+                Notes to play, random targets if omitted.
+            get_time : callable, optional
+                Song time for the chart, starts with the task if omitted.
+            logger : triallog.TrialLogger, optional
+            difficulty : UpDownStaircase, PsychoPyStaircase, or BayesianStaircase, optional
+                Hand-rolled 3-up-1-down staircase if omitted.
          """
         self.win = win
         self.settings = settings
+        self.logger = logger
 
         # difficulty
-        self.speed_factor = 1
-        self.correct_in_a_row = 0
+        self.difficulty = UpDownStaircase(settings["Staircase multuplier"]) if difficulty is None else difficulty
+        self.speed_factor = self.difficulty.speed_factor
 
         # timing
         self.time_to_next_target = time_to_next_target_generator(settings["Spawn time"])
@@ -144,7 +461,10 @@ class TimedResponseTask:
         self.new_target_timer = clock.CountdownTimer(next(self.time_to_next_target))
 
         # targets
-        self.targets = []
+        self.targets = TargetArray(win, settings)
+        self.scheduler = None
+        if chart is not None:
+            self.scheduler = ChartScheduler(chart, settings, clock.Clock().getTime if get_time is None else get_time)
 
         # finishing line
         self.finish_line = visual.Line(win, start=(-1, settings["Finish line Y"]), end=(1, settings["Finish line Y"]), lineColor="yellow")
@@ -152,33 +472,31 @@ class TimedResponseTask:
     def draw(self):
         """Draw all targets and the finish line.
         """
-        for target in self.targets:
-            target.draw()
+        self.targets.draw()
         self.finish_line.draw()
 
     def update(self):
-        """Update all targets, make them fall.
+        """Update all targets, make them fall, add new ones.
         """
-        # make all targets fall
-        for target in self.targets:
-            target.fall()
-
-        # dispose of targets below the screen
-        if self.targets:
-            while self.targets[0].is_below_the_screen:
-                self.targets.pop(0)
+        # make all targets fall and see if we can add more
+        if self.scheduler is None:
+            self.targets.fall()
+            self.add_next_target()
+        else:
+            self.scheduler.update(self.targets, self.settings["Speed"] * self.speed_factor)
 
-        # see if we can add more
-        self.add_next_target()
+        # drop targets that cannot be hit anymore, dispose of ones below the screen
+        self.targets.expire(self.settings["Finish line Y"])
+        self.targets.remove_below_the_screen()
 
     def add_next_target(self):
-        """Add next target, if the time is right.
+        """Add next random target, if the time is right.
         """
         if self.new_target_timer.getTime() <= 0:
-            self.targets.append(Target(self.win, self.settings, self.settings["Speed"] * self.speed_factor, next(self.next_target_pos)))
+            self.targets.add(next(self.next_target_pos), self.settings["Speed"] * self.speed_factor)
             self.new_target_timer = clock.CountdownTimer(next(self.time_to_next_target))
 
-    def check(self, ipos):
+    def check(self, ipos, time=None):
         """
         Check whether response was for a target.
 
@@ -186,42 +504,35 @@ class TimedResponseTask:
         ----------
         ipos : int
             Response location.
+        time : float, optional
+            Time of the key press on the psychopy.clock.getTime() scale, time of the last update if omitted.
 
         Returns
         ----------
         int : Score.
         """
-        for target in self.targets:
-            if target.ipos == ipos and target.overlaps(self.settings["Finish line Y"]):
-                self.staircase(True)
-                return target.score
+        score = self.targets.check(ipos, self.settings["Finish line Y"], time)
+        if self.logger is not None:
+            self.logger.log(clock.getTime() if time is None else time, ipos, score, self.speed_factor)
         
-        # no valid target at the finish line
-        self.staircase(False)
-        return 0
+        # was there a valid target at the finish line?
+        self.staircase(score > 0)
+        return score
 
     def staircase(self, correct):
         """
-        Adjust speed via 3-up-1-down staircase.
+        Adjust speed via the adaptive procedure.
 
         Parameters
         ----------
         correct : logical
         """
-        if correct:
-            # up
-            self.correct_in_a_row += 1
-            if self.correct_in_a_row == 3:
-                self.speed_factor *= self.settings["Staircase multuplier"]
-                self.correct_in_a_row = 0
-        else:
-            # down
-            self.speed_factor /= self.settings["Staircase multuplier"]
-            self.correct_in_a_row = 0
+        self.difficulty.update(correct)
+        self.speed_factor = self.difficulty.speed_factor
         
-        # distribute speed factor among targets
-        for target in self.targets:
-            target.speed = self.settings["Speed"] * self.speed_factor
+        # distribute speed factor among targets, chart notes on the screen keep theirs to arrive on time
+        if self.scheduler is None:
+            self.targets.set_speed(self.settings["Speed"] * self.speed_factor)
 
 
 class TimedResponseTaskPsychoPy:
@@ -234,36 +545,48 @@ class TimedResponseTaskPsychoPy:
     setttings : dict
     speed_factor : float
         Difficulty.
+    difficulty : UpDownStaircase, PsychoPyStaircase, or BayesianStaircase
+        Adaptive procedure that sets the speed factor.
     time_to_next_target : time_to_next_target_generator
     next_target_pos : next_target_generator
     new_target_timer : clock.CountdownTimer
-    self.targets : list
+    self.targets : TargetArray
     self.finish_line : visual.Line
-    stairhandler : data.StairHandler
-        Staircase.
+    scheduler : ChartScheduler
+        Spawns chart notes, None if targets are random.
+    logger : triallog.TrialLogger
+        Trial log with TRIAL_COLUMNS, None if trials are not logged.
 
     Methods
     ----------
     draw() : Draw all targets and the finish line.
-    update() : Update all targets, make them fall.
-    add_next_target() : Add next target, if the time is right.
-    check(ipos) : Check whether response was for a target.
-    staircase(correct) : Adjust speed via 3-up-1-down staircase.
+    update() : Update all targets, make them fall, add new ones.
+    add_next_target() : Add next random target, if the time is right.
+    check(ipos, time=None) : Check whether response was for a target.
+    staircase(correct) : Adjust speed via the adaptive procedure.
     save() : Save logs under unique timestamp name.
     """    
-    def __init__(self, win, settings):
+    def __init__(self, win, settings, chart=None, get_time=None, logger=None, difficulty=None):
         """
         Parameters
             ----------
             win : psychopy.visual.Window
             setttings : dict        
+            chart : Chart, optional
+                Notes to play, random targets if omitted.
+            get_time : callable, optional
+                Song time for the chart, starts with the task if omitted.
+            logger : triallog.TrialLogger, optional
+            difficulty : UpDownStaircase, PsychoPyStaircase, or BayesianStaircase, optional
+                PsychoPy 1-up-3-down staircase if omitted.
          """
         self.win = win
         self.settings = settings
+        self.logger = logger
 
         # difficulty
-        self.stairhandler = data.StairHandler(startVal=1, nUp=1, nDown=3, stepType="log", stepSizes=-0.1, nTrial=1000, nReversals=1000)
-        self.speed_factor = next(self.stairhandler)
+        self.difficulty = PsychoPyStaircase() if difficulty is None else difficulty
+        self.speed_factor = self.difficulty.speed_factor
 
         # timing
         self.time_to_next_target = time_to_next_target_generator(settings["Spawn time"])
@@ -271,7 +594,10 @@ class TimedResponseTaskPsychoPy:
         self.new_target_timer = clock.CountdownTimer(next(self.time_to_next_target))
 
         # targets
-        self.targets = []
+        self.targets = TargetArray(win, settings)
+        self.scheduler = None
+        if chart is not None:
+            self.scheduler = ChartScheduler(chart, settings, clock.Clock().getTime if get_time is None else get_time)
 
         # finishing line
         self.finish_line = visual.Line(win, start=(-1, settings["Finish line Y"]), end=(1, settings["Finish line Y"]), lineColor="yellow")
@@ -279,33 +605,31 @@ class TimedResponseTaskPsychoPy:
     def draw(self):
         """Draw all targets and the finish line.
         """
-        for target in self.targets:
-            target.draw()
+        self.targets.draw()
         self.finish_line.draw()
 
     def update(self):
-        """Update all targets, make them fall.
+        """Update all targets, make them fall, add new ones.
         """
-        # make all targets fall
-        for target in self.targets:
-            target.fall()
-
-        # dispose of targets below the screen
-        if self.targets:
-            while self.targets[0].is_below_the_screen:
-                self.targets.pop(0)
+        # make all targets fall and see if we can add more
+        if self.scheduler is None:
+            self.targets.fall()
+            self.add_next_target()
+        else:
+            self.scheduler.update(self.targets, self.settings["Speed"] * self.speed_factor)
 
-        # see if we can add more
-        self.add_next_target()
+        # drop targets that cannot be hit anymore, dispose of ones below the screen
+        self.targets.expire(self.settings["Finish line Y"])
+        self.targets.remove_below_the_screen()
 
     def add_next_target(self):
-        """Add next target, if the time is right.
+        """Add next random target, if the time is right.
         """
         if self.new_target_timer.getTime() <= 0:
-            self.targets.append(Target(self.win, self.settings, self.settings["Speed"] * self.speed_factor, next(self.next_target_pos)))
+            self.targets.add(next(self.next_target_pos), self.settings["Speed"] * self.speed_factor)
             self.new_target_timer = clock.CountdownTimer(next(self.time_to_next_target))
 
-    def check(self, ipos):
+    def check(self, ipos, time=None):
         """
         Check whether response was for a target.
 
@@ -313,37 +637,38 @@ class TimedResponseTaskPsychoPy:
         ----------
         ipos : int
             Response location.
+        time : float, optional
+            Time of the key press on the psychopy.clock.getTime() scale, time of the last update if omitted.
 
         Returns
         ----------
         int : Score.
         """
-        for target in self.targets:
-            if target.ipos == ipos and target.overlaps(self.settings["Finish line Y"]):
-                self.staircase(True)
-                return target.score
+        score = self.targets.check(ipos, self.settings["Finish line Y"], time)
+        if self.logger is not None:
+            self.logger.log(clock.getTime() if time is None else time, ipos, score, self.speed_factor)
         
-        # no valid target at the finish line
-        self.staircase(False)
-        return 0
+        # was there a valid target at the finish line?
+        self.staircase(score > 0)
+        return score
 
     def staircase(self, correct):
         """
-        Adjust speed via 3-up-1-down staircase.
+        Adjust speed via the adaptive procedure.
 
         Parameters
         ----------
         correct : logical
         """
-        self.stairhandler.addResponse(correct)
-        self.speed_factor = next(self.stairhandler)
+        self.difficulty.update(correct)
+        self.speed_factor = self.difficulty.speed_factor
         
-        # distribute speed factor among targets
-        for target in self.targets:
-            target.speed = self.settings["Speed"] * self.speed_factor
+        # distribute speed factor among targets, chart notes on the screen keep theirs to arrive on time
+        if self.scheduler is None:
+            self.targets.set_speed(self.settings["Speed"] * self.speed_factor)
 
     def save(self):
         """Save logs under unique timestamp name.
         """
         timestamp = time.strftime("%Y-%m-%d-%H-%M-%S")
-        self.stairhandler.saveAsText(timestamp + ".txt)
+        self.difficulty.save(timestamp)
@@ -0,0 +1,229 @@
+"""
+Crash-safe streaming trial log.
+
+Trials are logged as rows of a CSV file that is only ever appended to. The
+game loop only puts a row into a queue (collections.deque, no locks and no
+file access), a background thread writes queued rows in batches and forces
+them to disk, so a crash or a power cut loses at most the last batch. When
+the log is closed, the columns are also saved as NumPy arrays in an .npz
+sidecar. A CSV without its sidecar belongs to a session that did not end
+cleanly, recover_sessions() repairs such logs (drops an incomplete last
+line) and writes the missing sidecars.
+
+* TrialLogger
+* repair_log(filename)
+* load_trials(filename)
+* save_sidecar(filename)
+* recover_sessions(folder)
+"""
+
+import glob
+import os
+import threading
+from collections import deque
+
+import numpy as np
+
+
+class TrialLogger:
+    """
+    Append-only trial log with batched writes on a background thread.
+
+    Properties
+    ----------
+    filename : str
+        CSV file, .npz sidecar uses the same name.
+    columns : list
+        Column names.
+    flush_interval : float
+        Time between writes in seconds.
+    sidecar : logical
+        Whether to save an .npz sidecar on close.
+    rows : collections.deque
+        Rows waiting to be written.
+    n_trials : int
+        Number of logged trials, including ones of a resumed session.
+    thread : threading.Thread
+
+    Methods
+    ----------
+    log(*values) : Log a trial.
+    flush() : Write all queued rows and force them to disk.
+    close() : Write remaining rows, stop the background thread, save the sidecar.
+    """
+
+    def __init__(self, filename, columns, flush_interval=0.5, sidecar=True):
+        """
+        Opens the log, appending to it if it exists (resuming a session),
+        in which case its sidecar is removed till the log is closed again.
+
+        Parameters
+        ----------
+        filename : str
+        columns : list
+        flush_interval : float, optional
+        sidecar : logical, optional
+        """
+        self.filename = filename
+        self.columns = list(columns)
+        self.flush_interval = flush_interval
+        self.sidecar = sidecar
+        self.rows = deque()
+        self.n_trials = 0
+
+        folder = os.path.dirname(filename)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        if os.path.exists(filename) and os.path.getsize(filename) > 0:
+            # resuming, last line could be incomplete
+            header, n_rows = repair_log(filename)
+            if header != self.columns:
+                raise ValueError("%s has columns %s instead of %s." % (filename, header, self.columns))
+            self.n_trials = n_rows
+            self.log_file = open(filename, "a")
+
+            # sidecar of the previous session is out of date, close() writes a new one
+            sidecar_filename = os.path.splitext(filename)[0] + ".npz"
+            if os.path.exists(sidecar_filename):
+                os.remove(sidecar_filename)
+        else:
+            self.log_file = open(filename, "w")
+            self.log_file.write(",".join(self.columns) + "\n")
+            self.flush()
+
+        self.closing = threading.Event()
+        self.thread = threading.Thread(target=self.write_in_background, daemon=True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def log(self, *values):
+        """
+        Log a trial, values in order of columns.
+
+        Parameters
+        ----------
+        values : int, float, or str
+        """
+        self.rows.append(values)
+        self.n_trials += 1
+
+    def write_in_background(self):
+        """Write queued rows every flush interval until closed, runs on the background thread.
+        """
+        while not self.closing.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Write all queued rows and force them to disk.
+        """
+        lines = []
+        while self.rows:
+            lines.append(",".join(str(value) for value in self.rows.popleft()) + "\n")
+        if lines:
+            self.log_file.write("".join(lines))
+        self.log_file.flush()
+        os.fsync(self.log_file.fileno())
+
+    def close(self):
+        """Write remaining rows, stop the background thread, save the sidecar.
+        """
+        if self.log_file.closed:
+            return
+        self.closing.set()
+        self.thread.join()
+        self.flush()
+        self.log_file.close()
+        if self.sidecar:
+            save_sidecar(self.filename)
+
+
+def repair_log(filename):
+    """
+    Drop an incomplete last line of a log.
+
+    Parameters
+    ----------
+    filename : str
+
+    Returns
+    ----------
+    list : column names
+    int : number of complete rows
+    """
+    with open(filename, "rb+") as log_file:
+        content = log_file.read()
+        complete = content.rfind(b"\n") + 1
+        if complete < len(content):
+            log_file.truncate(complete)
+    lines = content[:complete].decode().splitlines()
+    if not lines:
+        raise ValueError("%s has no header." % filename)
+    return lines[0].split(","), len(lines) - 1
+
+
+def load_trials(filename):
+    """
+    Load complete trials of a log, even if the session did not end cleanly.
+
+    Parameters
+    ----------
+    filename : str
+
+    Returns
+    ----------
+    dict : numpy.ndarray per column, numeric if possible.
+    """
+    with open(filename) as log_file:
+        content = log_file.read()
+
+    # last line without a newline was cut short
+    lines = content.split("\n")[:-1]
+    columns = lines[0].split(",")
+    rows = [line.split(",") for line in lines[1:]]
+    trials = {}
+    for icolumn, column in enumerate(columns):
+        values = np.array([row[icolumn] for row in rows], dtype=str)
+        try:
+            trials[column] = values.astype(float)
+        except ValueError:
+            trials[column] = values
+    return trials
+
+
+def save_sidecar(filename):
+    """
+    Save columns of a log as arrays in an .npz file with the same name.
+
+    Parameters
+    ----------
+    filename : str
+    """
+    np.savez(os.path.splitext(filename)[0] + ".npz", **load_trials(filename))
+
+
+def recover_sessions(folder):
+    """
+    Repair logs of sessions that did not end cleanly and save their sidecars.
+
+    Parameters
+    ----------
+    folder : str
+
+    Returns
+    ----------
+    list : filenames of recovered logs.
+    """
+    recovered = []
+    for filename in sorted(glob.glob(os.path.join(folder, "*.csv"))):
+        if not os.path.exists(os.path.splitext(filename)[0] + ".npz") and os.path.getsize(filename) > 0:
+            repair_log(filename)
+            save_sidecar(filename)
+            recovered.append(filename)
+    return recovered
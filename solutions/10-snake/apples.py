@@ -1,9 +1,10 @@
 """Apple class.
 """
 
-from psychopy import visual
 import random
 
+from psychopy import visual
+
 
 class Apple(visual.ImageStim):
     """
@@ -15,17 +16,17 @@ class Apple(visual.ImageStim):
         (ix, iy) Location on the grid.
     """
 
-    def __init__(self, win, snake):
+    def __init__(self, win, snake, rng=random):
         """
         Parameters
         ----------
         win : GridWindow
         snake : Snake
+        rng : random.Random, optional
+            Random number generator, seeded one makes games reproducible.
         """
-        # find a random location
-        self.ipos = [random.randrange(limit) for limit in win.grid_size]
-        while snake.is_inside(self.ipos):
-            self.ipos = [random.randrange(limit) for limit in win.grid_size]
+        # pick a random free location
+        self.ipos = snake.free_cells.sample(rng)
 
         # create visuals
         super().__init__(win, image="apple.png", size=win.square_size, pos=win.grid_to_win(self.ipos))
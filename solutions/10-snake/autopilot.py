@@ -0,0 +1,521 @@
+"""
+Autopilot for the snake.
+
+* Autopilot
+* grid_graph(grid_size)
+"""
+
+from collections import deque
+from functools import lru_cache
+
+from utilities import DIRECTION_TO_DXY
+
+# direction for each (dx, dy) step
+DXY_TO_DIRECTION = {dxy : direction for direction, dxy in DIRECTION_TO_DXY.items()}
+
+# maximal number of replans between attempts to reach an unsafe apple
+MAX_APPLE_BACKOFF = 4
+
+# squares whose distance to the apple is worked out per decision
+SQUARES_PER_DECISION = 64
+
+
+@lru_cache(maxsize=None)
+def grid_graph(grid_size):
+    """
+    Neighbors of every grid square and a Hamiltonian cycle through all of them.
+
+    Squares are identified by their flat index ix + iy * width. Computed once per grid size.
+
+    Parameters
+    ----------
+    grid_size : tuple
+        (width, height) of the grid in squares.
+
+    Returns
+    ----------
+    list : Flat indexes of neighbors for each square.
+    list : Next square along the Hamiltonian cycle for each square, or None if there is no cycle.
+    """
+    width, height = grid_size
+    neighbors = [[nx + ny * width
+                  for nx, ny in [(ix + dx, iy + dy) for dx, dy in DIRECTION_TO_DXY.values()]
+                  if 0 <= nx < width and 0 <= ny < height]
+                 for iy in range(height)
+                 for ix in range(width)]
+
+    # a cycle exists only if the number of squares is even
+    if width < 2 or height < 2 or (width % 2 == 1 and height % 2 == 1):
+        return neighbors, None
+
+    # snake through columns 1..width-1 row by row and return via column 0,
+    # transposed if the number of rows is odd
+    transpose = height % 2 == 1
+    rows, columns = (width, height) if transpose else (height, width)
+    order = []
+    for row in range(rows):
+        span = range(1, columns) if row % 2 == 0 else range(columns - 1, 0, -1)
+        order.extend((column, row) for column in span)
+    order.extend((0, row) for row in range(rows - 1, -1, -1))
+    if transpose:
+        order = [(row, column) for column, row in order]
+
+    cycle = [None] * (width * height)
+    for (ix, iy), (nx, ny) in zip(order, order[1:] + order[:1]):
+        cycle[ix + iy * width] = nx + ny * width
+    return neighbors, cycle
+
+
+class Autopilot:
+    """
+    Snake autopilot.
+
+    Plans the shortest (breadth-first) path to the apple and follows it only
+    if, having eaten the apple, the snake can still reach its own tail. Otherwise,
+    it follows the shortest path to its tail, which is always safe because
+    tail keeps moving out of the way. If even the tail cannot be reached, it
+    follows a Hamiltonian cycle or takes any free square.
+
+    Chasing the tail can go on forever, if the apple never becomes safe. So,
+    while the body lies along the Hamiltonian cycle (in the order of the cycle,
+    gaps are fine), the snake takes only shortcuts to the apple that move further
+    along the cycle, which keeps it that way, and otherwise follows the cycle.
+    The cycle visits every square, so the apple is eaten within one lap and the
+    snake never gets stuck. A snake that is not on the cycle also follows it,
+    as long as its tail stays reachable, once the apple was out of reach for
+    more steps than there are squares.
+
+    Squares between the head and the apple along the cycle are free, so the
+    shortcuts do not depend on the snake and need no search of the grid. Length
+    of the shortest shortcut from every square is worked out going back along
+    the cycle from the apple, SQUARES_PER_DECISION squares per decision, so every
+    decision takes about the same time. Till the head is reached, the snake
+    takes the best shortcut known so far or follows the cycle. A snake of a
+    single segment is on the cycle from the start, so only a snake steered by a
+    player or one on a grid without a cycle (odd number of squares) needs the
+    search of the whole grid.
+
+    Planned paths are cached and followed until the apple moves or the next
+    square is taken, so that the expensive search runs only every few steps.
+    If the apple is not safe to take, the next attempt is postponed by a
+    number of replans that doubles with every failed attempt.
+
+    Properties
+    ----------
+    grid_size : tuple
+        (width, height) of the grid in squares.
+    neighbors : list
+        Flat indexes of neighbors for each square.
+    cycle : list
+        Next square along the Hamiltonian cycle for each square, or None.
+    cycle_order : list
+        Position of each square along the Hamiltonian cycle, or None.
+    cycle_squares : list
+        Square at each position along the Hamiltonian cycle, or None.
+    plan : collections.deque
+        Flat indexes of squares to visit next.
+    plan_apple : tuple
+        Apple location the plan was made for.
+    apple_backoff : int
+        Replans to skip after the apple turned out to be unsafe.
+    apple_retry : int
+        Replans left till the next attempt to plan a path to the apple.
+    apple_steps : int
+        Steps since the apple appeared.
+    apple_distances : list
+        Steps to the apple along the shortest shortcut for each square, see extend_distances().
+    n_known : int
+        Number of squares, going back along the cycle from the apple, with a known distance to it.
+    on_cycle : logical
+        Whether the body lies along the Hamiltonian cycle, None if it needs checking.
+    last_square : int
+        Flat index of the square the head was sent to, to notice that a player took over.
+    n_decisions : int
+        Number of decisions made.
+    n_searches : int
+        Number of path searches, counting every distance table worked out for an apple.
+
+    Methods
+    ----------
+    flat(ipos) : Flat index of the grid position.
+    decide(segments, occupancy, apple, direction) : Direction for the next step.
+    direction_to(head, square) : Direction from the head to a neighboring square.
+    move(head, square) : Remember the square the head is sent to and return direction to it.
+    search(start, goal, blocked, behind) : Shortest path that avoids blocked squares.
+    is_safe(path, segments) : Whether the tail is reachable after following the path and eating the apple.
+    is_on_cycle(body) : Whether the body lies along the Hamiltonian cycle.
+    extend_distances(apple, portion) : Work out distances to the apple for the next portion of squares.
+    step_on_cycle(segments, apple, behind) : Next square of a snake that lies along the cycle.
+    replan(segments, blocked, apple, behind) : Plan the next few steps.
+    """
+
+    def __init__(self, grid_size):
+        """
+        Parameters
+        ----------
+        grid_size : tuple
+            (width, height) of the grid in squares.
+        """
+        self.grid_size = tuple(grid_size)
+        self.neighbors, self.cycle = grid_graph(self.grid_size)
+        self.cycle_order = None
+        self.cycle_squares = None
+        if self.cycle is not None:
+            # position of every square along the cycle and back
+            self.cycle_order = [0] * len(self.cycle)
+            self.cycle_squares = [0] * len(self.cycle)
+            square = self.cycle[0]
+            for position in range(1, len(self.cycle)):
+                self.cycle_order[square] = position
+                self.cycle_squares[position] = square
+                square = self.cycle[square]
+        self.plan = deque()
+        self.plan_apple = None
+        self.apple_backoff = 1
+        self.apple_retry = 0
+        self.apple_steps = 0
+        self.apple_distances = [0] * len(self.neighbors)
+        self.n_known = 0
+        self.on_cycle = None
+        self.last_square = None
+        self.n_decisions = 0
+        self.n_searches = 0
+
+    def flat(self, ipos):
+        """
+        Flat index of the grid position.
+
+        Parameters
+        ----------
+        ipos : tuple
+            (x, y) position on the grid
+
+        Returns
+        ----------
+        int
+        """
+        return ipos[0] + ipos[1] * self.grid_size[0]
+
+    def decide(self, segments, occupancy, apple, direction):
+        """
+        Direction for the next step.
+
+        Parameters
+        ----------
+        segments : sequence
+            (gridx, gridy) location of segments, head first, e.g., Snake.segments.
+        occupancy : container
+            Occupied (gridx, gridy) locations, e.g., Snake.occupancy.
+        apple : tuple
+            (gridx, gridy) location of the apple.
+        direction : str
+            Current direction, snake cannot reverse it.
+
+        Returns
+        ----------
+        str : "left", "up", "right", or "down"
+        """
+        self.n_decisions += 1
+        head = segments[0]
+        behind = self.flat((head[0] - DIRECTION_TO_DXY[direction][0], head[1] - DIRECTION_TO_DXY[direction][1]))
+
+        # apple moved, the plan is useless
+        apple = (apple[0], apple[1])
+        if apple != self.plan_apple:
+            self.plan.clear()
+            self.plan_apple = apple
+            self.apple_backoff = 1
+            self.apple_retry = 0
+            self.apple_steps = 0
+            self.n_known = 0
+        self.apple_steps += 1
+
+        # snake did not go where it was sent (new round or a player took over), its body needs checking
+        if self.flat(head) != self.last_square:
+            self.plan.clear()
+            self.on_cycle = None
+
+        # cached plan is fine as long as the next square is still free
+        if not self.on_cycle and self.plan and self.plan[0] in self.neighbors[self.flat(head)] and self.plan[0] != behind:
+            next_square = self.plan[0]
+            ipos = (next_square % self.grid_size[0], next_square // self.grid_size[0])
+            if ipos not in occupancy or (ipos == segments[-1] and len(segments) > 1):
+                return self.move(head, self.plan.popleft())
+
+        # once the snake lies along the cycle, it never leaves it, so it cannot get stuck
+        if not self.on_cycle:
+            self.on_cycle = self.is_on_cycle([self.flat(segment) for segment in segments])
+        if self.on_cycle:
+            square = self.step_on_cycle(segments, apple, behind)
+            if square is not None:
+                return self.move(head, square)
+            self.on_cycle = False
+
+        # tail moves out of the way, so its square is not blocked
+        blocked = {self.flat(segment) for segment in segments}
+        if len(segments) > 1 and segments[-1] != segments[0]:
+            blocked.discard(self.flat(segments[-1]))
+        self.replan(segments, blocked, apple, behind)
+        if self.plan:
+            return self.move(head, self.plan.popleft())
+
+        # doomed, keep going
+        self.last_square = None
+        return direction
+
+    def direction_to(self, head, square):
+        """
+        Direction from the head to a neighboring square.
+
+        Parameters
+        ----------
+        head : tuple
+            (gridx, gridy) location of the head.
+        square : int
+            Flat index of a neighboring square.
+
+        Returns
+        ----------
+        str
+        """
+        dxy = (square % self.grid_size[0] - head[0], square // self.grid_size[0] - head[1])
+        return DXY_TO_DIRECTION[dxy]
+
+    def move(self, head, square):
+        """
+        Remember the square the head is sent to and return direction to it.
+
+        Parameters
+        ----------
+        head : tuple
+            (gridx, gridy) location of the head.
+        square : int
+            Flat index of a neighboring square.
+
+        Returns
+        ----------
+        str
+        """
+        self.last_square = square
+        return self.direction_to(head, square)
+
+    def search(self, start, goal, blocked, behind=None):
+        """
+        Shortest path that avoids blocked squares, found via breadth-first search.
+
+        Parameters
+        ----------
+        start : int
+            Flat index of the start square.
+        goal : int
+            Flat index of the goal square, can be blocked.
+        blocked : set
+            Flat indexes of squares that cannot be entered.
+        behind : int, optional
+            Square that cannot be the first step (snake cannot reverse).
+
+        Returns
+        ----------
+        list : Flat indexes from the first step till the goal, empty if there is no path.
+        """
+        self.n_searches += 1
+        came_from = {start : None}
+        frontier = deque([start])
+        while frontier:
+            square = frontier.popleft()
+            for neighbor in self.neighbors[square]:
+                if neighbor in came_from or (square == start and neighbor == behind):
+                    continue
+                if neighbor == goal:
+                    path = [goal]
+                    while square != start:
+                        path.append(square)
+                        square = came_from[square]
+                    path.reverse()
+                    return path
+                if neighbor not in blocked:
+                    came_from[neighbor] = square
+                    frontier.append(neighbor)
+        return []
+
+    def is_safe(self, path, segments):
+        """
+        Whether the tail is reachable after following the path and eating the apple.
+
+        Parameters
+        ----------
+        path : list
+            Flat indexes of squares till the apple.
+        segments : sequence
+            (gridx, gridy) location of segments, head first.
+
+        Returns
+        ----------
+        bool
+        """
+        # snake after the meal: path (reversed) followed by the old body, one segment longer
+        length = len(segments) + 1
+        body = path[::-1][:length]
+        if len(body) < length:
+            body.extend(self.flat(segment) for segment in list(segments)[:length - len(body)])
+        if len(set(body)) == self.grid_size[0] * self.grid_size[1]:
+            return True
+        return len(self.search(body[0], body[-1], set(body[:-1]))) > 0
+
+    def is_on_cycle(self, body):
+        """
+        Whether the body lies along the Hamiltonian cycle, so that following the cycle is always safe.
+
+        Segments must come in the order of the cycle from the tail to the
+        head, gaps are fine. Then the cycle square in front of the head is
+        free (or the tail), and it stays so however much the snake grows.
+        Except for a snake of two segments with the tail in front of the
+        head, which would have to reverse.
+
+        Parameters
+        ----------
+        body : list
+            Flat indexes of segments, head first.
+
+        Returns
+        ----------
+        bool
+        """
+        if self.cycle is None or (len(body) == 2 and self.cycle[body[0]] == body[1]):
+            return False
+        n_squares = len(self.cycle_order)
+        tail = self.cycle_order[body[-1]]
+        distances = [(self.cycle_order[square] - tail) % n_squares for square in body]
+        return all(ahead > behind for ahead, behind in zip(distances, distances[1:]))
+
+    def extend_distances(self, apple, portion):
+        """
+        Work out distances to the apple for the next portion of squares.
+
+        Distance is the number of steps along the shortest shortcut to the
+        apple, i.e., a path on which every step gets closer to the apple along
+        the cycle. Squares are taken going back along the cycle from the apple,
+        so distances of neighbors that are closer to it are already known.
+
+        Parameters
+        ----------
+        apple : int
+            Flat index of the apple square.
+        portion : int
+            Number of squares.
+        """
+        n_squares = len(self.cycle)
+        if self.n_known == 0:
+            self.n_searches += 1
+        apple_order = self.cycle_order[apple]
+        for to_apple in range(self.n_known, min(self.n_known + portion, n_squares)):
+            square = self.cycle_squares[(apple_order - to_apple) % n_squares]
+            distance = 0 if to_apple == 0 else n_squares
+            for neighbor in self.neighbors[square]:
+                if (apple_order - self.cycle_order[neighbor]) % n_squares < to_apple and self.apple_distances[neighbor] < distance:
+                    distance = self.apple_distances[neighbor] + 1
+            self.apple_distances[square] = distance
+        self.n_known = min(self.n_known + portion, n_squares)
+
+    def step_on_cycle(self, segments, apple, behind):
+        """
+        Next square of a snake that lies along the cycle.
+
+        Takes the neighbor with the shortest known shortcut to the apple,
+        unless the apple lies in a gap of the body, and the next square along
+        the cycle otherwise.
+
+        Parameters
+        ----------
+        segments : sequence
+            (gridx, gridy) location of segments, head first.
+        apple : tuple
+            (gridx, gridy) location of the apple.
+        behind : int
+            Square that cannot be the next one.
+
+        Returns
+        ----------
+        int : Flat index of the next square, None if the snake would have to reverse.
+        """
+        n_squares = len(self.cycle)
+        self.extend_distances(self.flat(apple), SQUARES_PER_DECISION)
+        head = self.flat(segments[0])
+        apple_order = self.cycle_order[self.flat(apple)]
+        tail_order = self.cycle_order[self.flat(segments[-1])]
+        head_to_apple = (apple_order - self.cycle_order[head]) % n_squares
+
+        # squares on the way from the head to the apple along the cycle are free,
+        # unless the apple lies in a gap of the body, i.e., between the tail and the head
+        best = None
+        if (apple_order - tail_order) % n_squares > (self.cycle_order[head] - tail_order) % n_squares:
+            for neighbor in self.neighbors[head]:
+                to_apple = (apple_order - self.cycle_order[neighbor]) % n_squares
+                # stepping back onto the apple along the cycle would put the tail in front of the head
+                if to_apple < min(head_to_apple, self.n_known) and neighbor != behind and self.cycle[neighbor] != head:
+                    if best is None or self.apple_distances[neighbor] < self.apple_distances[best]:
+                        best = neighbor
+        if best is None and self.cycle[head] != behind:
+            best = self.cycle[head]
+
+        # a single segment can go anywhere but back, as long as it does not step back onto the apple
+        if best is None and len(segments) == 1:
+            best = next((neighbor for neighbor in self.neighbors[head]
+                         if neighbor != behind and (neighbor != self.flat(apple) or self.cycle[neighbor] != head)), None)
+        return best
+
+    def replan(self, segments, blocked, apple, behind):
+        """
+        Plan the next few steps.
+
+        Parameters
+        ----------
+        segments : sequence
+            (gridx, gridy) location of segments, head first.
+        blocked : set
+            Flat indexes of occupied squares.
+        apple : tuple
+            (gridx, gridy) location of the apple.
+        behind : int
+            Square that cannot be the first step.
+        """
+        head = self.flat(segments[0])
+        self.plan.clear()
+
+        # go for the apple, if it is safe
+        if self.apple_retry > 0:
+            self.apple_retry -= 1
+        else:
+            path = self.search(head, self.flat(apple), blocked, behind)
+            if path and self.is_safe(path, segments):
+                self.plan.extend(path)
+                self.apple_backoff = 1
+                return
+            self.apple_retry = self.apple_backoff
+            self.apple_backoff = min(2 * self.apple_backoff, MAX_APPLE_BACKOFF)
+
+        # take one step along the cycle, once the apple was out of reach for too long and only if the tail stays reachable
+        if (self.cycle is not None and self.cycle[head] != behind and self.cycle[head] not in blocked and
+                self.apple_steps > len(self.cycle) and self.is_safe([self.cycle[head]], segments)):
+            self.plan.append(self.cycle[head])
+            return
+
+        # chase the tail
+        if len(segments) > 1:
+            path = self.search(head, self.flat(segments[-1]), blocked, behind)
+            if path:
+                self.plan.extend(path)
+                return
+
+        # follow the Hamiltonian cycle
+        if self.cycle is not None:
+            square = self.cycle[head]
+            if square not in blocked and square != behind:
+                self.plan.append(square)
+                return
+
+        # any free square
+        for square in self.neighbors[head]:
+            if square not in blocked and square != behind:
+                self.plan.append(square)
+                return
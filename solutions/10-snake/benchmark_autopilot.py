@@ -0,0 +1,121 @@
+"""
+Benchmark autopilot on the headless engine: decisions per second, how long
+a decision takes at worst, how long the snake grows, and how games end.
+
+Decisions are timed in CPU time of the process (time.process_time), so that
+pauses while the operating system runs other processes do not count as slow
+decisions. Besides the mean and the slowest decision, 99.9% of decisions take
+no longer than the reported percentile.
+
+Every game ends in one of four ways: the snake filled the grid (won), crashed
+(died), went longer than two grid areas of steps without eating (stalled,
+i.e., stuck chasing its own tail), or was still eating when the step limit ran
+out (unfinished). Final length is averaged over all games, median number of
+steps till the win is reported for won games only.
+"""
+
+from collections import deque
+import time
+
+import numpy as np
+
+from autopilot import Autopilot
+from engine import SnakeEngine, KEEP
+from utilities import DIRECTION
+
+# grid size, number of games, maximal number of steps per game
+CONDITIONS = [((10, 10), 20, 20_000),
+              ((30, 20), 5, 300_000),
+              ((100, 100), 2, 20_000)]
+
+
+class EngineSnake:
+    """
+    Segments and occupancy of a single engine game in the form that Autopilot expects.
+
+    Properties
+    ----------
+    engine : SnakeEngine
+    segments : collections.deque
+        (gridx, gridy) location of segments, head first.
+
+    Methods
+    ----------
+    update(ate) : Follow a step of the engine.
+    """
+
+    def __init__(self, engine):
+        """
+        Parameters
+        ----------
+        engine : SnakeEngine
+            Engine with a single game.
+        """
+        self.engine = engine
+        self.segments = deque(engine.snake(0))
+
+    def __contains__(self, ipos):
+        """Whether grid position is occupied.
+        """
+        width, height = self.engine.grid_size
+        return 0 <= ipos[0] < width and 0 <= ipos[1] < height and self.engine.occupancy[0, ipos[0] + ipos[1] * width] > 0
+
+    def update(self, ate):
+        """
+        Follow a step of the engine.
+
+        Parameters
+        ----------
+        ate : bool
+            Whether snake ate an apple (and kept its tail).
+        """
+        self.segments.appendleft((int(self.engine.head_x[0]), int(self.engine.head_y[0])))
+        if not ate:
+            self.segments.pop()
+
+
+keep = np.array([KEEP])
+print("%8s %12s %10s %10s %10s %8s %6s %6s %8s %11s %12s" % ("grid", "decisions/s", "mean [ms]", "99.9% [ms]", "worst [ms]",
+                                                           "length", "won", "died", "stalled", "unfinished", "steps to win"))
+for grid_size, n_games, max_steps in CONDITIONS:
+    decision_times = []
+    final_lengths = []
+    outcomes = {"won" : 0, "died" : 0, "stalled" : 0, "unfinished" : 0}
+    win_steps = []
+    max_steps_without_apple = 2 * grid_size[0] * grid_size[1]
+    for seed in range(n_games):
+        engine = SnakeEngine(1, grid_size, [seed])
+        autopilot = Autopilot(grid_size)
+        snake = EngineSnake(engine)
+        last_meal = 0
+        while not engine.done[0] and engine.steps[0] < max_steps and engine.steps[0] - last_meal <= max_steps_without_apple:
+            apple = (int(engine.apple[0] % grid_size[0]), int(engine.apple[0] // grid_size[0]))
+            start = time.process_time()
+            direction = autopilot.decide(snake.segments, snake, apple, DIRECTION[engine.direction[0]])
+            decision_times.append(time.process_time() - start)
+
+            engine.direction[0] = DIRECTION.index(direction)
+            eaten, _ = engine.step(keep)
+            snake.update(eaten[0] > 0)
+            if eaten[0] > 0:
+                last_meal = engine.steps[0]
+
+        final_lengths.append(engine.length[0])
+        if engine.won[0]:
+            outcomes["won"] += 1
+            win_steps.append(engine.steps[0])
+        elif engine.done[0]:
+            outcomes["died"] += 1
+        elif engine.steps[0] - last_meal > max_steps_without_apple:
+            outcomes["stalled"] += 1
+        else:
+            outcomes["unfinished"] += 1
+    decision_times = 1000 * np.array(decision_times)
+    print("%8s %12.0f %10.3f %10.3f %10.3f %8.0f %6d %6d %8d %11d %12s" % ("%dx%d" % grid_size,
+                                                                         1000 / np.mean(decision_times),
+                                                                         np.mean(decision_times),
+                                                                         np.percentile(decision_times, 99.9),
+                                                                         np.max(decision_times),
+                                                                         np.mean(final_lengths),
+                                                                         outcomes["won"], outcomes["died"], outcomes["stalled"], outcomes["unfinished"],
+                                                                         "%.0f" % np.median(win_steps) if win_steps else "-"))
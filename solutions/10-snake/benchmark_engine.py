@@ -0,0 +1,20 @@
+"""
+Throughput of the headless snake engine, single process and a process pool.
+"""
+
+import os
+
+from engine import random_policy, run_parallel, run_worker
+
+GRID_SIZE = (30, 20)
+N_GAMES = 10_000
+N_STEPS = 200
+
+if __name__ == "__main__":
+    single = run_worker(random_policy, N_GAMES, N_STEPS, GRID_SIZE, seed=0)
+    print("Single process: %.2f million steps per second" % (single["steps"] / single["duration [s]"] / 1e6))
+
+    n_workers = os.cpu_count()
+    pooled = run_parallel(random_policy, n_workers, N_GAMES, N_STEPS, GRID_SIZE, seed=0)
+    print("%d processes: %.2f million steps per second, %d games finished, %d apples eaten" %
+          (n_workers, pooled["steps per second"] / 1e6, pooled["games"], pooled["apples"]))
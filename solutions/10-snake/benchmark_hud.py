@@ -0,0 +1,51 @@
+"""
+Compare drawing score and hearts every frame with a cached HUD.
+
+The score changes once every SCORE_EVERY frames, similar to eating an apple
+now and then. We count stimuli drawn and HUD renders per frame and time each frame.
+"""
+
+import time
+
+from psychopy import visual
+
+from gridwindow import GridWindow
+from hud import HUD
+from scoring import Score
+
+FRAMES = 600
+SCORE_EVERY = 60
+
+win = GridWindow((30, 20), 20)
+score = Score(win)
+hearts = [visual.ImageStim(win, "heart.png", size=win.square_size, pos=win.grid_to_win((ipos, win.grid_size[1]-1)))
+          for ipos in range(3)]
+
+print("%10s %15s %15s %15s" % ("hud", "draws/frame", "renders/frame", "ms per frame"))
+
+# separate stimuli
+n_draws = 0
+start = time.perf_counter()
+for iframe in range(FRAMES):
+    if iframe % SCORE_EVERY == 0:
+        score.plus_one()
+    score.draw()
+    for heart in hearts:
+        heart.draw()
+    n_draws += 1 + len(hearts)
+    win.flip()
+duration = time.perf_counter() - start
+print("%10s %15.1f %15.3f %15.2f" % ("stimuli", n_draws / FRAMES, 0, 1000 * duration / FRAMES))
+
+# cached texture
+hud = HUD(win, score, hearts)
+start = time.perf_counter()
+for iframe in range(FRAMES):
+    if iframe % SCORE_EVERY == 0:
+        hud.plus_one()
+    hud.draw()
+    win.flip()
+duration = time.perf_counter() - start
+print("%10s %15.1f %15.3f %15.2f" % ("cached", 1, hud.n_renders / FRAMES, 1000 * duration / FRAMES))
+
+win.close()
@@ -0,0 +1,60 @@
+"""
+Compare drawing the snake segment-by-segment with a batched SnakeRenderer.
+
+For each snake length, the snake moves for a number of frames (one step per frame).
+We count stimuli created and draw calls issued per frame and time each frame.
+"""
+
+import time
+from collections import deque
+
+from gridwindow import GridWindow
+from snaking import SnakeSegment, SnakeRenderer
+
+SNAKE_LENGTHS = [10, 100, 1_000, 10_000]
+FRAMES = 100
+
+win = GridWindow((200, 150), 4)
+
+print("%10s %12s %15s %15s %15s" % ("length", "renderer", "stimuli/frame", "draws/frame", "ms per frame"))
+for length in SNAKE_LENGTHS:
+    # snake moves row by row, starting from the bottom-left corner
+    path = [(ix if iy % 2 == 0 else win.grid_size[0] - 1 - ix, iy)
+            for iy in range(win.grid_size[1])
+            for ix in range(win.grid_size[0])]
+
+    # one visual.Rect per segment
+    segments = deque(SnakeSegment(win, ipos, "green") for ipos in reversed(path[:length]))
+    n_stimuli = 0
+    n_draws = 0
+    start = time.perf_counter()
+    for iframe in range(FRAMES):
+        segments.appendleft(SnakeSegment(win, path[length + iframe], "green"))
+        segments.pop()
+        n_stimuli += 1
+        for segment in segments:
+            segment.draw()
+            n_draws += 1
+        win.flip()
+    duration = time.perf_counter() - start
+    print("%10d %12s %15.1f %15.1f %15.2f" % (length, "segments", n_stimuli / FRAMES, n_draws / FRAMES, 1000 * duration / FRAMES))
+
+    # a single element array
+    renderer = SnakeRenderer(win, "green")
+    for ipos in path[:length]:
+        renderer.add_head(ipos)
+    n_allocations = renderer.n_allocations
+    n_draw_calls = renderer.n_draw_calls
+    start = time.perf_counter()
+    for iframe in range(FRAMES):
+        renderer.add_head(path[length + iframe])
+        renderer.remove_tail()
+        renderer.draw()
+        win.flip()
+    duration = time.perf_counter() - start
+    print("%10d %12s %15.1f %15.1f %15.2f" % (length, "batched",
+                                              (renderer.n_allocations - n_allocations) / FRAMES,
+                                              (renderer.n_draw_calls - n_draw_calls) / FRAMES,
+                                              1000 * duration / FRAMES))
+
+win.close()
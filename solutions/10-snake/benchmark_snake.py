@@ -0,0 +1,57 @@
+"""
+Benchmark a single snake step for snakes of different length.
+
+Each step grows the snake, checks for an apple, trims the tail, and
+checks for the walls and self-bites, just like the main loop in code24.py.
+The snake is laid out as a spiral that starts at the center of the grid,
+so it can keep moving without hitting itself or the walls.
+"""
+
+import time
+
+from gridwindow import GridWindow
+from snaking import Snake
+
+SNAKE_LENGTHS = [10, 100, 1_000, 10_000, 100_000]
+STEPS = 1_000
+DIRECTIONS = [(1, 0), (0, 1), (-1, 0), (0, -1)]
+
+def spiral():
+    """
+    Generate steps of a spiral that starts at the center.
+
+    Yields
+    ----------
+    tuple : (dx, dy) direction of motion
+    """
+    run = 1
+    idirection = 0
+    while True:
+        for _ in range(2):
+            for _ in range(run):
+                yield DIRECTIONS[idirection]
+            idirection = (idirection + 1) % len(DIRECTIONS)
+        run += 1
+
+
+# grid large enough to fit the longest snake plus all steps
+win = GridWindow((340, 340), 2)
+
+print("%10s %15s" % ("length", "us per step"))
+for length in SNAKE_LENGTHS:
+    snake = Snake(win, {"color" : "green", "speed [squares per second]" : 4})
+    path = spiral()
+    for _ in range(length - 1):
+        snake.grow(next(path))
+
+    apple_ipos = (0, 0)
+    start = time.perf_counter()
+    for _ in range(STEPS):
+        snake.grow(next(path))
+        if not snake.is_inside(apple_ipos):
+            snake.trim()
+        assert not snake.hit_the_wall and not snake.bit_itself
+    duration = time.perf_counter() - start
+    print("%10d %15.2f" % (length, 1e6 * duration / STEPS))
+
+win.close()
@@ -3,18 +3,21 @@ Snake game.
 """
 
 import json
+import os
+import random
 import sys
+import time
 
 from psychopy import clock, event, gui, sound, visual
 
 from gridwindow import GridWindow
 from snaking import Snake
 from apples import Apple
+from autopilot import Autopilot
+from replay import Replay
 from scoring import Score
-
-DIRECTION_TO_DXY = {"up" : (0, 1), "right": (1, 0), "left": (-1, 0), "down": (0, -1)}
-NEW_DIRECTION = {"right" : {"up" : "right", "right" : "down", "down" : "left", "left" : "up"},
-                 "left" : {"up" : "left", "right" : "up", "down" : "right", "left" : "down"}}
+from hud import HUD
+from utilities import DIRECTION_TO_DXY, NEW_DIRECTION
 
 # getting settings
 with open('settings.json') as json_file:
@@ -23,6 +26,7 @@ with open('settings.json') as json_file:
 # difficulty
 difficulty_dlg = gui.Dlg(title="Snake")
 difficulty_dlg.addField('Difficulty:', choices=["Easy", "Medium", "Hard"])
+difficulty_dlg.addField('Autopilot:', initial=False)
 ok_data = difficulty_dlg.show()
 if not difficulty_dlg.OK:
     # user aborted
@@ -34,12 +38,19 @@ settings["Snake"]["speed [squares per second]"] = settings["Difficulty"][ok_data
 win = GridWindow(settings["Window"]["grid size [in squares]"], 
                  settings["Window"]["square size [in pixels]"])
 
+# seeded apples, so that the game can be replayed
+seed = random.randrange(2**32)
+apple_rng = random.Random(seed)
+replay = Replay(seed, win.grid_size)
+
 # create game objects
+autopilot = Autopilot(win.grid_size) if ok_data[1] else None
 snake = Snake(win, settings["Snake"])
-apple = Apple(win, snake)
+apple = Apple(win, snake, apple_rng)
 score = Score(win)
 hearts = [visual.ImageStim(win, "heart.png", size=win.square_size, pos=win.grid_to_win((ipos, win.grid_size[1]-1)))
           for ipos in range(3)]
+hud = HUD(win, score, hearts)
 
 # audio
 round_over_sound = sound.Sound("game-over-arcade.wav")
@@ -51,13 +62,13 @@ new_direction = direction
 
 # main loop
 user_abort = False
+game_won = False
 for lives in range(3):
-    # pause before the round start
-    score.draw()
+    # pause before the round start, HUD goes first as it is rendered via the back buffer
+    hud.lives = 3 - lives
+    hud.draw()
     snake.draw()
     apple.draw()
-    for heart in hearts[:(3-lives)]:
-        heart.draw()
     visual.TextStim(win, "Press SPACE to start").draw()
     win.flip()
     keys = event.waitKeys(keyList=["space", "escape"])
@@ -66,27 +77,34 @@ for lives in range(3):
 
     # next round
     snake.reset()
-    while not user_abort and not snake.hit_the_wall and not snake.bit_itself:
-        # move snake
-        if snake.can_move:
+    while not user_abort and not game_won and not snake.hit_the_wall and not snake.bit_itself:
+        # move snake, all steps due since the last frame, so that it catches up after a stalled frame
+        for _ in range(snake.scheduler.update()):
+            if game_won or snake.hit_the_wall or snake.bit_itself:
+                break
+            if autopilot is not None:
+                new_direction = autopilot.decide(snake.segments, snake.occupancy, apple.ipos, direction)
             direction = new_direction
+            replay.record_step(direction)
             snake.grow(DIRECTION_TO_DXY[direction])
             if snake.is_inside(apple.ipos):
                 # ate an apple! 
-                score.plus_one()
-
-                # recreate apple elsewhere
-                apple = Apple(win, snake)
+                hud.plus_one()
+
+                if snake.fills_the_grid:
+                    # no room left for another apple, snake wins!
+                    game_won = True
+                else:
+                    # recreate apple elsewhere
+                    apple = Apple(win, snake, apple_rng)
             else:
                 # keep moving
                 snake.trim()
 
         # visuals
+        hud.draw()
         apple.draw()
         snake.draw()
-        score.draw()
-        for heart in hearts[:(3-lives)]:
-            heart.draw()
         win.flip()
 
         # controls
@@ -97,8 +115,8 @@ for lives in range(3):
             else:
                 new_direction = NEW_DIRECTION[keys[0]][direction]
 
-    # are we here because of the abort?
-    if user_abort:
+    # are we here because of the abort or the win?
+    if user_abort or game_won:
         break
 
     # play appropriate tune
@@ -107,15 +125,24 @@ for lives in range(3):
     else:
         game_over_sound.play()
 
+# saving the replay
+replay.finish(score.score)
+os.makedirs("replays", exist_ok=True)
+replay.save(os.path.join("replays", time.strftime("%Y-%m-%d-%H-%M-%S") + ".snake"))
+
 # blinking game over 
 if not user_abort:
-    game_over_text = visual.TextStim(win, "Game over", color="red")
+    if game_won:
+        game_over_text = visual.TextStim(win, "You won!", color="yellow")
+    else:
+        game_over_text = visual.TextStim(win, "Game over", color="red")
     text_is_on = True
     text_timer = clock.CountdownTimer(0.5)
     can_continue = False
+    hud.lives = 0
     while not can_continue:
         # visuals
-        score.draw()
+        hud.draw()
         snake.draw()
         apple.draw()
         if text_is_on:
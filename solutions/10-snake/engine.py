@@ -0,0 +1,492 @@
+"""
+Headless snake engine: game rules without PsychoPy, for many games at once.
+
+The rules are the same as in the main loop of code24.py: the snake grows a new
+head in the current direction, eats an apple if it covers it or trims its tail
+otherwise, and the game is over once it hits the wall or bites itself. Apples
+are placed the same way as by Apple and FreeCells classes, so a single game with
+the same seed and turns reproduces a game played with visuals.
+
+All games are stored as NumPy arrays and stepped together, a grid square is
+identified by its flat index ix + iy * width.
+
+* SnakeEngine
+* SnakeEnv
+* random_policy(observation, rng)
+* run_worker(policy, n_games, n_steps, grid_size, seed)
+* run_parallel(policy, n_workers, n_games, n_steps, grid_size, seed)
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import random
+import time
+
+import numpy as np
+
+from utilities import DIRECTION, TURN_INCREMENT, DIRECTION_TO_DXY
+
+# actions: keep moving, turn left (counterclockwise), turn right (clockwise)
+KEEP, TURN_LEFT, TURN_RIGHT = 0, 1, 2
+ACTION_TO_TURN = np.array([0, TURN_INCREMENT["left"], TURN_INCREMENT["right"]])
+
+# (dx, dy) for direction indexes in DIRECTION
+DXY = np.array([DIRECTION_TO_DXY[direction] for direction in DIRECTION])
+
+INITIAL_DIRECTION = DIRECTION.index("left")
+
+
+class SnakeEngine:
+    """
+    Snake rules for many independent games stepped together.
+
+    Properties
+    ----------
+    n_games : int
+    grid_size : tuple
+        (width, height) of the grid in squares.
+    n_cells : int
+        Number of grid squares.
+    rngs : list
+        random.Random per game, used for apple placement.
+    direction : numpy.ndarray
+        Index of the current direction in DIRECTION.
+    head_x, head_y : numpy.ndarray
+        Head location on the grid.
+    body : numpy.ndarray
+        n_games x (n_cells + 1) ring buffer with flat indexes of segments.
+    ihead : numpy.ndarray
+        Location of the head within the body ring buffer.
+    length : numpy.ndarray
+        Number of segments.
+    occupancy : numpy.ndarray
+        n_games x n_cells number of segments in each square.
+    cells, position, n_free : numpy.ndarray
+        Free squares index, same layout as in FreeCells.
+    apple : numpy.ndarray
+        Flat index of the apple square.
+    score : numpy.ndarray
+        Apples eaten.
+    steps : numpy.ndarray
+        Steps made since the reset.
+    done : numpy.ndarray
+        Whether the game is over.
+    won : numpy.ndarray
+        Whether the snake filled the grid.
+    flat_body, flat_occupancy, flat_cells, flat_position : numpy.ndarray
+        One-dimensional views of two-dimensional arrays.
+
+    Methods
+    ----------
+    reset(games, keep_apple) : Put a single segment snake at the center of the grid.
+    occupy(games, cells) : Remove squares from free squares, as FreeCells.remove().
+    release(games, cells) : Return squares to free squares, as FreeCells.add().
+    add_heads(games, cells) : Grow a new head, as Snake.add_head().
+    trim_tails(games) : Remove the tail, as Snake.trim().
+    place_apples(games) : Place apples at random free squares, as Apple and FreeCells.sample().
+    step(actions) : Move snakes in all games that are not over.
+    observe() : Compact state of all games.
+    snake(game) : Segment locations for a single game.
+    """
+
+    def __init__(self, n_games, grid_size, seeds=None):
+        """
+        Parameters
+        ----------
+        n_games : int
+        grid_size : tuple
+            (width, height) of the grid in squares.
+        seeds : list, optional
+            Seed for each game, random if omitted.
+        """
+        self.n_games = n_games
+        self.grid_size = tuple(grid_size)
+        self.n_cells = self.grid_size[0] * self.grid_size[1]
+        if seeds is None:
+            seeds = [random.randrange(2**32) for _ in range(n_games)]
+        self.rngs = [random.Random(seed) for seed in seeds]
+
+        self.direction = np.zeros(n_games, dtype=np.int64)
+        self.head_x = np.zeros(n_games, dtype=np.int64)
+        self.head_y = np.zeros(n_games, dtype=np.int64)
+        self.body = np.zeros((n_games, self.n_cells + 1), dtype=np.int64)
+        self.ihead = np.zeros(n_games, dtype=np.int64)
+        self.length = np.zeros(n_games, dtype=np.int64)
+        self.occupancy = np.zeros((n_games, self.n_cells), dtype=np.int8)
+        self.cells = np.zeros((n_games, self.n_cells), dtype=np.int64)
+        self.position = np.zeros((n_games, self.n_cells), dtype=np.int64)
+        self.n_free = np.zeros(n_games, dtype=np.int64)
+        self.apple = np.zeros(n_games, dtype=np.int64)
+        self.score = np.zeros(n_games, dtype=np.int64)
+        self.steps = np.zeros(n_games, dtype=np.int64)
+        self.done = np.zeros(n_games, dtype=bool)
+        self.won = np.zeros(n_games, dtype=bool)
+
+        # flat views: indexing with a single array is much faster than with a pair of arrays
+        self.flat_body = self.body.reshape(-1)
+        self.flat_occupancy = self.occupancy.reshape(-1)
+        self.flat_cells = self.cells.reshape(-1)
+        self.flat_position = self.position.reshape(-1)
+
+        self.reset()
+
+    def reset(self, games=None, keep_apple=False):
+        """
+        Put a single segment snake at the center of the grid.
+
+        Parameters
+        ----------
+        games : numpy.ndarray, optional
+            Indexes of games to reset, all games if omitted.
+        keep_apple : bool, optional
+            Whether apple stays where it was, as between rounds of the same game.
+        """
+        if games is None:
+            games = np.arange(self.n_games)
+        if len(games) == 0:
+            return
+
+        self.direction[games] = INITIAL_DIRECTION
+        self.head_x[games] = self.grid_size[0] // 2
+        self.head_y[games] = self.grid_size[1] // 2
+        self.ihead[games] = 0
+        self.length[games] = 0
+        self.occupancy[games] = 0
+        self.cells[games] = np.arange(self.n_cells)
+        self.position[games] = np.arange(self.n_cells)
+        self.n_free[games] = self.n_cells
+        self.steps[games] = 0
+        self.done[games] = False
+        self.won[games] = False
+        self.add_heads(games, self.head_x[games] + self.head_y[games] * self.grid_size[0])
+
+        if not keep_apple:
+            self.score[games] = 0
+            self.place_apples(games)
+
+    def occupy(self, games, cells):
+        """
+        Remove squares from free squares, as FreeCells.remove().
+
+        Parameters
+        ----------
+        games : numpy.ndarray
+            Game indexes.
+        cells : numpy.ndarray
+            One flat square index per game.
+        """
+        rows = games * self.n_cells
+        old_position = self.flat_position[rows + cells]
+        self.n_free[games] -= 1
+        new_position = self.n_free[games]
+        other = self.flat_cells[rows + new_position]
+        self.flat_cells[rows + old_position] = other
+        self.flat_cells[rows + new_position] = cells
+        self.flat_position[rows + other] = old_position
+        self.flat_position[rows + cells] = new_position
+
+    def release(self, games, cells):
+        """
+        Return squares to free squares, as FreeCells.add().
+
+        Parameters
+        ----------
+        games : numpy.ndarray
+            Game indexes.
+        cells : numpy.ndarray
+            One flat square index per game.
+        """
+        rows = games * self.n_cells
+        old_position = self.flat_position[rows + cells]
+        new_position = self.n_free[games]
+        other = self.flat_cells[rows + new_position]
+        self.flat_cells[rows + old_position] = other
+        self.flat_cells[rows + new_position] = cells
+        self.flat_position[rows + other] = old_position
+        self.flat_position[rows + cells] = new_position
+        self.n_free[games] += 1
+
+    def add_heads(self, games, cells):
+        """
+        Grow a new head, as Snake.add_head().
+
+        Parameters
+        ----------
+        games : numpy.ndarray
+            Game indexes.
+        cells : numpy.ndarray
+            One flat square index per game.
+        """
+        ihead = (self.ihead[games] - 1) % self.body.shape[1]
+        self.ihead[games] = ihead
+        self.flat_body[games * self.body.shape[1] + ihead] = cells
+        self.length[games] += 1
+        occupancy_index = games * self.n_cells + cells
+        self.flat_occupancy[occupancy_index] += 1
+        newly_occupied = self.flat_occupancy[occupancy_index] == 1
+        self.occupy(games[newly_occupied], cells[newly_occupied])
+
+    def trim_tails(self, games):
+        """
+        Remove the tail, as Snake.trim().
+
+        Parameters
+        ----------
+        games : numpy.ndarray
+            Game indexes.
+        """
+        self.length[games] -= 1
+        body_width = self.body.shape[1]
+        tails = self.flat_body[games * body_width + (self.ihead[games] + self.length[games]) % body_width]
+        occupancy_index = games * self.n_cells + tails
+        self.flat_occupancy[occupancy_index] -= 1
+        vacated = self.flat_occupancy[occupancy_index] == 0
+        self.release(games[vacated], tails[vacated])
+
+    def place_apples(self, games):
+        """
+        Place apples at random free squares, as Apple and FreeCells.sample().
+
+        Parameters
+        ----------
+        games : numpy.ndarray
+            Game indexes.
+        """
+        for game in games.tolist():
+            self.apple[game] = self.cells[game, self.rngs[game].randrange(self.n_free[game])]
+
+    def step(self, actions):
+        """
+        Move snakes in all games that are not over.
+
+        Parameters
+        ----------
+        actions : numpy.ndarray
+            KEEP, TURN_LEFT, or TURN_RIGHT for each game.
+
+        Returns
+        ----------
+        numpy.ndarray : Number of apples eaten in each game (0 or 1).
+        numpy.ndarray : Whether game is over after this step.
+        """
+        eaten = np.zeros(self.n_games, dtype=np.int64)
+        games = np.flatnonzero(~self.done)
+        if len(games) == 0:
+            return eaten, self.done.copy()
+
+        # turn and move the head
+        direction = (self.direction[games] + ACTION_TO_TURN[actions[games]]) % len(DIRECTION)
+        self.direction[games] = direction
+        head_x = self.head_x[games] + DXY[direction, 0]
+        head_y = self.head_y[games] + DXY[direction, 1]
+        self.head_x[games] = head_x
+        self.head_y[games] = head_y
+        self.steps[games] += 1
+
+        # hitting the wall is game over, the tail does not matter anymore
+        hit_the_wall = (head_x < 0) | (head_x >= self.grid_size[0]) | (head_y < 0) | (head_y >= self.grid_size[1])
+        if np.any(hit_the_wall):
+            self.done[games[hit_the_wall]] = True
+            games = games[~hit_the_wall]
+            head_x = head_x[~hit_the_wall]
+            head_y = head_y[~hit_the_wall]
+
+        # grow a new head
+        heads = head_x + head_y * self.grid_size[0]
+        self.add_heads(games, heads)
+
+        # an apple is eaten, if it is anywhere inside the snake, as Snake.is_inside()
+        ate = self.flat_occupancy[games * self.n_cells + self.apple[games]] > 0
+        eaters = games[ate]
+        eaten[eaters] = 1
+        self.score[eaters] += 1
+        grid_is_full = self.n_free[eaters] == 0
+        self.won[eaters[grid_is_full]] = True
+        self.done[eaters[grid_is_full]] = True
+        self.place_apples(eaters[~grid_is_full])
+
+        # keep moving
+        self.trim_tails(games[~ate])
+
+        # did it bite itself?
+        bit_itself = self.flat_occupancy[games * self.n_cells + heads] > 1
+        self.done[games[bit_itself]] = True
+
+        return eaten, self.done.copy()
+
+    def observe(self):
+        """
+        Compact state of all games.
+
+        Returns
+        ----------
+        numpy.ndarray : n_games x 6 array with head x, head y, direction index, apple x, apple y, and length.
+        """
+        return np.stack([self.head_x,
+                         self.head_y,
+                         self.direction,
+                         self.apple % self.grid_size[0],
+                         self.apple // self.grid_size[0],
+                         self.length], axis=1)
+
+    def snake(self, game):
+        """
+        Segment locations for a single game.
+
+        Parameters
+        ----------
+        game : int
+
+        Returns
+        ----------
+        list : (gridx, gridy) of segments, head first.
+        """
+        slots = (self.ihead[game] + np.arange(self.length[game])) % self.body.shape[1]
+        return [(cell % self.grid_size[0], cell // self.grid_size[0]) for cell in self.body[game, slots].tolist()]
+
+
+class SnakeEnv:
+    """
+    Gym-style environment for many snake games, finished games restart automatically.
+
+    Rewards are +1 for an apple, -1 for the game over, and 0 otherwise.
+
+    Properties
+    ----------
+    engine : SnakeEngine
+
+    Methods
+    ----------
+    reset() : Restart all games.
+    step(actions) : Make a step in all games.
+    """
+
+    def __init__(self, n_games, grid_size, seed=None):
+        """
+        Parameters
+        ----------
+        n_games : int
+        grid_size : tuple
+            (width, height) of the grid in squares.
+        seed : int, optional
+            Seed of the first game, following games use consecutive seeds.
+        """
+        seeds = None if seed is None else range(seed, seed + n_games)
+        self.engine = SnakeEngine(n_games, grid_size, seeds)
+
+    def reset(self):
+        """
+        Restart all games.
+
+        Returns
+        ----------
+        numpy.ndarray : observation, see SnakeEngine.observe().
+        """
+        self.engine.reset()
+        return self.engine.observe()
+
+    def step(self, actions):
+        """
+        Make a step in all games.
+
+        Parameters
+        ----------
+        actions : numpy.ndarray
+            KEEP, TURN_LEFT, or TURN_RIGHT for each game.
+
+        Returns
+        ----------
+        numpy.ndarray : observation, see SnakeEngine.observe().
+        numpy.ndarray : rewards
+        numpy.ndarray : whether game was over (and restarted)
+        dict : "score" and "steps" of finished games, before the restart.
+        """
+        eaten, done = self.engine.step(np.asarray(actions))
+        rewards = eaten - done.astype(np.int64)
+        finished = np.flatnonzero(done)
+        info = {"score" : self.engine.score[finished].copy(),
+                "steps" : self.engine.steps[finished].copy()}
+        self.engine.reset(finished)
+        return self.engine.observe(), rewards, done, info
+
+
+def random_policy(observation, rng):
+    """
+    Turn at random every now and then.
+
+    Parameters
+    ----------
+    observation : numpy.ndarray
+        See SnakeEngine.observe().
+    rng : numpy.random.Generator
+
+    Returns
+    ----------
+    numpy.ndarray : actions
+    """
+    return rng.choice(3, size=observation.shape[0], p=[0.8, 0.1, 0.1])
+
+
+def run_worker(policy, n_games, n_steps, grid_size, seed):
+    """
+    Run games in a single process.
+
+    Parameters
+    ----------
+    policy : callable
+        policy(observation, rng) that returns an action per game.
+        Must be a module-level function, so that it can be sent to a process.
+    n_games : int
+    n_steps : int
+    grid_size : tuple
+    seed : int
+
+    Returns
+    ----------
+    dict : "steps", "games" (finished), "apples", "duration [s]"
+    """
+    env = SnakeEnv(n_games, grid_size, seed)
+    rng = np.random.default_rng(seed)
+    observation = env.reset()
+    apples = 0
+    finished = 0
+    start = time.perf_counter()
+    for _ in range(n_steps):
+        observation, rewards, done, _ = env.step(policy(observation, rng))
+        apples += int(np.sum(rewards > 0))
+        finished += int(np.sum(done))
+    return {"steps" : n_games * n_steps,
+            "games" : finished,
+            "apples" : apples,
+            "duration [s]" : time.perf_counter() - start}
+
+
+def run_parallel(policy, n_workers, n_games, n_steps, grid_size, seed=0):
+    """
+    Run games in a pool of processes, n_games per process.
+
+    Parameters
+    ----------
+    policy : callable
+        See run_worker().
+    n_workers : int
+    n_games : int
+        Games per process.
+    n_steps : int
+    grid_size : tuple
+    seed : int, optional
+
+    Returns
+    ----------
+    dict : "steps", "games", "apples", "duration [s]" (wall-clock), "steps per second"
+    """
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        futures = [pool.submit(run_worker, policy, n_games, n_steps, grid_size, seed + iworker * n_games)
+                   for iworker in range(n_workers)]
+        results = [future.result() for future in futures]
+    duration = time.perf_counter() - start
+
+    totals = {key : sum(result[key] for result in results) for key in ["steps", "games", "apples"]}
+    totals["duration [s]"] = duration
+    totals["steps per second"] = totals["steps"] / duration
+    return totals
@@ -0,0 +1,137 @@
+"""
+Index of free (not occupied by the snake) grid squares.
+
+* FreeCells
+"""
+
+import random
+
+class FreeCells:
+    """
+    Index of free grid squares that supports O(1) removal, addition, and uniform sampling.
+
+    Squares are stored as flat indexes (ix + iy * width) in a single list. The first
+    n_free elements are free squares, the rest are occupied ones. Occupying or freeing
+    a square swaps it across that boundary, a position map tells where each square is.
+
+    Properties
+    ----------
+    grid_size : tuple
+        (width, height) of the grid in squares.
+    cells : list
+        Flat indexes of all squares, free ones first.
+    position : list
+        Location of each square within cells.
+    n_free : int
+        Number of free squares.
+
+    Methods
+    ----------
+    reset() : Mark all squares as free.
+    contains(ipos) : Whether grid position is within the grid.
+    swap(cell, new_position) : Swap cell with whatever is at the new position in cells list.
+    remove(ipos) : Mark square as occupied.
+    add(ipos) : Mark square as free.
+    sample(rng) : Pick a free square at random.
+    """
+
+    def __init__(self, grid_size):
+        """
+        Parameters
+        ----------
+        grid_size : tuple
+            (width, height) of the grid in squares.
+        """
+        self.grid_size = grid_size
+        self.cells = []
+        self.position = []
+        self.n_free = 0
+        self.reset()
+
+    def __len__(self):
+        """Number of free squares.
+        """
+        return self.n_free
+
+    def reset(self):
+        """Mark all squares as free.
+        """
+        self.n_free = self.grid_size[0] * self.grid_size[1]
+        self.cells = list(range(self.n_free))
+        self.position = list(range(self.n_free))
+
+    def contains(self, ipos):
+        """
+        Whether grid position is within the grid.
+
+        Parameters
+        ----------
+        ipos : tuple
+            (x, y) position on the grid
+
+        Returns
+        ----------
+        bool
+        """
+        return 0 <= ipos[0] < self.grid_size[0] and 0 <= ipos[1] < self.grid_size[1]
+
+    def swap(self, cell, new_position):
+        """
+        Swap cell with whatever is at the new position in cells list.
+
+        Parameters
+        ----------
+        cell : int
+            Flat index of the square.
+        new_position : int
+        """
+        old_position = self.position[cell]
+        other = self.cells[new_position]
+        self.cells[old_position], self.cells[new_position] = other, cell
+        self.position[other], self.position[cell] = old_position, new_position
+
+    def remove(self, ipos):
+        """
+        Mark square as occupied.
+
+        Parameters
+        ----------
+        ipos : tuple
+            (x, y) position on the grid
+        """
+        cell = ipos[0] + ipos[1] * self.grid_size[0]
+        if self.position[cell] < self.n_free:
+            self.n_free -= 1
+            self.swap(cell, self.n_free)
+
+    def add(self, ipos):
+        """
+        Mark square as free.
+
+        Parameters
+        ----------
+        ipos : tuple
+            (x, y) position on the grid
+        """
+        cell = ipos[0] + ipos[1] * self.grid_size[0]
+        if self.position[cell] >= self.n_free:
+            self.swap(cell, self.n_free)
+            self.n_free += 1
+
+    def sample(self, rng=random):
+        """
+        Pick a free square at random.
+
+        Parameters
+        ----------
+        rng : random.Random, optional
+            Random number generator, defaults to the module-level one.
+
+        Returns
+        ----------
+        tuple : (x, y) position on the grid
+        """
+        if self.n_free == 0:
+            raise ValueError("No free squares left on the grid.")
+        cell = self.cells[rng.randrange(self.n_free)]
+        return (cell % self.grid_size[0], cell // self.grid_size[0])
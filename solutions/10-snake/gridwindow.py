@@ -2,6 +2,7 @@
 Grid window, inherits from PsychoPy window and adds grid attributes and functions.
 """
 
+import numpy as np
 from psychopy.visual import Window
 
 
@@ -14,11 +15,17 @@ class GridWindow(Window):
     grid_size : tuple
         Size of the grid
     square_size_pix : integer
-        size of a single square in pixels        
+        size of a single square in pixels
+    centers : list
+        Two numpy.ndarray with window coordinates of square centers along x and y,
+        padded by one square on each side (index 0 is grid position -1).
+    centers_list : list
+        Same as centers but as lists, faster for single positions.
 
     Methods
     ----------
     grid_to_win(ipos) : Convert grid coordinates to window coordinates in height units.
+    win_to_grid(pos) : Convert window coordinates to grid coordinates.
     """
 
     def __init__(self, grid_size, square_size_pix):
@@ -33,6 +40,11 @@ class GridWindow(Window):
         self.grid_size = grid_size
         self.square_size = tuple([2 / s for s in self.grid_size])
 
+        # lookup tables for square centers, padding covers the head that hit the wall
+        self.centers = [-1 + self.square_size[i] / 2.0 + np.arange(-1, self.grid_size[i] + 1) * self.square_size[i]
+                        for i in range(2)]
+        self.centers_list = [centers.tolist() for centers in self.centers]
+
         # calling constructor of the ancestor
         super().__init__(size=(self.grid_size[0] * square_size_pix, self.grid_size[1] * square_size_pix), units="norm", screen=1)
 
@@ -40,14 +52,38 @@ class GridWindow(Window):
         """
         Convert grid coordinates to window coordinates in height units.
 
+        Grid coordinates must be within one square from the grid.
+
+        Parameters
+        -----------
+        ipos : tuple or numpy.ndarray
+            (x, y) coordiantes on the grid or an N x 2 array of them
+
+        Returns
+        -----------
+        list : [norm_x, norm_y] coordinates in the window or an N x 2 numpy.ndarray of them
+        """
+        if np.isscalar(ipos[0]):
+            return [self.centers_list[0][ipos[0] + 1], self.centers_list[1][ipos[1] + 1]]
+
+        ipos = np.asarray(ipos, dtype=int)
+        return np.stack([self.centers[0][ipos[:, 0] + 1], self.centers[1][ipos[:, 1] + 1]], axis=1)
+
+    def win_to_grid(self, pos):
+        """
+        Convert window coordinates to grid coordinates, e.g., for mouse position.
+
         Parameters
         -----------
-        ipos : tuple
-            (x, y) coordiantes on the grid
+        pos : tuple or numpy.ndarray
+            (norm_x, norm_y) coordinates in the window or an N x 2 array of them
 
         Returns
         -----------
-        tuple : (norm_x, norm_y) coordinates in the window
+        tuple : (x, y) coordinates on the grid or an N x 2 numpy.ndarray of them.
+                Positions outside of the window are outside of the grid as well.
         """
-        return [-1 + self.square_size[i] / 2.0 + ipos[i] * self.square_size[i]
-                for i in range(2)]
+        ipos = np.floor((np.asarray(pos, dtype=float) + 1) / self.square_size).astype(int)
+        if ipos.ndim == 1:
+            return (int(ipos[0]), int(ipos[1]))
+        return ipos
@@ -0,0 +1,87 @@
+"""
+Heads-up display: score and remaining lives drawn from a cached texture.
+"""
+
+from psychopy import visual
+
+class HUD:
+    """
+    Heads-up display: score and remaining lives drawn from a cached texture.
+
+    Score and hearts change only a few times per game, so they are rendered
+    once into a BufferImageStim that is drawn as a single textured quad every
+    frame and re-rendered only when the score or the number of lives changes.
+
+    Capturing clears the back buffer, so draw the HUD before anything else
+    on the frame.
+
+    Properties
+    ----------
+    win : GridWindow
+    score : Score
+    hearts : list
+        visual.ImageStim, one per life.
+    lives : int
+        Number of hearts to show.
+    rect : list
+        [left, top, right, bottom] of the captured region in norm units.
+    needs_update : bool
+        Whether cached texture is out of date.
+    cached : visual.BufferImageStim
+    n_renders : int
+        Number of times the texture was re-rendered.
+
+    Methods
+    ----------
+    plus_one() : Increase the score by one.
+    draw() : Draw cached HUD, re-render it first if needed.
+    """
+
+    def __init__(self, win, score, hearts):
+        """
+        Parameters
+        ----------
+        win : GridWindow
+        score : Score
+        hearts : list
+            visual.ImageStim, one per life.
+        """
+        self.win = win
+        self.score = score
+        self.hearts = hearts
+        self._lives = len(hearts)
+
+        # top strip of the window that covers the score and the hearts
+        bottom = min(score.pos[1] - score.height / 2, 1 - win.square_size[1])
+        self.rect = [-1, 1, 1, bottom]
+
+        self.needs_update = True
+        self.cached = None
+        self.n_renders = 0
+
+    @property
+    def lives(self):
+        """int : Number of hearts to show.
+        """
+        return self._lives
+
+    @lives.setter
+    def lives(self, value):
+        if value != self._lives:
+            self._lives = value
+            self.needs_update = True
+
+    def plus_one(self):
+        """Increase the score by one.
+        """
+        self.score.plus_one()
+        self.needs_update = True
+
+    def draw(self):
+        """Draw cached HUD, re-render it first if needed.
+        """
+        if self.needs_update:
+            self.cached = visual.BufferImageStim(self.win, rect=self.rect, stim=[self.score] + self.hearts[:self.lives])
+            self.needs_update = False
+            self.n_renders += 1
+        self.cached.draw()
@@ -0,0 +1,233 @@
+"""
+Recording and verification of snake games.
+
+A replay stores the seed of the random number generator used for apples and
+the steps at which snake changed its direction. That is enough to rebuild the
+game exactly using the headless SnakeEngine. Changes of direction are stored
+as variable length integers (step since the previous change * 4 + direction index),
+so a typical turn takes one or two bytes.
+
+Run this file with replay filenames as arguments to verify them.
+
+* Replay
+* load_replay(filename)
+* verify_replays(replays)
+"""
+
+import struct
+import sys
+
+import numpy as np
+
+from engine import SnakeEngine, INITIAL_DIRECTION, KEEP
+from utilities import DIRECTION
+
+MAGIC = b"SNKR"
+VERSION = 1
+LIVES = 3
+
+# magic, version, seed, grid width, grid height, number of steps, score
+HEADER = struct.Struct("<4sBQHHII")
+
+
+class Replay:
+    """
+    Replay of a single game.
+
+    Properties
+    ----------
+    seed : int
+        Seed for the random.Random that places apples.
+    grid_size : tuple
+        (width, height) of the grid in squares.
+    n_steps : int
+        Number of steps made in all rounds.
+    score : int
+        Final score.
+    events : list
+        (step index, direction index) for every change of direction.
+    direction : int
+        Direction index during the last recorded step.
+
+    Methods
+    ----------
+    record_step(direction) : Record a single step in the direction.
+    finish(score) : Store the final score.
+    to_bytes() : Encode replay.
+    save(filename) : Save replay to a binary file.
+    """
+
+    def __init__(self, seed, grid_size, n_steps=0, score=0, events=None):
+        """
+        Parameters
+        ----------
+        seed : int
+        grid_size : tuple
+        n_steps : int, optional
+        score : int, optional
+        events : list, optional
+        """
+        self.seed = seed
+        self.grid_size = tuple(grid_size)
+        self.n_steps = n_steps
+        self.score = score
+        self.events = [] if events is None else events
+        self.direction = INITIAL_DIRECTION
+
+    def record_step(self, direction):
+        """
+        Record a single step in the direction.
+
+        Parameters
+        ----------
+        direction : str
+            "left", "up", "right", or "down"
+        """
+        idirection = DIRECTION.index(direction)
+        if idirection != self.direction:
+            self.events.append((self.n_steps, idirection))
+            self.direction = idirection
+        self.n_steps += 1
+
+    def finish(self, score):
+        """
+        Store the final score.
+
+        Parameters
+        ----------
+        score : int
+        """
+        self.score = score
+
+    def to_bytes(self):
+        """
+        Encode replay.
+
+        Returns
+        ----------
+        bytes
+        """
+        encoded = bytearray(HEADER.pack(MAGIC, VERSION, self.seed, self.grid_size[0], self.grid_size[1], self.n_steps, self.score))
+        previous_step = 0
+        for step, idirection in self.events:
+            value = ((step - previous_step) << 2) | idirection
+            previous_step = step
+
+            # 7 bits per byte, high bit means "more bytes follow"
+            while value >= 0x80:
+                encoded.append((value & 0x7F) | 0x80)
+                value >>= 7
+            encoded.append(value)
+        return bytes(encoded)
+
+    def save(self, filename):
+        """
+        Save replay to a binary file.
+
+        Parameters
+        ----------
+        filename : str
+        """
+        with open(filename, "wb") as replay_file:
+            replay_file.write(self.to_bytes())
+
+
+def load_replay(filename):
+    """
+    Load replay from a binary file.
+
+    Parameters
+    ----------
+    filename : str
+
+    Returns
+    ----------
+    Replay
+    """
+    with open(filename, "rb") as replay_file:
+        encoded = replay_file.read()
+
+    magic, version, seed, width, height, n_steps, score = HEADER.unpack_from(encoded)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("%s is not a snake replay file (version %d)." % (filename, VERSION))
+
+    events = []
+    step = 0
+    value = 0
+    shift = 0
+    for byte in encoded[HEADER.size:]:
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            step += value >> 2
+            events.append((step, value & 3))
+            value = 0
+            shift = 0
+    return Replay(seed, (width, height), n_steps, score, events)
+
+
+def verify_replays(replays):
+    """
+    Rebuild games from replays using the headless engine and check their scores.
+
+    All replays must have the same grid size, as they are played together.
+
+    Parameters
+    ----------
+    replays : list
+        Replay objects.
+
+    Returns
+    ----------
+    numpy.ndarray : Whether replayed score and number of steps match the recorded ones.
+    numpy.ndarray : Replayed scores.
+    """
+    grid_sizes = {replay.grid_size for replay in replays}
+    if len(grid_sizes) != 1:
+        raise ValueError("Replays with different grid sizes cannot be verified together.")
+
+    n_games = len(replays)
+    n_steps = np.array([replay.n_steps for replay in replays])
+
+    # direction for every step of every game
+    directions = np.full((n_games, max(n_steps.max(), 1)), INITIAL_DIRECTION, dtype=np.int64)
+    for igame, replay in enumerate(replays):
+        change_steps = [0] + [step for step, _ in replay.events] + [replay.n_steps]
+        changes = [INITIAL_DIRECTION] + [idirection for _, idirection in replay.events]
+        directions[igame, :replay.n_steps] = np.repeat(changes, np.diff(change_steps))
+
+    engine = SnakeEngine(n_games, grid_sizes.pop(), [replay.seed for replay in replays])
+    keep = np.full(n_games, KEEP)
+    lives_lost = np.zeros(n_games, dtype=np.int64)
+    steps_made = np.zeros(n_games, dtype=np.int64)
+    finished = n_steps == 0
+    for step in range(directions.shape[1]):
+        # games that are over or were aborted by the player do not move
+        finished |= step >= n_steps
+        engine.done[finished] = True
+        stepping = ~finished
+
+        # direction persists between rounds, so it is set directly rather than via turns
+        engine.direction[stepping] = directions[stepping, step]
+        engine.step(keep)
+        steps_made[stepping] += 1
+
+        # round is over: another life or game over
+        ended = stepping & engine.done
+        finished |= ended & engine.won
+        lost = ended & ~engine.won
+        lives_lost[lost] += 1
+        finished |= lives_lost >= LIVES
+        engine.reset(np.flatnonzero(lost & ~finished), keep_apple=True)
+
+    scores = engine.score.copy()
+    recorded_scores = np.array([replay.score for replay in replays])
+    return (scores == recorded_scores) & (steps_made == n_steps), scores
+
+
+if __name__ == "__main__":
+    replays = [load_replay(filename) for filename in sys.argv[1:]]
+    if replays:
+        verified, scores = verify_replays(replays)
+        for filename, replay, is_valid, score in zip(sys.argv[1:], replays, verified, scores):
+            print("%s: recorded %d, replayed %d, %s" % (filename, replay.score, score, "OK" if is_valid else "MISMATCH"))
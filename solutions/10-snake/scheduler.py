@@ -0,0 +1,129 @@
+"""
+Fixed time step scheduler.
+
+* FixedStepScheduler
+"""
+
+from psychopy import clock
+
+class FixedStepScheduler:
+    """
+    Fixed time step scheduler with bounded catch-up.
+
+    Instead of restarting a countdown timer whenever it ran out (which delays
+    every step until the next frame and loses steps after a stalled frame),
+    the scheduler accumulates elapsed time and hands out steps at exact
+    multiples of the step duration. After a long stall, at most max_catch_up
+    steps are made within a single frame, the rest are dropped.
+
+    Typical use in the main loop:
+
+        for _ in range(scheduler.update()):
+            make_a_step()
+        draw(scheduler.alpha)
+
+    Properties
+    ----------
+    step_duration : float
+        Duration of a single step in seconds.
+    max_catch_up : int
+        Maximal number of steps made within a single frame.
+    get_time : callable
+        Returns current time in seconds.
+    last_time : float
+        Time of the last update.
+    accumulator : float
+        Time accumulated but not yet spent on steps.
+    alpha : float
+        Fraction of the next step that has already elapsed, for interpolation.
+    n_steps : int
+        Steps made.
+    n_late_steps : int
+        Extra steps handed out by a single update to catch up after a stall.
+    n_missed_steps : int
+        Steps dropped because catching up would take too many steps.
+    max_lag : float
+        Largest delay between when a step was due and when it was made.
+    stats : dict
+        All counters above.
+
+    Methods
+    ----------
+    reset() : Restart timing, e.g., at the beginning of a round.
+    update() : Number of steps due since the last update.
+    """
+
+    def __init__(self, step_duration, max_catch_up=3, get_time=clock.getTime):
+        """
+        Parameters
+        ----------
+        step_duration : float
+            Duration of a single step in seconds.
+        max_catch_up : int, optional
+            Maximal number of steps made within a single frame.
+        get_time : callable, optional
+            Returns current time in seconds, defaults to PsychoPy's high resolution clock.
+        """
+        self.step_duration = step_duration
+        self.max_catch_up = max_catch_up
+        self.get_time = get_time
+        self.last_time = self.get_time()
+        self.accumulator = 0.0
+        self.n_steps = 0
+        self.n_late_steps = 0
+        self.n_missed_steps = 0
+        self.max_lag = 0.0
+
+    def reset(self):
+        """Restart timing, e.g., at the beginning of a round.
+        """
+        self.last_time = self.get_time()
+        self.accumulator = 0.0
+
+    def update(self):
+        """
+        Number of steps due since the last update.
+
+        Returns
+        ----------
+        int
+        """
+        now = self.get_time()
+        self.accumulator += now - self.last_time
+        self.last_time = now
+
+        n_due = int(self.accumulator // self.step_duration)
+        if n_due == 0:
+            return 0
+
+        # the first due step is the most overdue one
+        lag = self.accumulator - self.step_duration
+        self.max_lag = max(self.max_lag, lag)
+        if n_due > 1:
+            self.n_late_steps += min(n_due, self.max_catch_up) - 1
+
+        # drop steps we cannot catch up with
+        if n_due > self.max_catch_up:
+            self.n_missed_steps += n_due - self.max_catch_up
+            n_due = self.max_catch_up
+            self.accumulator = self.accumulator % self.step_duration
+        else:
+            self.accumulator -= n_due * self.step_duration
+
+        self.n_steps += n_due
+        return n_due
+
+    @property
+    def alpha(self):
+        """float : Fraction of the next step that has already elapsed, for interpolation.
+        """
+        return min(self.accumulator / self.step_duration, 1.0)
+
+    @property
+    def stats(self):
+        """dict : Step counters and the largest delay.
+        """
+        return {"steps" : self.n_steps,
+                "late steps" : self.n_late_steps,
+                "missed steps" : self.n_missed_steps,
+                "max lag [s]" : self.max_lag}
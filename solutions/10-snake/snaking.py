@@ -2,12 +2,17 @@
 Snake-related classes.
 
 * SnakeSegment
+* SnakeRenderer
 * Snake
 """
 
-import random
+from collections import deque
 
-from psychopy import clock, visual
+import numpy as np
+from psychopy import visual
+
+from freecells import FreeCells
+from scheduler import FixedStepScheduler
 
 class SnakeSegment:
     """
@@ -33,7 +38,7 @@ class SnakeSegment:
             (gridx, gridy) location on the grid
         color : psychopy color
         """
-        self.ipos = ipos
+        self.ipos = tuple(ipos)
         self.visuals = visual.Rect(win, size=win.square_size, pos=win.grid_to_win(ipos), fillColor=color, lineColor="white")
 
     def draw(self):
@@ -42,6 +47,151 @@ class SnakeSegment:
         self.visuals.draw()
 
 
+class SnakeRenderer:
+    """
+    Draws all snake segments in a single call.
+
+    Window positions of segments are kept in a preallocated ring buffer
+    that has room for every square of the grid, so that growing and trimming
+    the snake only overwrites one slot. Unused slots are fully transparent.
+
+    Properties
+    ----------
+    win : GridWindow
+    capacity : int
+        Maximal number of segments.
+    xys : numpy.ndarray
+        capacity x 2 window positions of segments.
+    opacities : numpy.ndarray
+        Opacity of each slot, 0 for unused ones.
+    ihead : int
+        Slot of the head segment.
+    n : int
+        Number of segments.
+    needs_update : bool
+        Whether positions or opacities changed since the last draw.
+    trimmed : bool
+        Whether the tail was removed after the last head was added.
+    visuals : visual.ElementArrayStim
+    n_draw_calls : int
+        Number of draw calls issued so far.
+    n_allocations : int
+        Number of stimuli created so far.
+
+    Methods
+    ----------
+    clear() : Remove all segments.
+    add_head(ipos) : Add head segment at the grid position.
+    remove_tail() : Remove the tail segment.
+    draw(alpha) : Draw all segments, optionally moving in between squares.
+    """
+
+    def __init__(self, win, color):
+        """
+        Parameters
+        ----------
+        win : GridWindow
+        color : psychopy color
+        """
+        self.win = win
+
+        # every square of the grid plus the head that went through the wall
+        self.capacity = win.grid_size[0] * win.grid_size[1] + 1
+        self.xys = np.zeros((self.capacity, 2))
+        self.opacities = np.zeros(self.capacity)
+        self.ihead = 0
+        self.n = 0
+        self.needs_update = True
+        self.trimmed = False
+
+        # squares are slightly smaller than the grid, so that segments remain distinguishable
+        self.visuals = visual.ElementArrayStim(win,
+                                               nElements=self.capacity,
+                                               elementTex=None,
+                                               elementMask=None,
+                                               xys=self.xys,
+                                               sizes=[0.9 * size for size in win.square_size],
+                                               colors=color,
+                                               opacities=self.opacities)
+        self.n_draw_calls = 0
+        self.n_allocations = 1
+
+    def clear(self):
+        """Remove all segments.
+        """
+        self.opacities[:] = 0
+        self.ihead = 0
+        self.n = 0
+        self.needs_update = True
+
+    def add_head(self, ipos):
+        """
+        Add head segment at the grid position.
+
+        Parameters
+        -----------
+        ipos : tuple
+            (gridx, gridy) location of the new head
+        """
+        self.ihead = (self.ihead - 1) % self.capacity
+        self.xys[self.ihead] = self.win.grid_to_win(ipos)
+        self.opacities[self.ihead] = 1
+        self.n += 1
+        self.needs_update = True
+        self.trimmed = False
+
+    def remove_tail(self):
+        """Remove the tail segment.
+        """
+        self.n -= 1
+        self.opacities[(self.ihead + self.n) % self.capacity] = 0
+        self.needs_update = True
+        self.trimmed = True
+
+    def draw(self, alpha=None):
+        """
+        Draw all segments, optionally moving in between squares.
+
+        Parameters
+        -----------
+        alpha : float, optional
+            Fraction of the way from the previous step to the current one.
+            The head slides in from the previous square and the removed tail
+            slides out towards the current one. Squares only, if omitted.
+        """
+        if alpha is not None and self.n < self.capacity:
+            # the removed tail is still in the slot right after the current tail
+            ihead = self.ihead
+            ighost = (self.ihead + self.n) % self.capacity
+            head_xy = self.xys[ihead].copy()
+            ghost_xy = self.xys[ighost].copy()
+            if self.n > 1:
+                previous_xy = self.xys[(ihead + 1) % self.capacity]
+            elif self.trimmed:
+                previous_xy = ghost_xy
+            else:
+                previous_xy = head_xy
+            self.xys[ihead] = previous_xy + alpha * (head_xy - previous_xy)
+            if self.trimmed and self.n > 1:
+                tail_xy = self.xys[(ihead + self.n - 1) % self.capacity]
+                self.xys[ighost] = ghost_xy + alpha * (tail_xy - ghost_xy)
+                self.opacities[ighost] = 1
+
+            # stimulus keeps its own copy, so the ring buffer can be restored right away
+            self.visuals.xys = self.xys
+            self.visuals.opacities = self.opacities
+            self.xys[ihead] = head_xy
+            self.xys[ighost] = ghost_xy
+            self.opacities[ighost] = 0
+            self.needs_update = True
+        elif self.needs_update:
+            self.visuals.xys = self.xys
+            self.visuals.opacities = self.opacities
+            self.needs_update = False
+        self.visuals.draw()
+        self.n_draw_calls += 1
+
+
 class Snake:
     """
     Snake class.
@@ -51,22 +201,33 @@ class Snake:
     win : GridWindow
     settings : dict
             Setting for the snake.
-    segments : list
-        SnakeSegment
-    movement_clock : clock.CountdownTimer
-        Timer till moving to the next square.
+    segments : collections.deque
+        (gridx, gridy) location of segments, head first.
+    occupancy : dict
+        Number of segments at each (gridx, gridy) location.
+    free_cells : FreeCells
+        Squares not occupied by the snake.
+    renderer : SnakeRenderer
+    scheduler : FixedStepScheduler
+        Timing of steps to the next square.
+    steps_due : int
+        Steps that are due but were not made yet, used only by can_move.
     can_move : bool
-        Whether it is time to move the snake.
+        Whether it is time to move the snake, at most one step per frame.
     hit_the_wall : bool
         Whether a snake hit the wall.
     bit_itself : bool
         Whether snake bit itself.
+    fills_the_grid : bool
+        Whether there are no free squares left.
+
     Methods
     ----------
     reset_clock() : Reset movement timer.
     reset() : Initialize the snake: single segment at the center of the screen.
-    draw() : Draw all segments.
+    draw() : Draw all segments, in between squares if "smooth movement" is on.
     is_inside(ipos) : Check whether grid position is inside the snake.
+    add_head(ipos) : Add a new head segment and register it in the occupancy index.
     grow(dxy) : Grow snake by a single segment in dxy direction.
     trim() : Trim the last segment of the snake.
     """
@@ -81,41 +242,79 @@ class Snake:
         """
         self.win = win
         self.settings = settings
-        self.segments = [SnakeSegment(self.win, 
-                                      (self.win.grid_size[0]//2, self.win.grid_size[1]//2),
-                                      self.settings["color"])]
+        self.segments = deque()
+        # counts rather than a set: after biting itself, head and body share a square
+        self.occupancy = {}
+        self.free_cells = FreeCells(self.win.grid_size)
+        self.renderer = SnakeRenderer(self.win, self.settings["color"])
+        self.add_head((self.win.grid_size[0]//2, self.win.grid_size[1]//2))
 
         step_duration = 1 / self.settings["speed [squares per second]"]
-        self.movement_clock = clock.CountdownTimer(step_duration)
+        self.scheduler = FixedStepScheduler(step_duration)
+        self.steps_due = 0
 
     def reset_clock(self):
         """Reset movement timer.
         """
-        self.movement_clock.reset()
+        self.scheduler.reset()
+        self.steps_due = 0
 
     @property
     def can_move(self):
-        """logical: Whether it is time to move the snake.
+        """logical: Whether it is time to move the snake, at most one step per frame.
+
+        True once for every step that is due, so steps missed during a stalled frame
+        are made up in the following frames, one per frame. To catch up within
+        a single frame, as FixedStepScheduler intends, use
+
+            for _ in range(snake.scheduler.update()):
+                make_a_step()
+
+        instead, but do not mix both.
         """
-        ready_to_move = self.movement_clock.getTime() <= 0
-        if ready_to_move:
-            self.reset_clock()
-        return ready_to_move
+        if self.steps_due == 0:
+            self.steps_due = self.scheduler.update()
+        if self.steps_due > 0:
+            self.steps_due -= 1
+            return True
+        return False
 
     def reset(self):
         """Initialize the snake: single segment at the center of the screen.
         """
         self.segments.clear()
-        self.segments = [SnakeSegment(self.win, 
-                                      (self.win.grid_size[0]//2, self.win.grid_size[1]//2),
-                                      self.settings["color"])]
+        self.occupancy.clear()
+        self.free_cells.reset()
+        self.renderer.clear()
+        self.add_head((self.win.grid_size[0]//2, self.win.grid_size[1]//2))
         self.reset_clock()
 
     def draw(self):
-        """Draw all segments.
+        """Draw all segments, in between squares if "smooth movement" is on.
+        """
+        if self.settings["smooth movement"]:
+            # with steps still pending (see can_move), the snake is behind anyway, so no sliding
+            self.renderer.draw(1.0 if self.steps_due > 0 else self.scheduler.alpha)
+        else:
+            self.renderer.draw()
+
+    def add_head(self, ipos):
         """
-        for segment in self.segments:
-            segment.draw()
+        Add a new head segment and register it in the occupancy index.
+
+        Parameters
+        -----------
+        ipos : tuple
+            (gridx, gridy) location of the new head
+        """
+        ipos = (ipos[0], ipos[1])
+        self.segments.appendleft(ipos)
+        self.renderer.add_head(ipos)
+        self.occupancy[ipos] = self.occupancy.get(ipos, 0) + 1
+
+        # head outside of the grid (hit the wall) occupies no square
+        if self.occupancy[ipos] == 1 and self.free_cells.contains(ipos):
+            self.free_cells.remove(ipos)
 
     def grow(self, dxy):
         """
@@ -126,24 +325,29 @@ class Snake:
         dxy : tuple
             (dx, dy) direction of motion
         """
-        self.segments.insert(0,
-                             SnakeSegment(self.win,
-                                          [xy + change for xy, change in zip(self.segments[0].ipos, dxy)],
-                                          self.settings["color"]))
+        head = self.segments[0]
+        self.add_head((head[0] + dxy[0], head[1] + dxy[1]))
 
     def trim(self):
         """Trim the last segment of the snake.
         """
-        self.segments.pop()
+        tail = self.segments.pop()
+        self.renderer.remove_tail()
+        if self.occupancy[tail] == 1:
+            del self.occupancy[tail]
+            if self.free_cells.contains(tail):
+                self.free_cells.add(tail)
+        else:
+            self.occupancy[tail] -= 1
 
     @property
     def hit_the_wall(self):
         """bool: whether a snake hit the wall.
         """
-        return self.segments[0].ipos[0] == -1 or \
-               self.segments[0].ipos[1] == -1 or \
-               self.segments[0].ipos[0] == self.win.grid_size[0] or \
-               self.segments[0].ipos[1] == self.win.grid_size[1]
+        return self.segments[0][0] == -1 or \
+               self.segments[0][1] == -1 or \
+               self.segments[0][0] == self.win.grid_size[0] or \
+               self.segments[0][1] == self.win.grid_size[1]
 
     def is_inside(self, ipos):
         """
@@ -158,17 +362,16 @@ class Snake:
         ----------
         bool
         """
-        for segment in self.segments:
-            if segment.ipos[0] == ipos[0] and segment.ipos[1] == ipos[1]:
-                return True
-        return False
+        return (ipos[0], ipos[1]) in self.occupancy
 
     @property
     def bit_itself(self):
         """bool : Whether snake bit itself.
         """
-        for segment in self.segments[1:]:
-            if segment.ipos[0] == self.segments[0].ipos[0] and \
-               segment.ipos[1] == self.segments[0].ipos[1]:
-                return True
-        return False
+        return self.occupancy[self.segments[0]] > 1
+
+    @property
+    def fills_the_grid(self):
+        """bool : Whether there are no free squares left.
+        """
+        return len(self.free_cells) == 0
@@ -1,5 +1,16 @@
 """
-Utility functions for the snake game.
+Utility functions and constants for the snake game.
+
+Constants
+---------
+DIRECTION : list
+    Directions in clockwise order.
+TURN_INCREMENT : dict
+    Change of direction index for a turn.
+DIRECTION_TO_DXY : dict
+    (dx, dy) grid step for each direction.
+NEW_DIRECTION : dict
+    New direction after a turn ("left" or "right") from the current one.
 
 Functions
 ---------
@@ -9,6 +20,9 @@ compute_new_direction(direction, turn)
 
 DIRECTION =  ["left", "up", "right", "down"]
 TURN_INCREMENT = {"left": -1, "right" : 1}
+DIRECTION_TO_DXY = {"up" : (0, 1), "right": (1, 0), "left": (-1, 0), "down": (0, -1)}
+NEW_DIRECTION = {"right" : {"up" : "right", "right" : "down", "down" : "left", "left" : "up"},
+                 "left" : {"up" : "left", "right" : "up", "down" : "right", "left" : "down"}}
 
 def compute_new_direction(direction, turn):
     """